@@ -0,0 +1,81 @@
+"""
+生活機能指標檢查與效能測試：
+- 同一地點被同類別兩個關鍵字找到（「學校」與「小學」）只算一次
+- 類別中只要有關鍵字沒查詢過，數量與分數就是 NaN（未知），不是 0
+- 隨機 POI 下每秒可計算的地點數
+任一檢查失敗時以非 0 結束
+執行方式（專案根目錄）：python -m benchmarks.bench_accessibility
+"""
+import sys
+import time
+import numpy as np
+from services.poi_store import PLACE_TYPES, PoiStore
+from services.accessibility import NEAREST_MAX, location_features
+
+CENTER = (24.16, 120.64)
+N_POIS = 50_000
+N_LOCATIONS = 2_000
+
+
+def cover_all(store, lat, lng, radius):
+    store.add([], [(lat, lng, radius, kw) for kws in PLACE_TYPES.values() for kw in kws])
+
+
+def check_duplicate_keywords():
+    """同一間學校以「學校」「小學」各存一筆 → 教育_300m = 1"""
+    store = PoiStore(path="")
+    lat, lng = CENTER
+    store.add([("教育", "學校", "國小", lat + 0.001, lng, "p1"), ("教育", "小學", "國小", lat + 0.001, lng, "p1")])
+    cover_all(store, lat, lng, NEAREST_MAX)
+    out = location_features(np.array([lat]), np.array([lng]), store)
+    return out["教育_300m"][0] == 1 and out["教育_1000m"][0] == 1
+
+
+def check_partial_coverage():
+    """教育類只查過「學校」→ 教育的數量與 walk_score 未知；其他類別已涵蓋且沒有 POI → 0"""
+    store = PoiStore(path="")
+    lat, lng = CENTER
+    store.add([("教育", "學校", "某校", lat + 0.001, lng, "p1")],
+              [(lat, lng, NEAREST_MAX, kw) for cat, kws in PLACE_TYPES.items() for kw in kws
+               if cat != "教育" or kw == "學校"])
+    out = location_features(np.array([lat]), np.array([lng]), store)
+    return bool(np.isnan(out["教育_300m"][0]) and np.isnan(out["walk_score"][0]) and out["購物_500m"][0] == 0)
+
+
+def check_fetched_radius():
+    """只查過 500 m → 300/500 m 的數量已知，1000 m 未知"""
+    store = PoiStore(path="")
+    lat, lng = CENTER
+    cover_all(store, lat, lng, 500)
+    out = location_features(np.array([lat]), np.array([lng]), store)
+    return bool(out["餐飲_500m"][0] == 0 and np.isnan(out["餐飲_1000m"][0]))
+
+
+CHECKS = [check_duplicate_keywords, check_partial_coverage, check_fetched_radius]
+
+
+def main():
+    ok = True
+    for check in CHECKS:
+        passed = check()
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {check.__name__}：{check.__doc__.strip()}")
+
+    rng = np.random.default_rng(0)
+    keywords = [(cat, kw) for cat, kws in PLACE_TYPES.items() for kw in kws]
+    lat = CENTER[0] - 0.2 + rng.random(N_POIS) * 0.4
+    lng = CENTER[1] - 0.2 + rng.random(N_POIS) * 0.4
+    store = PoiStore(path="")
+    store.add((*keywords[i % len(keywords)], f"POI{i}", lat[i], lng[i], f"p{i // 2}") for i in range(N_POIS))
+    cover_all(store, *CENTER, 30_000)
+    q_lat = CENTER[0] - 0.15 + rng.random(N_LOCATIONS) * 0.3
+    q_lng = CENTER[1] - 0.15 + rng.random(N_LOCATIONS) * 0.3
+    t0 = time.perf_counter()
+    out = location_features(q_lat, q_lng, store)
+    elapsed = time.perf_counter() - t0
+    print(f"{N_LOCATIONS} 個地點（POI {N_POIS} 筆）：{elapsed:.2f} s，walk_score 中位數 {np.nanmedian(out['walk_score']):.0f}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+冷啟動檢查：在全新的 Python 行程裡 import 首頁需要的模組，
+量測時間並確認沒有連帶載入重的套件（超過預算或載入了禁止的模組時以非 0 結束）
+執行方式（專案根目錄）：python -m benchmarks.bench_cold_start [--budget-ms 800]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# 首頁不應該載入的模組（分析頁面、資料、ML 相關）
+FORBIDDEN = [
+    "google.generativeai",
+    "sentence_transformers",
+    "torch",
+    "hnswlib",
+    "pandas",
+    "services.listing_store",
+    "services.similar_index",
+    "page_modules.search_page",
+    "page_modules.analysis_page",
+]
+BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", 800))
+RUNS = 3
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import main_test
+elapsed = time.perf_counter() - t0
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure():
+    # PREWARM=0：只量 import，不啟動背景預熱
+    env = dict(os.environ, PREWARM="0")
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="首頁冷啟動 import 時間檢查")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    results = [measure() for _ in range(RUNS)]
+    best = min(r["ms"] for r in results)
+    loaded = sorted({m for r in results for m in r["modules"]} & set(FORBIDDEN))
+    runs = ", ".join(f"{r['ms']:.0f}" for r in results)
+    print(f"首頁 import：最佳 {best:.0f} ms（{RUNS} 次：{runs}），預算 {args.budget_ms:.0f} ms")
+    ok = True
+    if loaded:
+        print(f"❌ 首頁載入了不該載入的模組：{', '.join(loaded)}")
+        ok = False
+    if best > args.budget_ms:
+        print("❌ 超過冷啟動預算")
+        ok = False
+    if ok:
+        print("✅ 通過")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
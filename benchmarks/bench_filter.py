@@ -0,0 +1,72 @@
+"""
+篩選引擎效能測試
+執行方式（專案根目錄）：python -m benchmarks.bench_filter
+"""
+import os
+import time
+import pandas as pd
+from services.listing_store import load_dataset
+from services.filter_engine import build_mask
+
+DATA_DIR = "./Data"
+REPEAT = 200
+
+BASE = {
+    'housetype': "不限", 'budget_min': 0, 'budget_max': 1000000,
+    'age_min': 0, 'age_max': 100, 'area_min': 0, 'area_max': 1000, 'car_grip': "不限",
+}
+
+QUERIES = {
+    "不限": {},
+    "大樓 + 預算": {'housetype': "大樓", 'budget_min': 1000, 'budget_max': 3000},
+    "屋齡 + 建坪 + 車位": {'age_min': 5, 'age_max': 30, 'area_min': 20, 'area_max': 60, 'car_grip': "需要"},
+    "全部條件 + 特殊要求": {
+        'housetype': "華廈", 'budget_min': 500, 'budget_max': 4000, 'age_max': 40,
+        'area_min': 15, 'car_grip': "不要",
+        'rooms': {"min": 2}, 'living_rooms': 2, 'bathrooms': {"min": 1}, 'floor': {"min": 1, "max": 5},
+    },
+}
+
+
+def legacy_filter(df, filters):
+    """舊版作法：複製後逐條件切片，類型用字串比對"""
+    out = df.copy()
+    if filters['housetype'] != "不限":
+        out = out[out['類型'].astype(str).str.contains(filters['housetype'], case=False, na=False)]
+    if filters['budget_min'] > 0:
+        out = out[out['總價(萬)'] >= filters['budget_min']]
+    if filters['budget_max'] < 1000000:
+        out = out[out['總價(萬)'] <= filters['budget_max']]
+    if filters['area_min'] > 0:
+        out = out[out['建坪'] >= filters['area_min']]
+    if filters['area_max'] < 1000:
+        out = out[out['建坪'] <= filters['area_max']]
+    return out
+
+
+def timed(fn, repeat=REPEAT):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    for f in sorted(os.listdir(DATA_DIR)):
+        if not f.endswith("_buy_properties.csv"):
+            continue
+        path = os.path.join(DATA_DIR, f)
+        read_ms, raw_df = timed(lambda: pd.read_csv(path), repeat=5)
+        dataset = load_dataset(path)
+        print(f"\n{f}（{len(dataset)} 筆）  pd.read_csv: {read_ms:.2f} ms")
+        print(f"{'查詢':<16}{'舊版(ms)':>10}{'遮罩(ms)':>10}{'遮罩+取列(ms)':>14}{'筆數':>8}")
+        for label, extra in QUERIES.items():
+            filters = {**BASE, **extra}
+            legacy_ms, _ = timed(lambda: legacy_filter(raw_df, filters))
+            mask_ms, mask = timed(lambda: build_mask(dataset, filters))
+            take_ms, _ = timed(lambda: dataset.frame[build_mask(dataset, filters)])
+            print(f"{label:<16}{legacy_ms:>10.3f}{mask_ms:>10.3f}{take_ms:>14.3f}{int(mask.sum()):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Gemini 回應快取 / 同時請求合併測試（FakeBackend，不連網）
+執行方式（專案根目錄）：python -m benchmarks.bench_gemini
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.gemini_client import FakeBackend, GeminiClient, ResponseCache
+
+LATENCY = 1.5     # 模擬一次 Gemini 呼叫的延遲（秒）
+CONCURRENT = 8
+PROMPTS = 50
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="gemini-")
+    try:
+        path = os.path.join(tmp, "responses.sqlite")
+        backend = FakeBackend(delay=LATENCY)
+        client = GeminiClient(backend, ResponseCache(path))
+        prompt = "請分析：台中市西屯區 3房2廳2衛 屋齡 12 年 總價 1,580 萬"
+
+        # 同時送出相同請求：只呼叫一次
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(CONCURRENT) as pool:
+            texts = list(pool.map(lambda _: client.generate(prompt), range(CONCURRENT)))
+        elapsed = time.perf_counter() - t0
+        assert len(set(texts)) == 1 and len(backend.calls) == 1
+        print(f"同時 {CONCURRENT} 個相同請求：{elapsed:.2f} s，實際呼叫 {len(backend.calls)} 次")
+
+        # 重新開啟（模擬重新啟動）後命中磁碟快取
+        client = GeminiClient(backend, ResponseCache(path))
+        t0 = time.perf_counter()
+        assert client.generate(prompt) == texts[0]
+        print(f"重啟後快取命中：{(time.perf_counter() - t0) * 1000:.2f} ms，實際呼叫 {len(backend.calls)} 次")
+
+        # LRU：上限 PROMPTS // 2，最舊的會被淘汰
+        backend = FakeBackend()
+        cache = ResponseCache(os.path.join(tmp, "lru.sqlite"), max_entries=PROMPTS // 2)
+        client = GeminiClient(backend, cache)
+        for i in range(PROMPTS):
+            client.generate(f"prompt {i}")
+        client.generate(f"prompt {PROMPTS - 1}")
+        client.generate("prompt 0")
+        print(f"LRU：快取 {len(cache)} 筆（上限 {cache.max_entries}），"
+              f"命中 {cache.hits}、未命中 {cache.misses}，實際呼叫 {len(backend.calls)} 次")
+        assert len(cache) == cache.max_entries and len(backend.calls) == PROMPTS + 1
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
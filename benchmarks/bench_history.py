@@ -0,0 +1,68 @@
+"""
+歷史價格快照效能測試：模擬數年份的快照後查詢每週趨勢
+執行方式（專案根目錄）：python -m benchmarks.bench_history
+"""
+import datetime
+import shutil
+import tempfile
+import time
+import numpy as np
+from services.listing_store import load_dataset
+from services.comparables import unit_prices
+from services import price_history
+
+CSV_PATH = "./Data/Taichung-city_buy_properties.csv"
+DAYS = 3 * 365
+STEP = 3          # 每 3 天一次快照
+REPEAT = 20
+
+
+def main():
+    dataset = load_dataset(CSV_PATH)
+    rng = np.random.default_rng(0)
+    ids = np.asarray(dataset.columns["id"]).astype(str)
+    labels = np.array(dataset.labels("district") + [""], dtype=str)
+    codes = np.asarray(dataset.columns["district"]).astype("int64")
+    districts = labels[np.where(codes >= 0, codes, len(labels) - 1)]
+    prices = np.asarray(dataset.columns["price"], dtype="float64").copy()
+    area_ratio = unit_prices(dataset) / prices
+
+    history_dir = tempfile.mkdtemp(prefix="history-")
+    try:
+        start = datetime.date(2022, 1, 1)
+        active = rng.random(len(ids)) < 0.7
+        t0 = time.perf_counter()
+        n_snapshots = 0
+        for day in range(0, DAYS, STEP):
+            # 每次約 1% 物件上下架、0.5% 降價
+            active ^= rng.random(len(ids)) < 0.01
+            cut = rng.random(len(ids)) < 0.005
+            prices[cut] *= 0.97
+            price_history.append_snapshot(
+                "Bench-city", start + datetime.timedelta(days=day),
+                ids[active], districts[active], prices[active], (prices * area_ratio)[active], history_dir,
+            )
+            n_snapshots += 1
+        ingest = time.perf_counter() - t0
+        print(f"寫入 {n_snapshots} 次快照：平均 {ingest * 1000 / n_snapshots:.1f} ms/次")
+
+        t0 = time.perf_counter()
+        price_history.load_aggregates("Bench-city", history_dir)
+        print(f"首次載入統計：{(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        top = ["西屯區", "北屯區", "南屯區", price_history.ALL_DISTRICTS]
+        t0 = time.perf_counter()
+        for _ in range(REPEAT):
+            weekly = price_history.weekly_trends("Bench-city", top, history_dir)
+        print(f"每週趨勢（{len(top)} 區，{len(weekly)} 列）：{(time.perf_counter() - t0) * 1000 / REPEAT:.1f} ms")
+
+        t0 = time.perf_counter()
+        for _ in range(REPEAT):
+            weekly = price_history.weekly_trends("Bench-city", None, history_dir)
+        print(f"每週趨勢（全部行政區，{len(weekly)} 列）：{(time.perf_counter() - t0) * 1000 / REPEAT:.1f} ms")
+    finally:
+        shutil.rmtree(history_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
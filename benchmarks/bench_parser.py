@@ -0,0 +1,70 @@
+"""
+列表頁解析效能測試（lxml vs BeautifulSoup）
+執行方式（專案根目錄）：
+    python -m benchmarks.bench_parser --fixtures <存好的 HTML 資料夾>
+沒有指定資料夾時會產生與信義房屋列表相同結構的模擬頁面
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "download_data"))
+from listing_parser import BACKENDS, parse_listing_page  # noqa: E402
+
+ITEM = """<div class="buy-list-item"><a href="/buy/house/{i:04d}AB?breadcrumb=list">
+<div class="LongInfoCard_Type_Name">物件{i}</div>
+<div class="LongInfoCard_Type_Address"><span>台中市西屯區路{i}</span><span>{age}年</span><span>大樓</span></div>
+<div class="longInfoCard_LongInfoCard_Type_HouseInfo__tZXDa"><span>建坪 {area}</span><span>主+陽 {main}</span>
+<span>3房2廳2衛</span><span>{floor}樓/15樓</span></div>
+<span class="longInfoCard_LongInfoCard_Type_Parking__ZXl_e">坡道平面車位</span>
+<div class="LongInfoCard_Type_Right"><span style="text-decoration: line-through">9,999萬</span>
+<span style="color: rgb(221, 37, 37); font-size: 20px">{price:,}萬</span></div></a></div>"""
+
+
+def synthetic_pages(n_pages=50, per_page=20):
+    pages = []
+    for p in range(n_pages):
+        items = "".join(
+            ITEM.format(i=p * per_page + j, age=j % 40 + 0.5, area=30 + j, main=20 + j,
+                        floor=j % 15 + 1, price=1000 + j * 37)
+            for j in range(per_page)
+        )
+        # 模擬真實頁面中大量與列表無關的標記
+        filler = "<div class='nav'>" + "<span>選單</span>" * 500 + "</div>"
+        pages.append(f"<html><head><title>買屋</title></head><body>{filler}{items}{filler}</body></html>")
+    return pages
+
+
+def load_fixtures(path):
+    pages = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            with open(os.path.join(root, name), encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="存好的列表頁 HTML 資料夾")
+    args = parser.parse_args()
+    pages = load_fixtures(args.fixtures) if args.fixtures else synthetic_pages()
+
+    results = {}
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        rows = [parse_listing_page(html, backend=backend)[0] for html in pages]
+        elapsed = time.perf_counter() - start
+        results[backend] = rows
+        n_items = sum(len(r) for r in rows)
+        print(f"{backend:<6} {len(pages)} 頁 / {n_items} 筆：{elapsed * 1000 / len(pages):.2f} ms/頁，"
+              f"{elapsed * 1e6 / max(n_items, 1):.1f} µs/筆")
+
+    if len(results) > 1:
+        same = results["lxml"] == results["bs4"]
+        print("lxml 與 bs4 輸出一致" if same else "⚠️ lxml 與 bs4 輸出不一致")
+
+
+if __name__ == "__main__":
+    main()
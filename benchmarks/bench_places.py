@@ -0,0 +1,90 @@
+"""
+Places 查詢效能測試：在本機啟動假的 Places 伺服器（每次請求固定延遲），
+比較舊版逐一查詢（每次間隔 0.3 秒）與平行查詢 + 快取
+執行方式（專案根目錄）：python -m benchmarks.bench_places
+"""
+import json
+import random
+import threading
+import time
+import http.server
+from urllib.parse import urlparse, parse_qs
+from services.places_client import PlacesClient
+
+LATENCY = 0.15          # 假伺服器每次回應的延遲（秒）
+RATE_LIMIT_RATIO = 0.1  # 隨機回 OVER_QUERY_LIMIT 的比例
+KEYWORDS = ["圖書館", "幼兒園", "小學", "學校", "中學", "大學", "牙醫", "醫師", "藥局", "醫院",
+            "便利商店", "超市", "百貨公司", "公車站", "地鐵站", "火車站", "餐廳"]
+HOUSES = [(24.1630, 120.6400), (24.1500, 120.6600)]
+
+
+class FakePlacesHandler(http.server.BaseHTTPRequestHandler):
+    """回傳與 Nearby Search 相同格式的假資料"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        lat, lng = map(float, query["location"][0].split(","))
+        keyword = query["keyword"][0]
+        time.sleep(LATENCY)
+        if random.random() < RATE_LIMIT_RATIO:
+            body = {"status": "OVER_QUERY_LIMIT", "results": []}
+        else:
+            body = {"status": "OK", "results": [
+                {"place_id": f"{keyword}-{lat:.4f},{lng:.4f}-{i}", "name": f"{keyword}{i}",
+                 "geometry": {"location": {"lat": lat + i * 1e-4, "lng": lng - i * 1e-4}}}
+                for i in range(5)
+            ]}
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fake_places(port=0):
+    """在背景啟動假 Places 伺服器，回傳 (server, url)"""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), FakePlacesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/nearbysearch/json"
+
+
+def legacy(client, tasks):
+    """舊版作法：逐一查詢，每次間隔 0.3 秒，過載固定等 5 秒（這裡縮短為 0.5 秒）"""
+    for lat, lng, radius, kw in tasks:
+        for _ in range(5):
+            try:
+                client._request(lat, lng, radius, kw)
+                break
+            except Exception:
+                time.sleep(0.5)
+        time.sleep(0.3)
+
+
+def main():
+    random.seed(0)
+    server, url = serve_fake_places()
+    tasks = [(lat, lng, 500, kw) for lat, lng in HOUSES for kw in KEYWORDS]
+    try:
+        t0 = time.perf_counter()
+        legacy(PlacesClient("fake", base_url=url), tasks)
+        print(f"舊版逐一查詢 {len(tasks)} 個關鍵字：{time.perf_counter() - t0:.2f} 秒")
+
+        client = PlacesClient("fake", base_url=url)
+        t0 = time.perf_counter()
+        out = client.search_many(tasks)
+        errors = sum(1 for _, e in out.values() if e is not None)
+        print(f"平行查詢：{time.perf_counter() - t0:.2f} 秒（{client.requests} 次請求，失敗 {errors}）")
+
+        t0 = time.perf_counter()
+        client.search_many(tasks)
+        print(f"再次比較（快取）：{(time.perf_counter() - t0) * 1000:.1f} ms（累計 {client.requests} 次請求）")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
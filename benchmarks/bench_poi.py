@@ -0,0 +1,37 @@
+"""
+本機 POI 空間索引效能測試（隨機產生台中附近的 POI）
+執行方式（專案根目錄）：python -m benchmarks.bench_poi
+"""
+import time
+import numpy as np
+from services.poi_store import PLACE_TYPES, PoiStore, haversine
+
+N_POIS = 200_000
+REPEAT = 500
+
+
+def main():
+    rng = np.random.default_rng(0)
+    lat = 24.0 + rng.random(N_POIS) * 0.4
+    lng = 120.5 + rng.random(N_POIS) * 0.4
+    keywords = [(cat, kw) for cat, kws in PLACE_TYPES.items() for kw in kws]
+    store = PoiStore(path="")
+    store.add((*keywords[i % len(keywords)], f"POI{i}", lat[i], lng[i], f"p{i}") for i in range(N_POIS))
+    _ = store.index
+
+    center = (24.16, 120.64)
+    for radius in (300, 500, 1000):
+        t0 = time.perf_counter()
+        for _ in range(REPEAT):
+            pos, _ = store.within(*center, radius, categories=["教育"])
+        grid = (time.perf_counter() - t0) / REPEAT
+
+        t0 = time.perf_counter()
+        for _ in range(20):
+            brute = haversine(*center, lat, lng) <= radius
+        scan = (time.perf_counter() - t0) / 20
+        print(f"{radius:>5} m：格網 {grid * 1e6:.0f} µs（{len(pos)} 筆教育類），全部掃描 {scan * 1e6:.0f} µs（{brute.sum()} 筆）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+特殊要求本機解析效能測試（不需要 Gemini）
+執行方式（專案根目錄）：python -m benchmarks.bench_request_parser
+"""
+import time
+from services.request_parser import parse_special_requests
+
+SAMPLES = [
+    "一房二廳一衛以上，低樓層",
+    "三房兩廳二衛",
+    "2~3房 高樓層",
+    "至少2衛，最多十二樓",
+    "房間數：2，衛數1",
+    "5樓以上",
+    "近捷運 2房",
+    "有電梯",
+]
+REPEAT = 2000
+
+
+def main():
+    for text in SAMPLES:
+        parsed, covered = parse_special_requests(text)
+        print(f"{'✅' if covered else '🌐'} {text} → {parsed}")
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        for text in SAMPLES:
+            parse_special_requests(text)
+    per = (time.perf_counter() - t0) / (REPEAT * len(SAMPLES))
+    covered = sum(parse_special_requests(t)[1] for t in SAMPLES)
+    print(f"平均 {per * 1e6:.1f} µs/筆；{covered}/{len(SAMPLES)} 筆不需要呼叫 Gemini")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+爬蟲續抓檢查：用本機 HTML 測試檔模擬各種中斷，確認重跑後的 CSV 與一次抓完的結果相同
+（任一情境失敗時以非 0 結束）
+執行方式（專案根目錄）：python -m benchmarks.bench_scrape_resume
+"""
+import filecmp
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "download_data"))
+import scrape_runner  # noqa: E402
+from scrape_runner import CityCheckpoint, HttpFetcher, crawl_city, run, serve_directory  # noqa: E402
+from benchmarks.bench_parser import synthetic_pages  # noqa: E402
+
+CITY = "Test-city"
+N_PAGES = 6
+
+
+class Crash(Exception):
+    """模擬行程在某個時間點中斷"""
+
+
+class CountingFetcher(HttpFetcher):
+    """記錄抓了幾頁；crash_at 頁碼時丟出 Crash"""
+
+    def __init__(self, crash_at=None):
+        super().__init__()
+        self.crash_at = crash_at
+        self.fetched = 0
+
+    def fetch(self, url):
+        if self.crash_at is not None and url.endswith(f"/{self.crash_at}"):
+            raise Crash(url)
+        self.fetched += 1
+        return super().fetch(url)
+
+
+def write_fixtures(path):
+    for page, html in enumerate(synthetic_pages(N_PAGES, per_page=5), start=1):
+        page_dir = os.path.join(path, CITY, "default-desc")
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, str(page)), "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+def crawl(out_dir, base_url, crash_at=None):
+    return crawl_city(CITY, CountingFetcher(crash_at), out_dir, base_url, log=lambda *a: None)
+
+
+def final_csv(out_dir):
+    return os.path.join(out_dir, f"{CITY}_buy_properties.csv")
+
+
+def interrupted_mid_city(base_url, reference, out_dir):
+    """第 4 頁中斷 → 重跑從第 4 頁續抓"""
+    try:
+        crawl(out_dir, base_url, crash_at=4)
+    except Crash:
+        pass
+    crawl(out_dir, base_url)
+    return filecmp.cmp(final_csv(out_dir), reference, shallow=False)
+
+
+def crash_before_rename(base_url, reference, out_dir):
+    """done 已寫入、改名前中斷 → 重跑只補做改名"""
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if src.endswith(".part"):
+            raise Crash(src)
+        return real_replace(src, dst)
+
+    with mock.patch.object(scrape_runner.os, "replace", replace):
+        try:
+            crawl(out_dir, base_url)
+        except Crash:
+            pass
+    fetcher = CountingFetcher()
+    crawl_city(CITY, fetcher, out_dir, base_url, log=lambda *a: None)
+    return fetcher.fetched == 0 and filecmp.cmp(final_csv(out_dir), reference, shallow=False)
+
+
+def missing_part(base_url, reference, out_dir):
+    """正式 CSV 已存在、part 檔不見但 checkpoint 還有 offset → 重新抓取，不能用補零的檔案蓋掉"""
+    crawl(out_dir, base_url)
+    CityCheckpoint(out_dir, CITY).save(next_page=N_PAGES + 1, offset=os.path.getsize(reference),
+                                       rows=N_PAGES * 5, done=False)
+    crawl(out_dir, base_url)
+    return filecmp.cmp(final_csv(out_dir), reference, shallow=False)
+
+
+def next_run_refetches(base_url, reference, out_dir):
+    """整輪完成後 checkpoint 清掉 → 下一輪重新抓取"""
+    fetchers = []
+
+    def make_fetcher():
+        fetchers.append(CountingFetcher())
+        return fetchers[-1]
+
+    with mock.patch.dict(scrape_runner.FETCHERS, {"http": make_fetcher}):
+        for _ in range(2):
+            run([CITY], out_dir, workers=1, fetcher="http", base_url=base_url, log=lambda *a: None, rate=1000)
+    return len(fetchers) == 2 and all(f.fetched > 0 for f in fetchers) and \
+        filecmp.cmp(final_csv(out_dir), reference, shallow=False)
+
+
+CASES = [interrupted_mid_city, crash_before_rename, missing_part, next_run_refetches]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, "fixtures")
+        write_fixtures(fixtures)
+        server, base_url = serve_directory(fixtures)
+        try:
+            ref_dir = os.path.join(tmp, "reference")
+            crawl(ref_dir, base_url)
+            reference = final_csv(ref_dir)
+            ok = True
+            for case in CASES:
+                passed = case(base_url, reference, os.path.join(tmp, case.__name__))
+                ok &= passed
+                print(f"{'✅' if passed else '❌'} {case.__name__}：{case.__doc__.strip()}")
+        finally:
+            server.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import streamlit as st
+from utils import get_city_options
+from services.price_history import (
+    ALL_DISTRICTS, METRIC_LABELS, city_of, history_cities, load_aggregates, weekly_trends,
+)
+
+
+def tab3_module():
+    """市場趨勢分析：各行政區每週的單價、物件數、刊登天數與降價比例"""
+    st.subheader("📈 市場趨勢分析")
+
+    cities = history_cities()
+    if not cities:
+        st.info("📭 尚無歷史快照，請在每次更新資料後執行 `python -m services.price_history`")
+        return
+
+    # 英文資料夾名稱 -> 中文城市名（沒有對照的直接顯示英文）
+    labels = {city_of(f): name for name, f in get_city_options().items()}
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        city = st.selectbox("城市", cities, format_func=lambda c: labels.get(c, c), key="trend_city")
+        metric = st.selectbox("指標", list(METRIC_LABELS), format_func=METRIC_LABELS.get, key="trend_metric")
+
+    snapshots = load_aggregates(city)
+    districts = sorted(d for d in snapshots["district"].unique() if d != ALL_DISTRICTS)
+    with c2:
+        selected = st.multiselect("行政區", [ALL_DISTRICTS] + districts, default=[ALL_DISTRICTS],
+                                  key="trend_districts")
+    if not selected:
+        st.info("請至少選擇一個行政區")
+        return
+
+    weekly = weekly_trends(city, selected)
+    chart = weekly.pivot(index="week", columns="district", values=metric)
+    st.line_chart(chart, y_label=METRIC_LABELS[metric])
+
+    first, last = snapshots["date"].min(), snapshots["date"].max()
+    st.caption(f"共 {snapshots['date'].nunique()} 次快照（{first:%Y-%m-%d} ~ {last:%Y-%m-%d}），"
+               f"每週取最後一次快照；新上架、下架、降價為當週加總")
+
+    latest = weekly.sort_values("week").groupby("district").tail(1).set_index("district")
+    cols = st.columns(min(len(latest), 4))
+    for i, (district, row) in enumerate(latest.iterrows()):
+        with cols[i % len(cols)]:
+            price = row["median_unit_price"]
+            st.metric(district, f"{price:,.0f} 元/坪" if price == price else "—",
+                      help=f"物件 {row['count']:,.0f} 筆｜刊登天數中位數 {row['median_days_on_market']:.0f} 天｜"
+                           f"降價比例 {row['price_cut_rate']:.1f}%")
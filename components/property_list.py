@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 from utils import display_pagination
+from services.sort_index import SORT_FIELDS, get_sort_index
+from services.district_cube import DIMENSIONS, describe, get_district_cube
+from services.accessibility import describe_row, has_accessibility
 
 def render_property_list():
     """
@@ -10,26 +13,61 @@ def render_property_list():
     if 'favorites' not in st.session_state:
         st.session_state.favorites = set()
         
-    if 'filtered_df' not in st.session_state or st.session_state.filtered_df.empty:
+    if 'results' not in st.session_state or len(st.session_state.results) == 0:
         return
     
-    df = st.session_state.filtered_df
+    # CSV 更新後依原條件重新篩選（列號才會對到新資料）
+    results = st.session_state.results = st.session_state.results.fresh()
     search_params = st.session_state.search_params
+
+    # 排序（只在條件改變時重排一次，換頁直接切片）
+    results = st.session_state.results = render_sort_controls(results)
     
-    # 使用分頁功能
-    current_page_data, current_page, total_pages, total_items = display_pagination(df, items_per_page=10)
+    # 使用分頁功能（只從共用資料取出當前頁的列）
+    current_page_data, current_page, total_pages, total_items = display_pagination(results, items_per_page=10)
     
     # 顯示結果統計和篩選條件
     st.subheader(f"🏠 {search_params['city']}房產列表")
     
+    # 行政區統計方塊（列索引即資料列號，直接查表不用重新掃描）
+    cube = get_district_cube(search_params['file_path']) if search_params.get('file_path') else None
+
     # 顯示當前頁面的資料
     for idx, (index, row) in enumerate(current_page_data.iterrows()):
-        render_property_card(row, current_page, idx)
+        render_property_card(row, current_page, idx, cube)
     
     # 渲染分頁控制按鈕
     render_pagination_controls(current_page, total_pages, total_items)
 
-def render_property_card(row, current_page, idx):
+def render_sort_controls(results):
+    """
+    排序方式：主要欄位 + 方向，可再選一個次要欄位
+    回傳排序後的 ResultSet
+    """
+    fields = get_sort_index(results.file_path).available()
+    default_label = "預設順序"
+    labels = [default_label] + [SORT_FIELDS[k] for k in fields]
+    col1, col2, col3 = st.columns([2, 1, 2])
+    with col1:
+        primary = st.selectbox("排序方式", labels, key="sort_primary")
+    with col2:
+        descending = st.radio("方向", ["低→高", "高→低"], key="sort_direction", horizontal=True) == "高→低"
+    with col3:
+        secondary = st.selectbox("次要排序（低→高）", [default_label] + [l for l in labels[1:] if l != primary],
+                                 key="sort_secondary", disabled=(primary == default_label))
+
+    key_of = {label: k for k, label in SORT_FIELDS.items()}
+    sort = []
+    if primary != default_label:
+        sort.append((key_of[primary], descending))
+        if secondary != default_label:
+            sort.append((key_of[secondary], False))
+    sorted_results = results.sorted(sort)
+    if sorted_results is not results:
+        st.session_state.current_search_page = 1
+    return sorted_results
+
+def render_property_card(row, current_page, idx, cube=None):
     """
     渲染單個房產卡片
     """
@@ -52,6 +90,9 @@ def render_property_card(row, current_page, idx):
             if pd.notna(row['建坪']) and row['建坪'] > 0:
                 unit_price = (row['總價(萬)'] * 10000) / row['建坪']
                 st.caption(f"單價: ${unit_price:,.0f}/坪")
+            if cube is not None:
+                render_district_compare(cube, row.name)
+                render_walk_score(cube.dataset, row.name)
 
         
         col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 1, 1, 1, 1, 1, 1])
@@ -75,6 +116,29 @@ def render_property_card(row, current_page, idx):
 
         st.markdown("---")
 
+def render_district_compare(cube, pos):
+    """顯示與同區同類型物件的單價比較"""
+    key, dims, stats = cube.for_row(pos)
+    if not stats:
+        return
+    median = stats['unit_price_median']
+    unit_price = cube.unit_price[pos]
+    scope = " ".join(str(v) for d, v in zip(DIMENSIONS, key) if d in dims) or "全市"
+    if pd.notna(unit_price) and median > 0:
+        diff = (unit_price - median) / median * 100
+        st.caption(f"{'🔺' if diff >= 0 else '🔻'} {scope} 中位數 ${median:,.0f}/坪（{diff:+.0f}%）",
+                   help=describe(key, dims, stats, unit_price))
+
+def render_walk_score(dataset, pos):
+    """顯示預先算好的步行機能分數"""
+    if not has_accessibility(dataset):
+        return
+    score = dataset.columns['walk_score'][pos]
+    if pd.notna(score):
+        st.caption(f"🚶 步行機能 {score:.0f} 分", help=describe_row(dataset, pos))
+    else:
+        st.caption("🚶 步行機能 未知", help="此物件沒有座標，或附近的生活機能資料不完整")
+
 def render_pagination_controls(current_page, total_pages, total_items):
     """
     渲染分頁控制按鈕
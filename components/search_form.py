@@ -1,10 +1,14 @@
 import os
 import re
 import json
-import pandas as pd
 import streamlit as st
-import google.generativeai as genai
-from utils import filter_properties  # 確認你已改寫 filter_properties() 支援 rooms/living_rooms/bathrooms/floor
+from services.listing_store import load_dataset
+from services.accessibility import attach_accessibility, has_accessibility
+from services.poi_store import PLACE_TYPES
+from services.gemini_client import generate as gemini_generate
+from services.request_parser import parse_special_requests
+from services.result_set import search
+from utils import get_city_options
 
 def render_search_form():
     """ 渲染搜尋表單並處理提交邏輯 """
@@ -17,6 +21,7 @@ def render_search_form():
         with col1:
             selected_label = st.selectbox("請選擇城市：", list(options.keys()))
             housetype_change = st.selectbox("請選擇房產類別：", housetype, key="housetype")
+            keyword = st.text_input("🔎關鍵字（標題、地址）", placeholder="例：西屯 捷運 三房", key="keyword")
         with col2:
             budget_max = st.number_input("💰預算上限(萬)", min_value=0, max_value=1000000, value=1000000, step=100)
             budget_min = st.number_input("💰預算下限(萬)", min_value=0, max_value=1000000, value=0, step=100)
@@ -39,6 +44,13 @@ def render_search_form():
         with col3:
             car_grip = st.selectbox("🅿️車位選擇", ["不限", "需要", "不要"], key="car_grip")
 
+        st.subheader("🚶生活機能")
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            walk_score_min = st.slider("步行機能分數下限", min_value=0, max_value=100, value=0, step=5)
+        with col2:
+            near_categories = st.multiselect("500 公尺內需要有", list(PLACE_TYPES.keys()), key="near_categories")
+
         st.subheader("🛠️特殊要求（可輸入文字，如：一房二廳一衛以上，低樓層）")
         Special_Requests = st.text_area("特殊要求", placeholder="例：一房二廳一衛以上，低樓層")
 
@@ -50,7 +62,7 @@ def render_search_form():
             return handle_search_submit(
                 selected_label, options, housetype_change,
                 budget_min, budget_max, age_min, age_max, area_min, area_max, car_grip,
-                Special_Requests
+                Special_Requests, walk_score_min, near_categories, keyword
             )
     return None
 
@@ -81,6 +93,10 @@ def _normalize_value(val):
     # 若已是數字型態
     if isinstance(val, (int, float)):
         return int(val)
+    # 已是區間 dict（提示詞範例的樓層格式）
+    if isinstance(val, dict):
+        bounds = {k: int(val[k]) for k in ("min", "max") if isinstance(val.get(k), (int, float))}
+        return bounds or None
     s = str(val).strip()
     if s == '':
         return None
@@ -142,8 +158,64 @@ def _normalize_parsed_req(parsed: dict):
 
     return out
 
+def _gemini_parse_requests(text, gemini_key):
+    """本機解析不完整時才呼叫：請 Gemini 把特殊要求轉成 JSON，回傳正規化後的 dict"""
+    try:
+        # 強調只回傳純 JSON，並給範例
+        prompt = f"""
+        請將下列房產需求解析為**純 JSON**（不要任何說明文字，只回傳 JSON）：
+        \"\"\"{text}\"\"\"
+        JSON 欄位請包含（若無則省略）：房間數、廳數、衛數、樓層。
+        範例輸出：
+        {{
+          "房間數": 2,
+          "廳數": 1,
+          "衛數": 1,
+          "樓層": {{"min": 1, "max": 5}}
+        }}
+        注意：請使用英文冒號和逗號，並確保回傳能被機器解析（valid JSON）。
+        """
+        resp_text = gemini_generate(gemini_key, prompt).strip()
+
+        # 將原始回傳放在 expander 以便 debug（若回傳格式有問題使用者能看到）
+        with st.expander("🔎 Gemini 回傳（debug）", expanded=False):
+            st.code(resp_text)
+
+        # 嘗試直接解析，若失敗嘗試用正則擷取 JSON
+        parsed_obj = None
+        try:
+            parsed_obj = json.loads(resp_text)
+        except Exception:
+            json_text = _extract_json_text(resp_text)
+            if json_text:
+                # 嘗試修正中文標點再解析
+                json_text_fixed = json_text.replace('：', ':').replace('，', ',').replace('、', ',')
+                try:
+                    parsed_obj = json.loads(json_text_fixed)
+                except Exception:
+                    # 若仍失敗，嘗試小幅替換全形數字/符號再解析（最後嘗試）
+                    json_text_fixed2 = json_text_fixed.replace('“', '"').replace('”', '"').replace("'", '"')
+                    try:
+                        parsed_obj = json.loads(json_text_fixed2)
+                    except Exception:
+                        parsed_obj = None
+
+        if parsed_obj and isinstance(parsed_obj, (dict, list)):
+            # 如果是 list 且第一個元素為 dict，取第一個 dict
+            if isinstance(parsed_obj, list) and len(parsed_obj) > 0 and isinstance(parsed_obj[0], dict):
+                parsed_obj = parsed_obj[0]
+            if isinstance(parsed_obj, dict):
+                return _normalize_parsed_req(parsed_obj)
+        else:
+            # 若沒解析到有效 JSON，就給使用者提醒（但不停止流程）
+            st.warning("⚠️ Gemini 回傳的結果無法解析為 JSON，只使用本機解析到的條件。")
+    except Exception as e:
+        st.error(f"❌ Gemini 解析特殊要求失敗: {e}")
+    return {}
+
 def handle_search_submit(selected_label, options, housetype_change, budget_min, budget_max,
-                         age_min, age_max, area_min, area_max, car_grip, Special_Requests):
+                         age_min, age_max, area_min, area_max, car_grip, Special_Requests,
+                         walk_score_min=0, near_categories=(), keyword=""):
     """ 處理搜尋表單提交（改寫：加入 Gemini 回應解析容錯） """
     valid_input = True
     if budget_min > budget_max and budget_max > 0:
@@ -164,7 +236,10 @@ def handle_search_submit(selected_label, options, housetype_change, budget_min,
     file_path = os.path.join("./Data", selected_file)
 
     try:
-        df = pd.read_csv(file_path)
+        # 從行程共用快取取得型別化資料（CSV 只在更新後重新轉檔）
+        dataset = load_dataset(file_path)
+        # 預先算好的生活機能指標（有的話併入欄位，供篩選與排序）
+        attach_accessibility(file_path)
 
         # 先處理基本篩選
         filters = {
@@ -175,69 +250,24 @@ def handle_search_submit(selected_label, options, housetype_change, budget_min,
             'age_max': age_max,
             'area_min': area_min,
             'area_max': area_max,
-            'car_grip': car_grip
+            'car_grip': car_grip,
+            'walk_score_min': walk_score_min,
+            'near': {cat: 500 for cat in near_categories},
+            'keyword': keyword.strip(),
         }
+        if (walk_score_min > 0 or near_categories) and not has_accessibility(dataset):
+            st.warning("⚠️ 尚未計算生活機能指標（python -m services.accessibility），已忽略生活機能條件")
 
-        # 若有特殊要求，交給 Gemini 解析
-        parsed_req = {}
+        # 特殊要求：先用本機規則解析，解析不完整時才交給 Gemini
+        parsed_req, covered = parse_special_requests(Special_Requests)
         gemini_key = st.session_state.get("GEMINI_KEY", "")
-        if Special_Requests.strip() and gemini_key:
-            try:
-                genai.configure(api_key=gemini_key)
-                model = genai.GenerativeModel("gemini-2.0-flash")
-                # 強調只回傳純 JSON，並給範例
-                prompt = f"""
-                請將下列房產需求解析為**純 JSON**（不要任何說明文字，只回傳 JSON）：
-                \"\"\"{Special_Requests}\"\"\"
-                JSON 欄位請包含（若無則省略）：房間數、廳數、衛數、樓層。
-                範例輸出：
-                {{
-                  "房間數": 2,
-                  "廳數": 1,
-                  "衛數": 1,
-                  "樓層": {{"min": 1, "max": 5}}
-                }}
-                注意：請使用英文冒號和逗號，並確保回傳能被機器解析（valid JSON）。
-                """
-                response = model.generate_content(prompt)
-                resp_text = (response.text or "").strip()
-
-                # 將原始回傳放在 expander 以便 debug（若回傳格式有問題使用者能看到）
-                with st.expander("🔎 Gemini 回傳（debug）", expanded=False):
-                    st.code(resp_text)
-
-                # 嘗試直接解析，若失敗嘗試用正則擷取 JSON
-                parsed_obj = None
-                try:
-                    parsed_obj = json.loads(resp_text)
-                except Exception:
-                    json_text = _extract_json_text(resp_text)
-                    if json_text:
-                        # 嘗試修正中文標點再解析
-                        json_text_fixed = json_text.replace('：', ':').replace('，', ',').replace('、', ',')
-                        try:
-                            parsed_obj = json.loads(json_text_fixed)
-                        except Exception:
-                            # 若仍失敗，嘗試小幅替換全形數字/符號再解析（最後嘗試）
-                            json_text_fixed2 = json_text_fixed.replace('“', '"').replace('”', '"').replace("'", '"')
-                            try:
-                                parsed_obj = json.loads(json_text_fixed2)
-                            except Exception:
-                                parsed_obj = None
-
-                if parsed_obj and isinstance(parsed_obj, (dict, list)):
-                    # 如果是 list 且第一個元素為 dict，取第一個 dict
-                    if isinstance(parsed_obj, list) and len(parsed_obj) > 0 and isinstance(parsed_obj[0], dict):
-                        parsed_obj = parsed_obj[0]
-                    if isinstance(parsed_obj, dict):
-                        parsed_req = _normalize_parsed_req(parsed_obj)
-                else:
-                    # 若沒解析到有效 JSON，就給使用者提醒（但不停止流程）
-                    st.warning("⚠️ Gemini 回傳的結果無法解析為 JSON，我們會忽略特殊要求並只用基本篩選。")
-            except Exception as e:
-                st.error(f"❌ Gemini 解析特殊要求失敗: {e}")
-                # 若需要更多 debug，可以在這裡記錄或顯示
-                parsed_req = {}
+        if not covered and gemini_key:
+            # 本機已解析到的欄位當預設值，Gemini 有回傳的欄位為準
+            parsed_req = {**parsed_req, **_gemini_parse_requests(Special_Requests, gemini_key)}
+        elif not covered:
+            st.info("ℹ️ 部分特殊要求無法在本機解析，設定 Gemini API Key 後可解析更多寫法")
+        if parsed_req:
+            st.caption(f"📝 特殊要求解析結果：{json.dumps(parsed_req, ensure_ascii=False)}")
 
         # 合併到篩選條件
         if parsed_req.get("rooms") is not None:
@@ -249,24 +279,26 @@ def handle_search_submit(selected_label, options, housetype_change, budget_min,
         if parsed_req.get("floor") is not None:
             filters["floor"] = parsed_req["floor"]
 
-        # 執行篩選（使用你原本的 filter_properties）
-        filtered_df = filter_properties(df, filters)
-        st.session_state.filtered_df = filtered_df
+        # 執行篩選（型別化欄位上一次算出遮罩）；session 只存列號與條件，資料由行程共用
+        results = search(file_path, filters)
+        st.session_state.results = results
         st.session_state.search_params = {
             'city': selected_label,
+            'file_path': file_path,
             'housetype': housetype_change,
             'budget_range': f"{budget_min}-{budget_max}萬" if budget_max < 1000000 else f"{budget_min}萬以上",
             'age_range': f"{age_min}-{age_max}年" if age_max < 100 else f"{age_min}年以上",
             'area_range': f"{area_min}-{area_max}坪" if area_max < 1000 else f"{area_min}坪以上",
             'car_grip': car_grip,
-            'original_count': len(df),
-            'filtered_count': len(filtered_df)
+            'keyword': keyword.strip(),
+            'original_count': len(dataset),
+            'filtered_count': len(results)
         }
 
-        if len(filtered_df) == 0:
+        if len(results) == 0:
             st.warning("😅 沒有找到符合條件的房產，請調整篩選條件後重新搜尋")
         else:
-            st.success(f"✅ 從 {len(df)} 筆資料中篩選出 {len(filtered_df)} 筆符合條件的房產")
+            st.success(f"✅ 從 {len(dataset)} 筆資料中篩選出 {len(results)} 筆符合條件的房產")
         return True
 
     except FileNotFoundError:
@@ -1,37 +1,39 @@
 import streamlit as st
 import pandas as pd
-import google.generativeai as genai
-import hnswlib
-from sentence_transformers import SentenceTransformer
 import os
-import numpy as np
+from services.listing_store import load_dataset
+from services.similar_index import peek_similar_index, row_to_text
+from services.comparables import get_comparables_engine
+from services.favorites_batch import submit_favorites, get_favorite_stats, compute_favorite_stats
+from services.district_cube import get_district_cube
+from services.gemini_client import generate as gemini_generate
+from services.result_set import rows_for_ids, city_file_path
 
-# 在檔案開頭,name_map 下方加入反向對照表
-name_map = {
-    "Taichung-city_buy_properties.csv": "台中市",
-    "Taipei-city_buy_properties.csv": "台北市"
-}
-
-# 建立反向對照表:中文 -> 英文檔名
-reverse_name_map = {v: k for k, v in name_map.items()}
+# 文字索引（HNSW）先找多少個候選，再用數值特徵 + 文字向量重新排序
+TEXT_CANDIDATES = 50
 
 def get_favorites_data():
     """取得收藏房產的資料"""
     if 'favorites' not in st.session_state or not st.session_state.favorites:
         return pd.DataFrame()
     
-    all_df = None
-    if 'all_properties_df' in st.session_state and not st.session_state.all_properties_df.empty:
-        all_df = st.session_state.all_properties_df
-    elif 'filtered_df' in st.session_state and not st.session_state.filtered_df.empty:
-        all_df = st.session_state.filtered_df
-    
-    if all_df is None or all_df.empty:
-        return pd.DataFrame()
-    
-    fav_ids = st.session_state.favorites
-    fav_df = all_df[all_df['編號'].isin(fav_ids)].copy()
-    return fav_df
+    # 依編號從共用的城市資料取出（不需要 session 保存整份結果）
+    return rows_for_ids(st.session_state.favorites)
+
+def _fmt(value, spec):
+    """數值格式化；缺值（NaN）顯示「—」"""
+    return "—" if pd.isna(value) else format(value, spec)
+
+
+def _format_stats(stats):
+    """預先算好的統計轉成文字（畫面與提示詞共用）"""
+    return (
+        f"{stats['district'] or '—'} 建坪單價中位數 {_fmt(stats['district_median_unit_price'], ',.0f')} 元/坪，"
+        f"本物件位於第 {_fmt(stats['district_percentile'], '.0f')} 百分位；"
+        f"比較物件單價中位數 {_fmt(stats['comps_median_unit_price'], ',.0f')} 元/坪，"
+        f"偏離 {_fmt(stats['deviation'], '+.1%')}"
+    )
+
 
 def tab1_module():
     fav_df = get_favorites_data()
@@ -48,6 +50,21 @@ def tab1_module():
         # 篩選出選中的房子
         selected_row = fav_df[fav_df['標題'] == choice].iloc[0]
 
+        # 背景一次算好所有收藏的比較物件與行政區統計（依城市分組）
+        for city, group in fav_df.groupby(fav_df['地址'].astype(str).str[:3]):
+            city_path = city_file_path(city)
+            if city_path:
+                submit_favorites(city_path, group['編號'])
+        selected_path = city_file_path(selected_row.get('地址'))
+        stats = get_favorite_stats(selected_path, selected_row['編號']) if selected_path else None
+        # 同區同類型的價格分布（預先算好的統計方塊，O(1) 查表）
+        cube_text = ""
+        if selected_path:
+            city_cube = get_district_cube(selected_path)
+            cube_pos = city_cube.dataset.find([selected_row['編號']])
+            if len(cube_pos):
+                cube_text = city_cube.describe_row(cube_pos[0])
+
         # 顯示卡片，標題直排，詳細資訊橫排
         st.markdown(f"""
         <div style="
@@ -110,6 +127,7 @@ def tab1_module():
             </div>
             """, unsafe_allow_html=True)
             st.write("\n")
+            use_text = st.checkbox("結合文字語意比對", value=False, key="solo_use_text")
             analyze_clicked = st.button("開始分析", use_container_width=True, key="solo_analysis_button")
         with col2:
             st.markdown(f"""
@@ -135,6 +153,10 @@ def tab1_module():
                 </div>
             </div>
             """, unsafe_allow_html=True)
+            if stats:
+                st.caption(f"📊 {_format_stats(stats)}")
+            if cube_text:
+                st.caption(f"🏘️ {cube_text}")
             
             st.write("\n")
             chart_clicked = st.button("可視化圖表分析", use_container_width=True, key="chart_analysis_button")
@@ -146,68 +168,54 @@ def tab1_module():
                 st.error("❌ 右側 gemini API Key 有誤")
                 st.stop()
             try:
-                genai.configure(api_key=gemini_key)
-                model = genai.GenerativeModel("gemini-2.0-flash")
+                file_path = selected_path
+                dataset = load_dataset(file_path)
+                df = dataset.frame
+                house_id = str(selected_row.get('編號', '')).strip()
 
-                address = selected_row.get('地址')
-                city = address[:3]
-                
-                # 轉換成英文檔名
-                english_filename = reverse_name_map.get(city)
-                file_path = os.path.join("./Data", english_filename)
-                
-                # 讀取 CSV 檔案
-                df = pd.read_csv(file_path)
-                house_title = str(selected_row.get('標題','')).strip()
-                # 根據標題篩選房型
-                selected_row = df[df['標題'] == house_title].iloc[0]
+                with st.spinner("正在查詢相似房屋..."):
+                    # 以數值特徵（單價、坪數、屋齡、格局、樓層、行政區）找同類型的比較物件
+                    engine = get_comparables_engine(file_path)
+                    if stats is None:
+                        # 背景批次還沒算完就直接算這一筆
+                        stats = get_favorite_stats(file_path, house_id) or \
+                            compute_favorite_stats(dataset, engine, [house_id]).get(house_id)
 
-                embed_model = SentenceTransformer('all-MiniLM-L6-v2')
-                with st.spinner("正在將資料進行向量化處理..."):
-                    def row_to_text(row):
-                        """將每列資料轉為文字描述"""
-                        return (
-                            f"地址:{row['地址']}, 建坪:{row['建坪']}, 主+陽:{row['主+陽']}, "
-                            f"總價:{row['總價(萬)']}萬, 屋齡:{row['屋齡']}, 類型:{row['類型']}, "
-                            f"格局:{row['格局']}, 樓層:{row['樓層']}, 車位:{row['車位']}"
-                        )
-                    texts = df.apply(row_to_text, axis=1).tolist()
-                    embeddings = embed_model.encode(texts, show_progress_bar=True)
-                    embeddings = np.array(embeddings).astype('float32')
-    
-                    dimension = embeddings.shape[1]
-                    num_elements = len(embeddings)
-                    
-                    # 初始化索引
-                    index = hnswlib.Index(space='l2', dim=dimension)
-                    
-                    # 建立索引（ef_construction 越大越精確但越慢）
-                    index.init_index(max_elements=num_elements, ef_construction=200, M=16)
-    
-                    index.add_items(embeddings, np.arange(num_elements))
-                    
-                    # 設定查詢參數（ef 越大越精確）
-                    index.set_ef(50)
-    
-                    # 找到選中房屋的索引
-                    selected_idx = df[df['標題'] == house_title].index[0]
+                    top_k = 10
+                    selected_pos = dataset.find([house_id])
+                    if len(selected_pos) == 0:
+                        st.error("❌ 找不到此房屋的資料")
+                        st.stop()
+                    comp_rows = None
+                    if use_text:
+                        # 預先建立的文字索引；還沒建好時在背景建立，這次先只用數值特徵
+                        index = peek_similar_index(file_path)
+                        if index is None:
+                            st.info("ℹ️ 文字索引建立中，這次先以數值特徵比較，稍後再試即可結合文字語意")
+                        else:
+                            # HNSW 找出文字最相近的候選，再融合數值特徵重新排序
+                            cand_rows = dataset.find(index.query(house_id, k=TEXT_CANDIDATES))
+                            comp_rows, _ = engine.rerank(
+                                selected_pos[0], cand_rows,
+                                index.vectors_for([house_id] + list(df['編號'].iloc[cand_rows])),
+                                k=top_k, text_weight=0.5, same_type=True,
+                            )
+                    if comp_rows is None or len(comp_rows) == 0:
+                        if stats:
+                            # 直接使用預先算好的比較物件
+                            comp_rows = dataset.find(stats['comps'][:top_k])
+                        else:
+                            rows, _ = engine.query(selected_pos, k=top_k, same_type=True)
+                            comp_rows = rows[0][rows[0] >= 0]
+
+                    # 取得相似房屋資料
+                    relevant_data = df.iloc[comp_rows].to_dict("records")
                     selected_text = row_to_text(selected_row)
-                    query_vec = embeddings[selected_idx:selected_idx+1]
-                    
-                    # 查詢相似房屋（包含自己，所以查 11 筆）
-                    top_k = 11
-                    labels, distances = index.knn_query(query_vec, k=top_k)
-    
-                    # 取得相似房屋資料（過濾掉自己）
-                    relevant_data = []
-                    for i, (idx, dist) in enumerate(zip(labels[0], distances[0])):
-                        if idx != selected_idx:
-                            house_data = df.iloc[idx].to_dict()
-                            relevant_data.append(house_data)
-                    
+
                     # 準備文字輸入
                     selected_text_display = f"{selected_row['標題']} - {selected_text}"
                     relevant_text = "\n".join([f"{r['標題']} - {row_to_text(r)}" for r in relevant_data])
+                    stats_text = "\n".join(t for t in [_format_stats(stats) if stats else "", cube_text] if t) or "（無）"
                     
                     # 組合提示詞
                     prompt = f"""
@@ -220,17 +228,20 @@ def tab1_module():
                     相似房屋資料：
                     {relevant_text}
                     
+                    已計算的市場統計（請以這些數字為準）：
+                    {stats_text}
+                    
                     請分析價格合理性、坪數與屋齡，提供購買建議，避免編造不存在的數字。
                     """
                 
                 with st.spinner("Gemini 正在分析中..."):
-                    response = model.generate_content(prompt)
+                    analysis_text = gemini_generate(gemini_key, prompt)
         
                 st.success("✅ 分析完成")
                 st.markdown("### 🧠 **Gemini 市場分析結果**")
                 
                 # 顯示 Gemini 分析結果
-                st.markdown(response.text)
+                st.markdown(analysis_text)
                 
                 with st.expander("相似房型資料"):
                     if relevant_data:
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+以 編號 為 key 的增量同步
+
+    python download_data/delta_sync.py --cities Taichung-city --fetcher http
+    python download_data/delta_sync.py --cities Taichung-city --full     # 完整掃描，順便找出已下架物件
+
+依 default-desc 順序逐頁抓取，和 Data/<城市>_buy_properties.csv 比對：
+新物件、價格變動、其他欄位變動都記進 changelog；連續遇到 stop_after 筆
+已存在且沒變的 編號 就停止（後面的頁面視為沒有變化）。
+提早停止時看不到後面的物件，所以「下架」只在 --full 完整掃描時判斷。
+
+changelog 以 JSON Lines 存在 Data/.changelog/<城市>.jsonl（只增不改，僅供稽核查詢），
+套用後以暫存檔 + 改名的方式更新 CSV；App 端的索引依 CSV 的 編號 與內容雜湊自行增量更新。
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from listing_parser import FIELDNAMES, parse_listing_page
+from scrape_runner import BASE_URL, FETCHERS, PageNotFound, RETRYABLE, fetch_page
+from fetch_control import TokenBucket, RetryPolicy
+
+STOP_AFTER = 40
+
+
+def _clean(row):
+    return {k: str(row.get(k, "") or "").strip() for k in FIELDNAMES}
+
+
+def load_known(csv_path):
+    """讀取目前的資料：回傳 (編號 -> 資料列 的 dict，依原始順序)"""
+    known = {}
+    if not os.path.exists(csv_path):
+        return known
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            row = _clean(row)
+            known.setdefault(row["編號"], row)
+    return known
+
+
+def _same_price(a, b):
+    try:
+        return float(a) == float(b)
+    except ValueError:
+        return a == b
+
+
+def diff_row(old, new):
+    """比對同一 編號 的新舊資料：None（沒變）/ new / price_changed / changed"""
+    if old is None:
+        return "new"
+    if not _same_price(old["總價(萬)"], new["總價(萬)"]):
+        return "price_changed"
+    if any(old[k] != new[k] and k != "總價(萬)" for k in FIELDNAMES):
+        return "changed"
+    return None
+
+
+def _change(kind, row, old=None):
+    entry = {"ts": time.time(), "op": "delete" if kind == "delisted" else "upsert",
+             "kind": kind, "編號": row["編號"], "row": row}
+    if kind == "price_changed":
+        entry["old_price"] = old["總價(萬)"]
+        entry["new_price"] = row["總價(萬)"]
+    return entry
+
+
+def crawl_changes(city, fetcher, known, base_url=BASE_URL, stop_after=STOP_AFTER, full=False,
+                  limiter=None, retry=None, log=print):
+    """
+    逐頁抓取並產生 changelog（list of dict）
+    full=False 時連續 stop_after 筆沒變就停止；full=True 會抓完並找出下架物件
+    """
+    changes, seen = [], set()
+    unchanged_run = 0
+    page = 1
+    while True:
+        url = f"{base_url}/{city}/default-desc/{page}"
+        try:
+            rows, has_items = parse_listing_page(fetch_page(fetcher, url, limiter, retry))
+        except PageNotFound:
+            rows, has_items = [], False
+        if not has_items:
+            break
+
+        for row in map(_clean, rows):
+            pid = row["編號"]
+            if pid in seen:
+                continue
+            seen.add(pid)
+            old = known.get(pid)
+            kind = diff_row(old, row)
+            if kind is None:
+                unchanged_run += 1
+            else:
+                unchanged_run = 0
+                changes.append(_change(kind, row, old))
+
+        log(f"[{city}] 第 {page} 頁：累計 {len(changes)} 筆變動")
+        if not full and unchanged_run >= stop_after:
+            log(f"[{city}] 連續 {unchanged_run} 筆沒有變動，停止掃描")
+            break
+        page += 1
+
+    if full:
+        changes.extend(_change("delisted", row) for pid, row in known.items() if pid not in seen)
+    return changes
+
+
+def apply_changelog(csv_path, changes):
+    """
+    把 changelog 套用到 CSV：新物件放最前面、變動的就地更新、下架的移除
+    以暫存檔 + os.replace 寫入，讀取端不會看到寫一半的檔案
+    """
+    known = load_known(csv_path)
+    new_rows = []
+    for change in changes:
+        pid = change["編號"]
+        if change["op"] == "delete":
+            known.pop(pid, None)
+        elif pid in known:
+            known[pid] = change["row"]
+        else:
+            new_rows.append(change["row"])
+            known[pid] = None  # 佔位，避免同一批重複
+
+    tmp = csv_path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(new_rows)
+        writer.writerows(row for row in known.values() if row is not None)
+    os.replace(tmp, csv_path)
+
+
+def changelog_path(data_dir, city):
+    return os.path.join(data_dir, ".changelog", f"{city}.jsonl")
+
+
+def append_changelog(data_dir, city, changes):
+    """變動記錄附加到 changelog（稽核用，程式不會讀回）"""
+    path = changelog_path(data_dir, city)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for change in changes:
+            f.write(json.dumps(change, ensure_ascii=False) + "\n")
+
+
+def sync_city(city, fetcher, data_dir="./Data", base_url=BASE_URL, stop_after=STOP_AFTER, full=False,
+              limiter=None, retry=None, log=print):
+    """增量同步一個城市：抓變動 → 寫 changelog → 更新 CSV；回傳各類變動筆數"""
+    csv_path = os.path.join(data_dir, f"{city}_buy_properties.csv")
+    known = load_known(csv_path)
+    changes = crawl_changes(city, fetcher, known, base_url, stop_after, full, limiter, retry, log)
+    if changes:
+        append_changelog(data_dir, city, changes)
+        apply_changelog(csv_path, changes)
+    summary = {}
+    for change in changes:
+        summary[change["kind"]] = summary.get(change["kind"], 0) + 1
+    log(f"[{city}] 同步完成：{summary or '沒有變動'}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以 編號 為 key 的增量同步")
+    parser.add_argument("--cities", nargs="+", required=True)
+    parser.add_argument("--fetcher", choices=sorted(FETCHERS), default="selenium")
+    parser.add_argument("--data-dir", default="./Data")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--stop-after", type=int, default=STOP_AFTER, help="連續幾筆沒變動就停止")
+    parser.add_argument("--full", action="store_true", help="完整掃描並標記下架物件")
+    parser.add_argument("--rate", type=float, default=2.0)
+    args = parser.parse_args()
+
+    limiter = TokenBucket(rate=args.rate, burst=1)
+    retry = RetryPolicy(retry_on=RETRYABLE, log=print)
+    fetcher = FETCHERS[args.fetcher]()
+    try:
+        for city in args.cities:
+            sync_city(city, fetcher, args.data_dir, args.base_url, args.stop_after, args.full, limiter, retry)
+    finally:
+        fetcher.close()
+
+
+if __name__ == "__main__":
+    main()
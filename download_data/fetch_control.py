@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+爬蟲的節流與等待控制：
+- TokenBucket：所有抓取器共用的請求速率上限（被限流時自動降速，順利時慢慢回升）
+- RetryPolicy：單頁失敗時以指數退避 + 隨機抖動重試，而不是中止整個城市
+- wait_for_listing：取代固定的 time.sleep(2)，等到列表項目數量穩定（或出現查無物件）就立刻回傳
+"""
+import random
+import threading
+import time
+
+
+class PageTimeout(Exception):
+    """頁面在時限內沒有渲染完成"""
+
+
+class RateLimited(Exception):
+    """網站回應過載（429/503），需要降速"""
+
+
+class TokenBucket:
+    """
+    執行緒安全的 token bucket；rate 為每秒請求數，burst 為可累積的上限
+    penalize() 讓速率減半（不低於 min_rate），reward() 讓速率緩慢回升到 max_rate
+    """
+
+    def __init__(self, rate=2.0, burst=2, min_rate=0.2, max_rate=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate or rate)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """取得一個 token；不夠時等待到補滿為止"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self, step=0.05):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + step)
+
+
+class RetryPolicy:
+    """
+    call(fn) 失敗時重試 max_attempts 次，間隔 base_delay * 2^n（上限 max_delay）並加上抖動
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, retry_on=(Exception,), log=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.log = log
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, *args, on_retry=None, **kwargs):
+        for attempt in range(self.max_attempts):
+            try:
+                return fn(*args, **kwargs)
+            except self.retry_on as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                if on_retry:
+                    on_retry(e)
+                wait = self.delay(attempt)
+                if self.log:
+                    self.log(f"第 {attempt + 1} 次失敗（{e}），{wait:.1f} 秒後重試")
+                time.sleep(wait)
+
+
+# 列表最後一頁（沒有物件）時網站顯示的「查無物件」區塊；出現就不用等 empty_grace
+END_OF_LIST_SELECTOR = "div.buy-list-empty, div[class*='NoResult'], div[class*='noResult'], div[class*='NoData']"
+
+
+def wait_for_listing(driver, timeout=15, stable_polls=2, empty_grace=3.0, first_poll=0.1, max_poll=1.0,
+                     selector="div.buy-list-item", end_selector=END_OF_LIST_SELECTOR):
+    """
+    輪詢列表項目數量（間隔由 first_poll 逐次加倍到 max_poll）：
+    - 數量 > 0 且連續 stable_polls 次不變 → 渲染完成，回傳數量
+    - 沒有項目且出現 end_selector（查無物件）→ 空頁（最後一頁），立刻回傳 0
+    - 頁面已載入完成但持續 empty_grace 秒都沒有項目 → 也視為空頁，回傳 0
+      （end_selector 對不上實際頁面時的保底）
+    - 超過 timeout → PageTimeout
+    """
+    from selenium.webdriver.common.by import By
+
+    start = time.monotonic()
+    poll = first_poll
+    last_count, same = -1, 0
+    scrolled = False
+    empty_since = None
+    while True:
+        count = len(driver.find_elements(By.CSS_SELECTOR, selector))
+        now = time.monotonic()
+
+        if count > 0 and not scrolled:
+            # 滾到底觸發延遲載入的內容，之後繼續等數量穩定
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            scrolled = True
+        same = same + 1 if count == last_count else 0
+        last_count = count
+
+        if count > 0 and same >= stable_polls:
+            return count
+        if count == 0:
+            if driver.find_elements(By.CSS_SELECTOR, end_selector):
+                return 0
+            if driver.execute_script("return document.readyState") == "complete":
+                empty_since = now if empty_since is None else empty_since
+                if now - empty_since >= empty_grace:
+                    return 0
+            else:
+                empty_since = None
+        else:
+            empty_since = None
+        if now - start >= timeout:
+            raise PageTimeout(f"{timeout} 秒內列表未渲染完成（目前 {count} 筆）")
+        time.sleep(poll)
+        poll = min(max_poll, poll * 2)
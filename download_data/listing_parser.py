@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+列表頁解析：預設使用 lxml（XPath 只編譯一次），沒有安裝 lxml 時改用 BeautifulSoup
+兩種方式輸出完全相同，可用 backend="bs4" 強制使用舊的解析方式
+"""
+from bs4 import BeautifulSoup
+import re
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+# 輸出欄位（與 Data/*_buy_properties.csv 相同）
+FIELDNAMES = ['標題', '地址', '屋齡', '類型', '建坪', '主+陽', '格局', '樓層', '車位', '總價(萬)', '編號']
+
+NUMBER_RE = re.compile(r'[\d.]+')
+PRICE_RE = re.compile(r'[\d,.]+')
+HOUSE_ID_RE = re.compile(r'/buy/house/([A-Za-z0-9]+)')
+
+
+def _build_row(title, address_texts, info_texts, parking, price_text, href):
+    """把各欄位的原始文字整理成一筆資料（兩種解析方式共用）"""
+    address = address_texts[0] if len(address_texts) > 0 else ''
+    age = address_texts[1] if len(address_texts) > 1 else ''
+    if age == "--":
+        age = ""
+    house_type = address_texts[2] if len(address_texts) > 2 else ''
+
+    area = ""
+    if len(info_texts) > 0:
+        match = NUMBER_RE.search(info_texts[0])
+        area = match.group() if match else ""
+
+    Actual_space = ""
+    if len(info_texts) > 1:
+        match = NUMBER_RE.search(info_texts[1])
+        Actual_space = match.group() if match else ""
+
+    layout = info_texts[2] if len(info_texts) > 2 else ""
+    if layout == "--":
+        layout = ""
+    floor = info_texts[3] if len(info_texts) > 3 else ""
+    # 如果是 "--樓/--樓" 就改成空字串
+    if floor == "--樓/--樓":
+        floor = ""
+
+    Car_Grip = parking if parking else '無車位'
+
+    price = ""
+    if price_text is not None:
+        # 把數字轉乾淨
+        match = PRICE_RE.search(price_text)
+        price = match.group().replace(",", "") if match else ""
+
+    house_id = '無編號'
+    if href:
+        match = HOUSE_ID_RE.search(href)
+        if match:
+            house_id = match.group(1)
+
+    return {
+        '標題': title,
+        '地址': address,
+        '屋齡': age,
+        '類型': house_type,
+        '建坪': area,
+        '主+陽': Actual_space,
+        '格局': layout,
+        '樓層': floor,
+        '車位': Car_Grip,
+        '總價(萬)': price,
+        '編號': house_id
+    }
+
+
+# -----------------------------
+# lxml（快速）
+# -----------------------------
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if lxml is not None:
+    _XP_ITEMS = etree.XPath(f"//div[{_has_class('buy-list-item')}]")
+    _XP_TITLE = etree.XPath(f"(.//div[{_has_class('LongInfoCard_Type_Name')}])[1]")
+    _XP_ADDRESS_SPANS = etree.XPath(f"(.//div[{_has_class('LongInfoCard_Type_Address')}])[1]//span")
+    _XP_INFO_SPANS = etree.XPath(f"(.//div[{_has_class('longInfoCard_LongInfoCard_Type_HouseInfo__tZXDa')}])[1]//span")
+    _XP_PARKING = etree.XPath(f"(.//span[{_has_class('longInfoCard_LongInfoCard_Type_Parking__ZXl_e')}])[1]")
+    _XP_RED_PRICE = etree.XPath(
+        f"(.//div[{_has_class('LongInfoCard_Type_Right')}])[1]"
+        "//span[contains(@style, 'color: rgb(221, 37, 37)')]"
+    )
+    _XP_HREF = etree.XPath("(.//a[@href])[1]/@href")
+
+
+def _text(el):
+    """等同 BeautifulSoup 的 get_text(strip=True)"""
+    return "".join(s.strip() for s in el.itertext())
+
+
+def parse_item_lxml(item):
+    titles = _XP_TITLE(item)
+    if not titles:
+        raise ValueError("找不到標題")
+    parking = _XP_PARKING(item)
+    red_price = _XP_RED_PRICE(item)
+    href = _XP_HREF(item)
+    return _build_row(
+        _text(titles[0]),
+        [_text(s) for s in _XP_ADDRESS_SPANS(item)],
+        [_text(s) for s in _XP_INFO_SPANS(item)],
+        _text(parking[0]) if parking else '',
+        _text(red_price[0]) if red_price else None,
+        str(href[0]) if href else None,
+    )
+
+
+def _parse_page_lxml(html):
+    try:
+        root = lxml.html.fromstring(html)
+    except ValueError:
+        # 含 XML 編碼宣告的字串需以 bytes 解析
+        root = lxml.html.fromstring(html.encode("utf-8"))
+    return _XP_ITEMS(root), parse_item_lxml
+
+
+# -----------------------------
+# BeautifulSoup（備援）
+# -----------------------------
+def parse_item(item):
+    """
+    解析單一 buy-list-item 區塊，回傳一筆房屋資料 dict
+    """
+    # 標題
+    title = item.find('div', class_='LongInfoCard_Type_Name').get_text(strip=True)
+
+    # 地址/屋齡/類型
+    address_tag = item.find('div', class_='LongInfoCard_Type_Address')
+    address_spans = address_tag.find_all('span') if address_tag else []
+
+    # 建坪/主+陽/格局/樓層
+    house_info_tag = item.find('div', class_='longInfoCard_LongInfoCard_Type_HouseInfo__tZXDa')
+    info_spans = house_info_tag.find_all('span') if house_info_tag else []
+
+    # 車位
+    Car_Grip_tag = item.find('span', class_='longInfoCard_LongInfoCard_Type_Parking__ZXl_e')
+
+    # 總價：找到紅字的總價 (打折或沒打折都是紅字)
+    red_price_span = None
+    price_block = item.find('div', class_='LongInfoCard_Type_Right')
+    if price_block:
+        red_price_span = price_block.find('span', style=lambda s: s and "color: rgb(221, 37, 37)" in s)
+
+    # 編號
+    a_tag = item.find('a', href=True)
+
+    return _build_row(
+        title,
+        [s.get_text(strip=True) for s in address_spans],
+        [s.get_text(strip=True) for s in info_spans],
+        Car_Grip_tag.get_text(strip=True) if Car_Grip_tag else '',
+        red_price_span.get_text(strip=True) if red_price_span else None,
+        a_tag['href'] if a_tag else None,
+    )
+
+
+def _parse_page_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.find_all('div', class_='buy-list-item'), parse_item
+
+
+BACKENDS = {"bs4": _parse_page_bs4}
+if lxml is not None:
+    BACKENDS["lxml"] = _parse_page_lxml
+DEFAULT_BACKEND = "lxml" if lxml is not None else "bs4"
+
+
+def parse_listing_page(html, backend=None):
+    """
+    解析整頁列表 HTML，回傳 (房屋資料 list, 該頁是否有列表項目)
+    """
+    property_list, parse = BACKENDS[backend or DEFAULT_BACKEND](html)
+
+    rows = []
+    for item in property_list:
+        try:
+            rows.append(parse(item))
+        except Exception as e:
+            print(f"解析錯誤: {e}")
+            continue
+    return rows, bool(property_list)
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+多城市平行爬蟲（可中斷續抓）
+
+    python download_data/scrape_runner.py --workers 4
+    python download_data/scrape_runner.py --fixtures fixtures/ --fetcher http   # 用本機存好的 HTML 測試
+
+每個城市逐頁抓取，每頁解析完立即寫入 <輸出資料夾>/<城市>_buy_properties.csv.part，
+並記錄 checkpoint（下一頁頁碼 + 已寫入的檔案位置）。中斷後重跑會從上次的頁碼繼續，
+整個城市抓完才改名成正式的 CSV，App 不會讀到一半的資料。
+所有城市都完成後清掉 checkpoint，下一次執行會重新抓取最新資料。
+
+本機測試用的 HTML 檔案放在 <fixtures>/<城市>/default-desc/<頁碼>，
+沒有檔案（404）或沒有列表項目的頁面視為最後一頁。
+"""
+import argparse
+import csv
+import functools
+import http.server
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from listing_parser import FIELDNAMES, parse_listing_page
+from fetch_control import TokenBucket, RetryPolicy, PageTimeout, RateLimited, wait_for_listing
+
+try:
+    from selenium.common.exceptions import WebDriverException
+except ImportError:
+    class WebDriverException(Exception):
+        """沒有安裝 selenium 時的佔位（HTTP 抓取不會丟出）"""
+
+# 這些錯誤會重試同一頁；重試用完才讓這個城市失敗（checkpoint 保留，可續抓）
+RETRYABLE = (PageTimeout, RateLimited, requests.RequestException, WebDriverException)
+
+BASE_URL = "https://www.sinyi.com.tw/buy/list"
+CITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download_data_citys.txt")
+
+
+def read_cities(path=CITIES_FILE):
+    """讀取 download_data_citys.txt（"Taipei-city", "NewTaipei-city", ...）"""
+    with open(path, encoding="utf-8") as f:
+        return re.findall(r'"([^"]+)"', f.read())
+
+
+# -----------------------------
+# 抓取方式：Selenium（瀏覽器渲染）或 HTTP（純抓 HTML）
+# -----------------------------
+class PageNotFound(Exception):
+    pass
+
+
+class HttpFetcher:
+    def __init__(self, timeout=10):
+        self.session = requests.Session()
+        self.timeout = timeout
+
+    def fetch(self, url):
+        r = self.session.get(url, timeout=self.timeout)
+        if r.status_code == 404:
+            raise PageNotFound(url)
+        if r.status_code in (429, 503):
+            raise RateLimited(f"HTTP {r.status_code}")
+        r.raise_for_status()
+        r.encoding = r.encoding or "utf-8"
+        return r.text
+
+    def close(self):
+        self.session.close()
+
+
+class SeleniumFetcher:
+    def __init__(self, timeout=15):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+        self.driver = webdriver.Chrome(options=options)
+        self.timeout = timeout
+
+    def fetch(self, url):
+        self.driver.get(url)
+        # 等到列表數量穩定（或確認是空頁）就立刻解析，不再固定等待
+        wait_for_listing(self.driver, timeout=self.timeout)
+        return self.driver.page_source
+
+    def close(self):
+        self.driver.quit()
+
+
+FETCHERS = {"http": HttpFetcher, "selenium": SeleniumFetcher}
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+class CityCheckpoint:
+    """
+    記錄城市的抓取進度：next_page、part 檔已確認寫入的位元組數、筆數、是否完成
+    """
+
+    def __init__(self, out_dir, city):
+        self.path = os.path.join(out_dir, ".checkpoint", f"{city}.json")
+        self.state = {"next_page": 1, "offset": 0, "rows": 0, "done": False}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def save(self, **changes):
+        self.state.update(changes)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        """從第 1 頁重新開始"""
+        self.state = {"next_page": 1, "offset": 0, "rows": 0, "done": False}
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------------
+# 單一城市
+# -----------------------------
+def fetch_page(fetcher, url, limiter=None, retry=None):
+    """經過共用速率限制取得一頁；逾時/被限流時依 retry 重試"""
+    def attempt():
+        if limiter:
+            limiter.acquire()
+        html = fetcher.fetch(url)
+        if limiter:
+            limiter.reward()
+        return html
+
+    def on_retry(e):
+        if limiter and isinstance(e, RateLimited):
+            limiter.penalize()
+
+    if retry is None:
+        return attempt()
+    return retry.call(attempt, on_retry=on_retry)
+
+
+def crawl_city(city, fetcher, out_dir, base_url=BASE_URL, max_pages=None, log=print,
+               limiter=None, retry=None):
+    """
+    從 checkpoint 的頁碼開始逐頁抓取，每頁寫入後更新 checkpoint
+    回傳本城市累計筆數
+    """
+    checkpoint = CityCheckpoint(out_dir, city)
+    final_path = os.path.join(out_dir, f"{city}_buy_properties.csv")
+    part_path = final_path + ".part"
+    if checkpoint.state["done"]:
+        # done 在改名之前寫入：改名前中斷的話這裡補做
+        if os.path.exists(part_path):
+            os.replace(part_path, final_path)
+        log(f"[{city}] 已完成，略過")
+        return checkpoint.state["rows"]
+
+    os.makedirs(out_dir, exist_ok=True)
+    part_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if part_size < checkpoint.state["offset"]:
+        # part 檔不見或比 checkpoint 記錄的短（checkpoint 與檔案不一致）→ 整個城市重抓，
+        # 不能把空檔補零到 offset 再改名蓋掉正式的 CSV
+        log(f"[{city}] 暫存檔與 checkpoint 不一致，從第 1 頁重新抓取")
+        checkpoint.reset()
+    # 截掉上次中斷時尚未確認的部分，避免重複資料
+    with open(part_path, "ab") as f:
+        f.truncate(checkpoint.state["offset"])
+
+    page = checkpoint.state["next_page"]
+    rows_total = checkpoint.state["rows"]
+    with open(part_path, "a", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        if checkpoint.state["offset"] == 0:
+            writer.writeheader()
+        while max_pages is None or page <= max_pages:
+            url = f"{base_url}/{city}/default-desc/{page}"
+            try:
+                html = fetch_page(fetcher, url, limiter, retry)
+                rows, has_items = parse_listing_page(html)
+            except PageNotFound:
+                rows, has_items = [], False
+
+            # 如果這頁已經沒東西，代表到底了 → 停止
+            if not has_items:
+                break
+
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+            rows_total += len(rows)
+            page += 1
+            checkpoint.save(next_page=page, offset=f.tell(), rows=rows_total)
+            log(f"[{city}] 第 {page - 1} 頁：{len(rows)} 筆（累計 {rows_total}）")
+
+    checkpoint.save(done=True)
+    os.replace(part_path, final_path)
+    log(f"[{city}] 完成，共 {rows_total} 筆 → {final_path}")
+    return rows_total
+
+
+# -----------------------------
+# 多城市
+# -----------------------------
+def run(cities, out_dir="./Data", workers=2, fetcher="selenium", base_url=BASE_URL, max_pages=None, log=print,
+        rate=2.0, max_attempts=4):
+    """
+    以 workers 個抓取器平行處理多個城市；每個執行緒只建立一個瀏覽器/連線，
+    所有執行緒共用同一個速率限制（每秒 rate 個請求）
+    回傳 {城市: 筆數 或 例外}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    limiter = TokenBucket(rate=rate, burst=max(1, workers))
+    retry = RetryPolicy(max_attempts=max_attempts, retry_on=RETRYABLE, log=log)
+    local = threading.local()
+    fetchers, fetchers_lock = [], threading.Lock()
+
+    def get_fetcher():
+        if not hasattr(local, "fetcher"):
+            local.fetcher = FETCHERS[fetcher]()
+            with fetchers_lock:
+                fetchers.append(local.fetcher)
+        return local.fetcher
+
+    def task(city):
+        return crawl_city(city, get_fetcher(), out_dir, base_url, max_pages, log, limiter, retry)
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as pool:
+            futures = {pool.submit(task, city): city for city in cities}
+            for future in as_completed(futures):
+                city = futures[future]
+                try:
+                    results[city] = future.result()
+                except Exception as e:
+                    # 這個城市保留 checkpoint，下次重跑會從中斷的頁碼繼續
+                    log(f"[{city}] 抓取失敗：{e}")
+                    results[city] = e
+    finally:
+        for f in fetchers:
+            f.close()
+    if all(not isinstance(v, Exception) for v in results.values()):
+        # 全部城市都完成才清掉 checkpoint：中斷/失敗的那一輪重跑時續抓，下一輪則重新抓取
+        for city in cities:
+            CityCheckpoint(out_dir, city).reset()
+    return results
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(path, port=0):
+    """在背景啟動本機 HTTP 伺服器提供 HTML 測試檔，回傳 (server, base_url)"""
+    handler = functools.partial(_QuietHandler, directory=path)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多城市平行爬蟲（可續抓）")
+    parser.add_argument("--cities", nargs="*", help="要抓的城市（預設讀 download_data_citys.txt）")
+    parser.add_argument("--workers", type=int, default=2, help="同時執行的抓取器數量")
+    parser.add_argument("--fetcher", choices=sorted(FETCHERS), default="selenium")
+    parser.add_argument("--out", default="./Data", help="輸出資料夾")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--fixtures", help="改用本機 HTML 測試檔資料夾（會自動啟動本機伺服器）")
+    parser.add_argument("--max-pages", type=int, help="每個城市最多抓幾頁")
+    parser.add_argument("--rate", type=float, default=2.0, help="所有抓取器合計每秒最多請求數")
+    parser.add_argument("--retries", type=int, default=4, help="單頁最多嘗試次數")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    server = None
+    if args.fixtures:
+        server, base_url = serve_directory(args.fixtures)
+    try:
+        results = run(args.cities or read_cities(), args.out, args.workers, args.fetcher, base_url, args.max_pages,
+                      rate=args.rate, max_attempts=args.retries)
+    finally:
+        if server:
+            server.shutdown()
+    ok = sum(1 for v in results.values() if not isinstance(v, Exception))
+    print(f"完成 {ok}/{len(results)} 個城市")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 import streamlit as st
 from sidebar import render_sidebar
 from page_modules.home_page import render_home_page
-from page_modules.search_page import render_search_page
-from page_modules.analysis_page import render_analysis_page
+from services.prewarm import start_prewarm
 
 def main():
 #主應用程式入口
@@ -19,12 +18,17 @@ def main():
     if st.session_state.current_page == 'home':
         render_home_page()
     elif st.session_state.current_page == 'search':
+        # 頁面模組用到時才載入（首頁冷啟動不用等資料與分析相關套件）
+        from page_modules.search_page import render_search_page
         render_search_page()
     elif st.session_state.current_page == 'analysis':
-
-     render_analysis_page()
+        from page_modules.analysis_page import render_analysis_page
+        render_analysis_page()
     elif st.session_state.current_page == 'compare':
         render_compare_page()
 
+    # 畫面送出後在背景預先載入其他頁面與資料
+    start_prewarm()
+
 if __name__ == "__main__":
     main()
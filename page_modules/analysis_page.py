@@ -1,12 +1,15 @@
-import math
 import json
-import requests
 import streamlit as st
-import time
 from string import Template
 from streamlit.components.v1 import html
 from components.solo_analysis import tab1_module
-import google.generativeai as genai
+from components.market_trend import tab3_module
+from services.geocoder import GoogleGeocoder, geocode
+from services.places_client import get_places_client
+from services.poi_store import PLACE_TYPES, get_poi_store
+from services.accessibility import attach_accessibility, describe_row
+from services.gemini_client import generate as gemini_generate
+from services.result_set import rows_for_ids, city_file_path
 import pandas as pd
 
 # ===========================
@@ -15,16 +18,8 @@ import pandas as pd
 def get_favorites_data():
     if 'favorites' not in st.session_state or not st.session_state.favorites:
         return pd.DataFrame()
-    all_df = None
-    if 'all_properties_df' in st.session_state and not st.session_state.all_properties_df.empty:
-        all_df = st.session_state.all_properties_df
-    elif 'filtered_df' in st.session_state and not st.session_state.filtered_df.empty:
-        all_df = st.session_state.filtered_df
-    if all_df is None or all_df.empty:
-        return pd.DataFrame()
-    fav_ids = st.session_state.favorites
-    fav_df = all_df[all_df['編號'].astype(str).isin(map(str, fav_ids))].copy()
-    return fav_df
+    # 依編號從共用的城市資料取出（不需要 session 保存整份結果）
+    return rows_for_ids(st.session_state.favorites)
 
 
 def render_favorites_list(fav_df):
@@ -53,16 +48,8 @@ def render_favorites_list(fav_df):
 
 
 # ===========================
-# Google Places 設定
+# 地圖顏色設定（類別與關鍵字見 services/poi_store.PLACE_TYPES）
 # ===========================
-PLACE_TYPES = {
-    "教育": ["圖書館", "幼兒園", "小學", "學校", "中學", "大學"],
-    "健康與保健": ["牙醫", "醫師", "藥局", "醫院"],
-    "購物": ["便利商店", "超市", "百貨公司"],
-    "交通運輸": ["公車站", "地鐵站", "火車站"],
-    "餐飲": ["餐廳"]
-}
-
 CATEGORY_COLORS = {
     "教育": "#1E90FF",
     "健康與保健": "#32CD32",
@@ -75,15 +62,6 @@ CATEGORY_COLORS = {
 # ===========================
 # 工具函式
 # ===========================
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371000
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    d_phi = math.radians(lat2 - lat1)
-    d_lambda = math.radians(lon2 - lon1)
-    a = math.sin(d_phi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(d_lambda/2)**2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-
-
 def _get_server_key():
     server_key = st.session_state.get("GMAPS_SERVER_KEY") or st.session_state.get("GOOGLE_MAPS_KEY", "")
     if "GMAPS_SERVER_KEY" not in st.session_state and server_key:
@@ -96,104 +74,88 @@ def _get_browser_key():
 
 
 def geocode_address(address: str, api_key: str):
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {"address": address, "key": api_key, "language": "zh-TW"}
+    """地址 -> (lat, lng)；先查本機快取，沒有才呼叫 Geocoding API"""
     try:
-        r = requests.get(url, params=params, timeout=10).json()
+        location = geocode(address, GoogleGeocoder(api_key))
     except Exception as e:
         st.error(f"地址解析失敗: {e}")
         return None, None
-    status = r.get("status")
-    if status == "OK" and r.get("results"):
-        loc = r["results"][0]["geometry"]["location"]
-        return loc["lat"], loc["lng"]
-    st.warning(f"Geocoding error: {status}")
-    return None, None
+    if location is None:
+        st.warning("Geocoding error: ZERO_RESULTS")
+        return None, None
+    return location
 
 
 # ===========================
-# 改良版 Google Places + 進度條
+# Google Places（平行查詢 + 快取）+ 進度條
 # ===========================
-def query_google_places_keyword(lat, lng, api_key, selected_categories, radius=500, extra_keyword=""):
-    results, seen = [], set()
-    total_tasks = sum(len(PLACE_TYPES[cat]) for cat in selected_categories) + (1 if extra_keyword else 0)
+def query_google_places_multi(centers, api_key, selected_categories, radius=500, extra_keyword=""):
+    """
+    一次查詢多個中心點（如房屋 A、B）的所有關鍵字：本機 POI 資料已涵蓋的直接查表，
+    其餘全部平行送出，查到的結果存回本機 POI 資料
+    回傳與 centers 對應的結果 list
+    """
+    keywords = [(cat, kw) for cat in selected_categories for kw in PLACE_TYPES[cat]]
+    if extra_keyword:
+        keywords.append(("關鍵字", extra_keyword))
+    store = get_poi_store()
+    tasks = [(lat, lng, radius, kw) for lat, lng in centers for _, kw in keywords
+             if not store.covers(lat, lng, radius, kw)]
+
     progress = st.progress(0)
     progress_text = st.empty()
+    total_tasks = len(set(tasks))
     completed = 0
 
-    def update_progress(task_desc):
+    def update_progress(task, error):
         nonlocal completed
         completed += 1
-        progress.progress(min(completed / total_tasks, 1.0))
-        progress_text.text(f"進度：{completed}/{total_tasks} - {task_desc}")
-
-    def call(params, tag_cat, tag_kw):
-        """自動處理重試與延遲（5 次重試，每次間隔 5 秒）"""
-        for attempt in range(5):
+        progress.progress(min(completed / max(total_tasks, 1), 1.0))
+        progress_text.text(f"進度：{completed}/{total_tasks} - 查詢 {task[3]}")
+
+    responses = get_places_client(api_key).search_many(tasks, on_done=update_progress) if tasks else {}
+
+    category_of = {}
+    for cat, kw in keywords:
+        category_of.setdefault(kw, cat)
+    records, coverage, reported = [], [], set()
+    for (lat, lng, r, kw), (places, error) in responses.items():
+        if error is not None:
+            if kw not in reported:
+                reported.add(kw)
+                st.warning(f"❌ {category_of[kw]}-{kw} 查詢失敗: {error}")
+            continue
+        coverage.append((lat, lng, r, kw))
+        for p in places:
             try:
-                data = requests.get(
-                    "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
-                    params=params, timeout=10
-                ).json()
-            except Exception as e:
-                st.warning(f"❌ {tag_cat}-{tag_kw} 查詢失敗: {e}")
-                return []
-            st_code = data.get("status")
-            if st_code == "OK":
-                return data.get("results", [])
-            elif st_code == "ZERO_RESULTS":
-                st.info(f"🏠 該地區沒有 {tag_cat}-{tag_kw}")
-                return []
-            elif st_code == "OVER_QUERY_LIMIT":
-                st.warning(f"⏳ API 過載（{tag_cat}-{tag_kw}），第 {attempt+1} 次重試中...")
-                time.sleep(5)
-                continue
-            else:
-                st.warning(f"🏠 {tag_cat}-{tag_kw} 查詢錯誤: {st_code}")
-                return []
-        return []
-
-    # 迴圈查詢
-    for cat in selected_categories:
-        for kw in PLACE_TYPES[cat]:
-            update_progress(f"查詢 {cat}-{kw}")
-            params = {"location": f"{lat},{lng}", "radius": radius, "keyword": kw, "key": api_key, "language": "zh-TW"}
-            for p in call(params, cat, kw):
-                try:
-                    pid = p.get("place_id", "")
-                    if pid in seen:
-                        continue
-                    seen.add(pid)
-                    loc = p["geometry"]["location"]
-                    dist = int(haversine(lat, lng, loc["lat"], loc["lng"]))
-                    if dist <= radius:
-                        results.append((cat, kw, p.get("name","未命名"), loc["lat"], loc["lng"], dist, pid))
-                except Exception:
-                    continue
-            time.sleep(0.3)
-
-    # 額外關鍵字
-    if extra_keyword:
-        update_progress(f"額外關鍵字: {extra_keyword}")
-        params = {"location": f"{lat},{lng}", "radius": radius, "keyword": extra_keyword, "key": api_key, "language": "zh-TW"}
-        for p in call(params, "關鍵字", extra_keyword):
-            try:
-                pid = p.get("place_id", "")
-                if pid in seen:
-                    continue
-                seen.add(pid)
                 loc = p["geometry"]["location"]
-                dist = int(haversine(lat, lng, loc["lat"], loc["lng"]))
-                if dist <= radius:
-                    results.append(("關鍵字", extra_keyword, p.get("name","未命名"), loc["lat"], loc["lng"], dist, pid))
-            except Exception:
+                records.append((category_of[kw], kw, p.get("name", "未命名"), loc["lat"], loc["lng"], p["place_id"]))
+            except (KeyError, TypeError):
                 continue
-        time.sleep(0.3)
+    if coverage:
+        store.add(records, coverage)
+        store.save()
+
+    all_results = []
+    for lat, lng in centers:
+        results, seen = [], set()
+        for cat, kw in keywords:
+            # 同一地點只算在第一個查到它的關鍵字
+            for place in store.places(lat, lng, radius, kw):
+                if place[6] not in seen:
+                    seen.add(place[6])
+                    results.append((cat,) + place[1:])
+        results.sort(key=lambda x: x[5])
+        all_results.append(results)
 
     progress.progress(1.0)
-    progress_text.text("✅ 查詢完成！")
-    results.sort(key=lambda x: x[5])
-    return results
+    local = len(centers) * len(keywords) - len(tasks)
+    progress_text.text(f"✅ 查詢完成！（{local} 項使用本機資料）" if local else "✅ 查詢完成！")
+    return all_results
+
+
+def query_google_places_keyword(lat, lng, api_key, selected_categories, radius=500, extra_keyword=""):
+    return query_google_places_multi([(lat, lng)], api_key, selected_categories, radius, extra_keyword)[0]
 
 
 # ===========================
@@ -258,12 +220,16 @@ def render_analysis_page():
     if 'favorites' not in st.session_state:
         st.session_state.favorites = set()
 
-    tab1, tab2, _ = st.tabs(["個別分析","房屋比較","市場趨勢分析"])
+    tab1, tab2, tab3 = st.tabs(["個別分析","房屋比較","市場趨勢分析"])
 
     with tab1:
         _ = get_favorites_data()
         tab1_module()
 
+    # 房屋比較在沒有收藏時會提早 return，市場趨勢要先畫
+    with tab3:
+        tab3_module()
+
     with tab2:
         st.subheader("🏠 房屋比較（Google Places + Gemini 分析）")
         fav_df = get_favorites_data()
@@ -305,27 +271,37 @@ def render_analysis_page():
                 st.error("❌ 地址解析失敗，請檢查 Server Key 限制。")
                 return
 
-            with st.spinner("正在查詢房屋 A 周邊..."):
-                places_a = query_google_places_keyword(lat_a, lng_a, server_key, selected_categories, radius, extra_keyword=keyword)
-            time.sleep(1)
-            with st.spinner("正在查詢房屋 B 周邊..."):
-                places_b = query_google_places_keyword(lat_b, lng_b, server_key, selected_categories, radius, extra_keyword=keyword)
+            with st.spinner("正在查詢房屋 A、B 周邊..."):
+                places_a, places_b = query_google_places_multi(
+                    [(lat_a, lng_a), (lat_b, lng_b)], server_key, selected_categories, radius, extra_keyword=keyword
+                )
 
             col1, col2 = st.columns(2)
             with col1: render_map(lat_a, lng_a, places_a, radius, title="房屋 A")
             with col2: render_map(lat_b, lng_b, places_b, radius, title="房屋 B")
 
-            genai.configure(api_key=gemini_key)
-            model = genai.GenerativeModel("gemini-2.0-flash")
             prompt = f"""你是一位房地產分析專家，請比較以下兩間房屋的生活機能，
 房屋 A：
+{format_accessibility(house_a)}
 {format_places(places_a)}
 房屋 B：
+{format_accessibility(house_b)}
 {format_places(places_b)}
 請列出優缺點與結論。"""
-            resp = model.generate_content(prompt)
+            with st.spinner("Gemini 正在分析中..."):
+                analysis_text = gemini_generate(gemini_key, prompt)
             st.subheader("📊 Gemini 分析結果")
-            st.write(resp.text)
+            st.write(analysis_text)
+
+
+def format_accessibility(house):
+    """預先算好的生活機能指標（沒有時回傳空字串）"""
+    path = city_file_path(house.get('地址'))
+    if not path:
+        return ""
+    dataset = attach_accessibility(path)
+    rows = dataset.find([house['編號']])
+    return describe_row(dataset, rows[0]) if len(rows) else ""
 
 
 def format_places(places):
@@ -0,0 +1,220 @@
+import os
+import json
+import threading
+import numpy as np
+from services.listing_store import DATA_DIR, _store_path, load_dataset
+from services.geocoder import get_geocode_cache, normalize_address
+from services.poi_store import PLACE_TYPES, CATEGORIES, get_poi_store
+
+# ===========================
+# 生活機能指標（每筆物件，批次預先計算）
+# ===========================
+# 依物件地址座標（geocode 快取）與本機 POI 資料算出：
+#   <類別>_300m / _500m / _1000m：半徑內 POI 數量
+#   <類別>_nearest：最近一個 POI 的距離（公尺，NEAREST_MAX 內找不到為 NaN）
+#   walk_score：各類別「最近距離」換算成 0~100 分後平均（0 m = 100 分，WALK_DISTANCE 以上 = 0 分）
+# POI 資料只有查詢過的範圍才完整：某類別的「所有」關鍵字都涵蓋到該半徑時，該半徑的數量才算數；
+# 最近距離要涵蓋到 min(找到的最近距離, WALK_DISTANCE) 才確定。無法判斷的數量、最近距離與
+# walk_score 為 NaN（畫面顯示「未知」，篩選時不符合），不會被當成 0。
+# 同一地點可能被同類別的多個關鍵字找到（例如「學校」與「小學」），計數時每個地點只算一次。
+# 存在 Data/.store/<城市>/accessibility/，查詢時併入 dataset.columns，可直接篩選/排序。
+# 用法：python -m services.geocoder（先有座標）→ python -m services.accessibility
+RADII = (300, 500, 1000)
+NEAREST_MAX = 2000
+WALK_DISTANCE = 1000
+ACCESS_VERSION = 3
+
+
+def feature_names():
+    names = []
+    for cat in PLACE_TYPES:
+        names += [f"{cat}_{r}m" for r in RADII] + [f"{cat}_nearest"]
+    return names + ["walk_score"]
+
+
+def location_features(lats, lngs, store):
+    """
+    每個座標的生活機能指標：回傳 {指標名: float32 陣列}
+    半徑查詢取一次 NEAREST_MAX，再依距離/類別分別計數
+    """
+    n = len(lats)
+    lats = np.asarray(lats, dtype="float64")
+    lngs = np.asarray(lngs, dtype="float64")
+    out = {name: np.full(n, np.nan, dtype="float32") for name in feature_names()}
+    cat_codes = np.array([CATEGORIES.index(c) for c in PLACE_TYPES])
+    n_categories = len(CATEGORIES)
+    columns, index = store.snapshot()
+    categories = columns["category"]
+    # 同一地點的多筆（不同關鍵字）合併：(類別, 地點) 編成一個整數
+    _, place_codes = np.unique(columns["pid"], return_inverse=True)
+    n_places = int(place_codes.max()) + 1 if len(place_codes) else 1
+    for i, (lat, lng) in enumerate(zip(lats, lngs)):
+        pos, dist = index.within(lat, lng, NEAREST_MAX)
+        cats = categories[pos].astype("int64")
+        # pos 依距離排序，取每個 (類別, 地點) 第一次出現（最近）的那筆
+        _, first = np.unique(cats * n_places + place_codes[pos], return_index=True)
+        first.sort()
+        cats, dist = cats[first], dist[first]
+        for r in RADII:
+            counts = np.bincount(cats[dist <= r], minlength=n_categories)
+            for cat, code in zip(PLACE_TYPES, cat_codes):
+                out[f"{cat}_{r}m"][i] = counts[code]
+        # 依距離排序，第一次出現即為最近
+        seen, first = np.unique(cats, return_index=True)
+        nearest = dict(zip(seen.tolist(), dist[first].tolist()))
+        for cat, code in zip(PLACE_TYPES, cat_codes):
+            out[f"{cat}_nearest"][i] = nearest.get(int(code), np.nan)
+
+    def covered(keywords, radius):
+        """該類別的所有關鍵字都查詢過 radius 範圍"""
+        return np.logical_and.reduce([store.covers_many(lats, lngs, radius, kw) for kw in keywords])
+
+    scores = []
+    for cat, keywords in PLACE_TYPES.items():
+        for r in RADII:
+            out[f"{cat}_{r}m"][~covered(keywords, r)] = np.nan
+        nearest = out[f"{cat}_nearest"]
+        # 涵蓋到找到的最近距離（沒找到則到 WALK_DISTANCE）才確定沒有更近的
+        known = covered(keywords, np.where(nearest <= WALK_DISTANCE, nearest, WALK_DISTANCE))
+        out[f"{cat}_nearest"][~known] = np.nan
+        scores.append(np.where(known, np.nan_to_num(np.clip(1 - nearest / WALK_DISTANCE, 0, 1), nan=0.0), np.nan))
+    if n:
+        # 任一類別無法判斷時分數為 NaN
+        out["walk_score"] = (np.mean(scores, axis=0) * 100).astype("float32")
+    return out
+
+
+def _access_dir(csv_path):
+    return os.path.join(_store_path(csv_path), "accessibility")
+
+
+def build_accessibility(csv_path, store=None, cache=None, log=print):
+    """
+    計算一個城市所有物件的指標並存檔；同一條路（正規化地址）只算一次
+    沒有座標的物件指標為 NaN；回傳 (有座標筆數, 總筆數)
+    """
+    dataset = load_dataset(csv_path)
+    store = get_poi_store() if store is None else store
+    cache = get_geocode_cache() if cache is None else cache
+
+    addresses = np.array([normalize_address(a) for a in np.asarray(dataset.columns["address"]).tolist()], dtype=str)
+    unique, inverse = np.unique(addresses, return_inverse=True)
+    coords = cache.lookup_many(unique.tolist())
+    located = np.array([a in coords for a in unique.tolist()], dtype=bool)
+    lats = np.array([coords[a][0] for a in unique[located].tolist()], dtype="float64")
+    lngs = np.array([coords[a][1] for a in unique[located].tolist()], dtype="float64")
+    log(f"{dataset.name}：{len(unique)} 個地址，其中 {located.sum()} 個有座標，POI {len(store)} 筆")
+
+    per_location = location_features(lats, lngs, store)
+    out_dir = _access_dir(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    loc_index = np.full(len(unique), -1, dtype="int64")
+    loc_index[located] = np.arange(located.sum())
+    row_loc = loc_index[inverse]
+    for name, values in per_location.items():
+        col = np.full(len(dataset), np.nan, dtype="float32")
+        has = row_loc >= 0
+        col[has] = values[row_loc[has]]
+        tmp = os.path.join(out_dir, f"{name}.tmp.npy")
+        np.save(tmp, col)
+        os.replace(tmp, os.path.join(out_dir, f"{name}.npy"))
+
+    meta = {
+        "access_version": ACCESS_VERSION,
+        "source_mtime_ns": dataset.version[0],
+        "source_size": dataset.version[1],
+        "features": feature_names(),
+        "located_rows": int((row_loc >= 0).sum()),
+        "poi_count": len(store),
+    }
+    tmp = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(out_dir, "meta.json"))
+    return meta["located_rows"], len(dataset)
+
+
+# ===========================
+# 載入（併入 dataset.columns）
+# ===========================
+# 指標重新計算（POI 更新）後 meta.json 會被換掉；以 (資料版本, meta 的 mtime/大小) 當版本，
+# 版本不同時組一份新的 columns 換上去（不修改舊的 dict，正在讀的 session 不受影響）。
+_ATTACHED = {}
+_LOCK = threading.Lock()
+
+
+def _meta_stamp(out_dir):
+    try:
+        st = os.stat(os.path.join(out_dir, "meta.json"))
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_features(out_dir, dataset):
+    """讀取已算好的指標（memmap）；沒算過或已過期回傳 {}"""
+    try:
+        with open(os.path.join(out_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if meta.get("access_version") != ACCESS_VERSION or \
+            (meta.get("source_mtime_ns"), meta.get("source_size")) != dataset.version:
+        return {}
+    try:
+        return {name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r") for name in meta["features"]}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def attach_accessibility(csv_path):
+    """
+    把已算好的指標載入成 dataset 的欄位（memmap），回傳 dataset
+    沒算過或 CSV 已更新（指標過期）時不載入，dataset.columns 裡就沒有這些欄位
+    """
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    out_dir = _access_dir(csv_path)
+    stamp = _meta_stamp(out_dir)
+    attached = _ATTACHED.get(key)
+    if attached is not None and attached[0] is dataset and attached[1] == stamp:
+        return dataset
+    with _LOCK:
+        attached = _ATTACHED.get(key)
+        if attached is None or attached[0] is not dataset or attached[1] != stamp:
+            names = set(feature_names())
+            columns = {k: v for k, v in dataset.columns.items() if k not in names}
+            columns.update(_load_features(out_dir, dataset))
+            dataset.columns = columns
+            _ATTACHED[key] = (dataset, stamp)
+    return dataset
+
+
+def access_version(csv_path):
+    """目前併入的指標版本（搜尋結果快取 key 用）；需先呼叫 attach_accessibility"""
+    attached = _ATTACHED.get(os.path.abspath(csv_path))
+    return attached[1] if attached is not None else None
+
+
+def has_accessibility(dataset):
+    return "walk_score" in dataset.columns
+
+
+def describe_row(dataset, row, radius=500):
+    """「500 公尺內：教育 3、購物 5…；最近距離：教育 120 m…；步行機能 72 分」"""
+    if not has_accessibility(dataset) or np.isnan(dataset.columns["walk_score"][row]):
+        return ""
+    cols = dataset.columns
+    counts = "、".join(f"{cat} {int(cols[f'{cat}_{radius}m'][row])}" for cat in PLACE_TYPES)
+    nearest = "、".join(
+        f"{cat} {cols[f'{cat}_nearest'][row]:,.0f} m" for cat in PLACE_TYPES
+        if not np.isnan(cols[f"{cat}_nearest"][row])
+    )
+    return f"{radius} 公尺內：{counts}；最近距離：{nearest or '無'}；步行機能 {cols['walk_score'][row]:.0f} 分"
+
+
+if __name__ == "__main__":
+    for f in sorted(os.listdir(DATA_DIR)):
+        if f.endswith("_buy_properties.csv"):
+            located, total = build_accessibility(os.path.join(DATA_DIR, f))
+            print(f"{f}：{located}/{total} 筆物件已計算生活機能指標")
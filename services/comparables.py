@@ -0,0 +1,168 @@
+import os
+import threading
+import numpy as np
+from services.listing_store import load_dataset, AGE_PRESALE, INT_NULL
+
+# ===========================
+# 比較物件（數值特徵 kNN；文字索引的候選可再融合文字向量重新排序）
+# ===========================
+# 各特徵在距離中的權重（標準化之後再乘上）
+FEATURE_WEIGHTS = {
+    "unit_price": 2.0,
+    "area": 1.5,
+    "main_area": 1.0,
+    "age": 1.0,
+    "rooms": 1.0,
+    "floor_ratio": 0.5,
+    "district": 1.0,
+}
+# 數值特徵（特徵矩陣的前幾欄，之後是行政區 one-hot）
+NUMERIC_FEATURES = ("unit_price", "area", "main_area", "age", "rooms", "floor_ratio")
+# 一次計算距離的查詢列數（Q×N 距離矩陣分批，記憶體不隨收藏數量成長）
+QUERY_CHUNK = 512
+
+
+def unit_prices(dataset):
+    """建坪單價（元/坪），建坪無效時為 NaN"""
+    area = np.asarray(dataset.columns["area"], dtype="float64")
+    price = np.asarray(dataset.columns["price"], dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(area > 0, price * 10000 / area, np.nan)
+
+
+def _int_column(dataset, key):
+    col = np.asarray(dataset.columns[key], dtype="float64")
+    col[col == INT_NULL] = np.nan
+    return col
+
+
+def _standardize(col):
+    """z-score；缺值補平均（標準化後為 0）"""
+    col = np.asarray(col, dtype="float64")
+    valid = np.isfinite(col)
+    if not valid.any():
+        return np.zeros(len(col), dtype="float32")
+    mean, std = col[valid].mean(), col[valid].std()
+    out = (col - mean) / (std if std > 0 else 1)
+    out[~valid] = 0
+    return out.astype("float32")
+
+
+def build_features(dataset, weights=FEATURE_WEIGHTS):
+    """標準化後加權的特徵矩陣（N×F, float32）"""
+    age = np.asarray(dataset.columns["age"], dtype="float64").copy()
+    age[age == AGE_PRESALE] = 0
+    floor, total = _int_column(dataset, "floor"), _int_column(dataset, "total_floors")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        floor_ratio = np.where(total > 0, floor / total, np.nan)
+
+    numeric = {
+        # 價格與坪數取對數，避免少數豪宅/廠房主導距離
+        "unit_price": np.log1p(unit_prices(dataset)),
+        "area": np.log1p(np.asarray(dataset.columns["area"], dtype="float64")),
+        "main_area": np.log1p(np.asarray(dataset.columns["main_area"], dtype="float64")),
+        "age": age,
+        "rooms": _int_column(dataset, "rooms"),
+        "floor_ratio": floor_ratio,
+    }
+    parts = [_standardize(numeric[name])[:, None] * weights.get(name, 1.0) for name in NUMERIC_FEATURES]
+
+    # 行政區 one-hot：不同區的距離平方為 weight²
+    codes = np.asarray(dataset.columns["district"])
+    n_districts = len(dataset.labels("district"))
+    if n_districts:
+        onehot = np.zeros((len(codes), n_districts), dtype="float32")
+        valid = codes >= 0
+        onehot[np.flatnonzero(valid), codes[valid]] = weights.get("district", 1.0) / np.sqrt(2)
+        parts.append(onehot)
+    return np.hstack(parts).astype("float32")
+
+
+class ComparablesEngine:
+    """
+    以特徵矩陣做暴力 kNN（一次可查多筆），支援同區/同類型過濾
+    """
+
+    def __init__(self, dataset, features=None):
+        self.dataset = dataset
+        self.features = build_features(dataset) if features is None else features
+        self._sq_norms = np.einsum("ij,ij->i", self.features, self.features)
+
+    def rerank(self, row, candidates, text_vectors, k=10, text_weight=1.0, same_type=False):
+        """
+        只在 candidates（文字索引找到的物件列號）中，依「數值特徵 + 文字向量」距離重新排序
+        text_vectors：第一列是查詢物件，其後與 candidates 對齊（沒有向量的補 0）
+        回傳 (列號, 距離)，不含自己，最多 k 筆
+        """
+        candidates = np.asarray(candidates, dtype="int64")
+        vectors = np.asarray(text_vectors, dtype="float32")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        # 只依數值特徵的數量縮放（行政區 one-hot 欄位不算）
+        vectors = vectors / norms * (text_weight * np.sqrt(len(NUMERIC_FEATURES)))
+
+        keep = candidates != row
+        if same_type:
+            col = np.asarray(self.dataset.columns["housetype"])
+            keep &= col[candidates] == col[row]
+        diff = self.features[candidates[keep]] - self.features[row]
+        text_diff = vectors[1:][keep] - vectors[0]
+        dist = np.sqrt(np.einsum("ij,ij->i", diff, diff) + np.einsum("ij,ij->i", text_diff, text_diff))
+        order = np.argsort(dist, kind="stable")[:k]
+        return candidates[keep][order], dist[order]
+
+    def query(self, rows, k=10, same_district=False, same_type=False, mask=None):
+        """
+        rows: 查詢列號陣列；回傳 (列號 Q×k, 距離 Q×k)，不含自己
+        不足 k 筆時以 -1 / inf 補齊；每 QUERY_CHUNK 筆查詢算一次距離
+        """
+        rows = np.atleast_1d(np.asarray(rows, dtype="int64"))
+        k = min(k, len(self.features))
+        top = np.empty((len(rows), k), dtype="int64")
+        top_dist = np.empty((len(rows), k), dtype=self._sq_norms.dtype)
+        for start in range(0, len(rows), QUERY_CHUNK):
+            chunk = slice(start, start + QUERY_CHUNK)
+            top[chunk], top_dist[chunk] = self._query_chunk(rows[chunk], k, same_district, same_type, mask)
+        return top, top_dist
+
+    def _query_chunk(self, rows, k, same_district, same_type, mask):
+        q = self.features[rows]
+        dist = self._sq_norms[None, :] + self._sq_norms[rows][:, None] - 2 * (q @ self.features.T)
+        np.maximum(dist, 0, out=dist)
+
+        invalid = np.zeros(dist.shape, dtype=bool)
+        if mask is not None:
+            invalid |= ~np.asarray(mask, dtype=bool)[None, :]
+        for key, enabled in (("district", same_district), ("housetype", same_type)):
+            if enabled:
+                col = np.asarray(self.dataset.columns[key])
+                invalid |= col[None, :] != col[rows][:, None]
+        invalid[np.arange(len(rows)), rows] = True
+        dist[invalid] = np.inf
+
+        top = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        top_dist = np.take_along_axis(dist, top, axis=1)
+        order = np.argsort(top_dist, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_dist = np.sqrt(np.take_along_axis(top_dist, order, axis=1))
+        top[~np.isfinite(top_dist)] = -1
+        return top, top_dist
+
+
+# ===========================
+# 行程共用快取
+# ===========================
+_ENGINES = {}
+_LOCK = threading.Lock()
+
+
+def get_comparables_engine(csv_path):
+    """取得城市的比較物件引擎（資料版本更新後重建特徵矩陣）"""
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    with _LOCK:
+        cached = _ENGINES.get(key)
+        if cached is None or cached.dataset is not dataset:
+            cached = ComparablesEngine(dataset)
+            _ENGINES[key] = cached
+        return cached
@@ -0,0 +1,290 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from services.listing_store import AGE_PRESALE, INT_NULL, _store_path, load_dataset
+from services.comparables import unit_prices
+
+# ===========================
+# 行政區統計方塊（行政區 × 類型 × 屋齡區間 × 房數）
+# ===========================
+# 每個格子存 總價 與 建坪單價 的 筆數/平均/中位數/P10/P90，
+# 另外預先算好所有維度組合的小計（"*" 代表不限），查詢只要查 dict。
+# 檔案存在 Data/.store/<城市>/cube.npz；資料更新時只重算有變動的格子。
+CUBE_VERSION = 1
+ANY = "*"
+DIMENSIONS = ["district", "housetype", "age", "rooms"]
+
+# 屋齡區間（年）：[下限, 上限)
+AGE_BUCKETS = [(0, 5), (5, 10), (10, 20), (20, 30), (30, 40), (40, np.inf)]
+UNKNOWN = "未知"
+
+STAT_FIELDS = [
+    "count",
+    "price_mean", "price_median", "price_p10", "price_p90",
+    "unit_price_mean", "unit_price_median", "unit_price_p10", "unit_price_p90",
+]
+
+# 格子筆數太少時往上一層小計退（同區同類型 → 同區 → 全市）
+MIN_COUNT = 5
+FALLBACK = [
+    ("district", "housetype", "age", "rooms"),
+    ("district", "housetype", "age"),
+    ("district", "housetype", "rooms"),
+    ("district", "housetype"),
+    ("district",),
+    (),
+]
+
+
+def age_labels(age):
+    """屋齡（年）-> 區間標籤，預售為「預售」"""
+    age = np.asarray(age, dtype="float64")
+    out = np.full(len(age), UNKNOWN, dtype=object)
+    out[age == AGE_PRESALE] = "預售"
+    for lo, hi in AGE_BUCKETS:
+        out[(age >= lo) & (age < hi)] = f"{lo}年以上" if np.isinf(hi) else f"{lo}-{hi}年"
+    return out
+
+
+def room_labels(rooms):
+    """房數 -> 「1房」…「5房以上」"""
+    rooms = np.asarray(rooms).astype("int64")
+    out = np.array([f"{r}房" for r in np.clip(rooms, 0, 5)], dtype=object)
+    out[rooms >= 5] = "5房以上"
+    out[rooms == INT_NULL] = UNKNOWN
+    return out
+
+
+def _labels(dataset, key):
+    labels = np.array(list(dataset.labels(key)) + [UNKNOWN], dtype=object)
+    codes = np.asarray(dataset.columns[key]).astype("int64")
+    return labels[np.where(codes >= 0, codes, len(labels) - 1)]
+
+
+def cell_frame(dataset):
+    """每列的格子維度 + 總價/單價（建方塊與查詢共用）"""
+    return pd.DataFrame({
+        "district": _labels(dataset, "district"),
+        "housetype": _labels(dataset, "housetype"),
+        "age": age_labels(dataset.columns["age"]),
+        "rooms": room_labels(dataset.columns["rooms"]),
+        "price": np.asarray(dataset.columns["price"], dtype="float64"),
+        "unit_price": unit_prices(dataset),
+        # 用來判斷格子內容有沒有變
+        "id": np.asarray(dataset.columns["id"]).astype(str),
+    })
+
+
+def _fingerprints(cells):
+    """最細格子的指紋（格子內每列 編號/總價/坪數 雜湊值相加），資料沒變指紋就不變"""
+    row_hash = pd.util.hash_pandas_object(cells[["id", "price", "unit_price"]], index=False).to_numpy()
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(cells[DIMENSIONS]))
+    sums = np.zeros(len(uniques), dtype="uint64")
+    np.add.at(sums, codes, row_hash)
+    return dict(zip(uniques, sums.tolist()))
+
+
+def _grouping_sets():
+    """所有維度組合（含全部不限），共 2^4 種"""
+    n = len(DIMENSIONS)
+    return [tuple(d for i, d in enumerate(DIMENSIONS) if mask >> i & 1) for mask in range(2 ** n)]
+
+
+def _summarize(cells, dims):
+    """依 dims 分組算統計，回傳 {格子 key: 統計陣列}"""
+    if not len(cells):
+        return {}
+    grouped = cells.groupby(list(dims), sort=False) if dims else cells.groupby(np.zeros(len(cells)))
+    values = grouped[["price", "unit_price"]]
+    count = grouped.size()
+    mean = values.mean()
+    q = values.quantile([0.5, 0.1, 0.9]).unstack()
+    table = pd.DataFrame({
+        "count": count,
+        "price_mean": mean["price"],
+        "price_median": q[("price", 0.5)],
+        "price_p10": q[("price", 0.1)],
+        "price_p90": q[("price", 0.9)],
+        "unit_price_mean": mean["unit_price"],
+        "unit_price_median": q[("unit_price", 0.5)],
+        "unit_price_p10": q[("unit_price", 0.1)],
+        "unit_price_p90": q[("unit_price", 0.9)],
+    })[STAT_FIELDS]
+    out = {}
+    for idx, stats in zip(table.index, table.to_numpy(dtype="float64")):
+        idx = idx if isinstance(idx, tuple) else (idx,)
+        given = dict(zip(dims, idx))
+        out[tuple(given.get(d, ANY) for d in DIMENSIONS)] = stats
+    return out
+
+
+class DistrictCube:
+    """
+    單一城市的統計方塊；key 為 (行政區, 類型, 屋齡區間, 房數)，不限的維度為 "*"
+    """
+
+    def __init__(self, cells, fingerprints, version=None):
+        self.cells = cells                  # key -> 統計陣列（對應 STAT_FIELDS）
+        self.fingerprints = fingerprints    # 最細格子 key -> 指紋
+        self.version = version
+
+    def __len__(self):
+        return len(self.cells)
+
+    @classmethod
+    def build(cls, cells_df, version=None):
+        cells = {}
+        for dims in _grouping_sets():
+            cells.update(_summarize(cells_df, dims))
+        return cls(cells, _fingerprints(cells_df), version)
+
+    def refresh(self, cells_df, version=None):
+        """
+        依新資料增量更新：只重算指紋有變的最細格子，以及包含它們的小計
+        回傳 (新方塊, 重算的最細格子數)
+        """
+        fingerprints = _fingerprints(cells_df)
+        dirty = {k for k in set(fingerprints) | set(self.fingerprints)
+                 if fingerprints.get(k) != self.fingerprints.get(k)}
+        cells = dict(self.cells)
+        if dirty:
+            for dims in _grouping_sets():
+                pos = [DIMENSIONS.index(d) for d in dims]
+                targets = {tuple(k[i] for i in pos) for k in dirty}
+                for target in targets:
+                    given = dict(zip(dims, target))
+                    cells.pop(tuple(given.get(d, ANY) for d in DIMENSIONS), None)
+                if dims:
+                    rows = pd.MultiIndex.from_frame(cells_df[list(dims)]).isin(list(targets))
+                else:
+                    rows = np.ones(len(cells_df), dtype=bool)
+                cells.update(_summarize(cells_df[rows], dims))
+        return DistrictCube(cells, fingerprints, version), len(dirty)
+
+    def get(self, district=ANY, housetype=ANY, age=ANY, rooms=ANY):
+        """查一個格子（不存在回傳 None）；回傳 dict"""
+        stats = self.cells.get((district, housetype, age, rooms))
+        return None if stats is None else dict(zip(STAT_FIELDS, stats.tolist()))
+
+    def compare(self, key, min_count=MIN_COUNT):
+        """
+        找出最細且筆數足夠的格子：依 FALLBACK 由細到粗
+        key 為某列的 (行政區, 類型, 屋齡區間, 房數)；回傳 (使用的維度, 統計 dict) 或 (None, None)
+        """
+        given = dict(zip(DIMENSIONS, key))
+        for dims in FALLBACK:
+            if any(given[d] == UNKNOWN for d in dims):
+                continue
+            stats = self.get(**{d: given[d] for d in dims})
+            if stats and stats["count"] >= min_count:
+                return dims, stats
+        return None, None
+
+    # ---------- 存檔 ----------
+    def save(self, path):
+        keys = list(self.cells)
+        fp_keys = list(self.fingerprints)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            cube_version=np.array(CUBE_VERSION),
+            source_version=np.array(self.version or (0, 0), dtype="int64"),
+            keys=np.array(keys, dtype=str).reshape(-1, len(DIMENSIONS)),
+            stats=np.array([self.cells[k] for k in keys], dtype="float64").reshape(-1, len(STAT_FIELDS)),
+            fp_keys=np.array(fp_keys, dtype=str).reshape(-1, len(DIMENSIONS)),
+            fp=np.array([self.fingerprints[k] for k in fp_keys], dtype="uint64"),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as z:
+                if int(z["cube_version"]) != CUBE_VERSION:
+                    return None
+                cells = {tuple(k): s for k, s in zip(z["keys"].tolist(), z["stats"])}
+                fingerprints = dict(zip(map(tuple, z["fp_keys"].tolist()), z["fp"].tolist()))
+                return cls(cells, fingerprints, tuple(z["source_version"].tolist()))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+# ===========================
+# 顯示用文字
+# ===========================
+DIM_NAMES = {"district": "同區", "housetype": "同類型", "age": "同屋齡", "rooms": "同房數"}
+
+
+def describe(key, dims, stats, unit_price=None):
+    """「西屯區 大樓 10-20年：單價中位數 40.1 萬/坪（P10~P90 32.0~51.3），本物件高 12%，共 85 筆」"""
+    scope = " ".join(str(v) for d, v in zip(DIMENSIONS, key) if d in dims) or "全市"
+    text = (
+        f"{scope}：單價中位數 {stats['unit_price_median'] / 10000:,.1f} 萬/坪"
+        f"（P10~P90 {stats['unit_price_p10'] / 10000:,.1f}~{stats['unit_price_p90'] / 10000:,.1f}），"
+        f"總價中位數 {stats['price_median']:,.0f} 萬，共 {stats['count']:,.0f} 筆"
+    )
+    median = stats["unit_price_median"]
+    if unit_price is not None and np.isfinite(unit_price) and median and np.isfinite(median):
+        diff = (unit_price - median) / median * 100
+        text += f"；本物件單價{'高' if diff >= 0 else '低'}於中位數 {abs(diff):.0f}%"
+    return text
+
+
+# ===========================
+# 行程共用快取
+# ===========================
+_CUBES = {}
+_LOCK = threading.Lock()
+
+
+class CityCube:
+    """城市資料 + 統計方塊（含每列的格子 key，查詢不用再掃資料）"""
+
+    def __init__(self, dataset, cube, keys, unit_price):
+        self.dataset = dataset
+        self.cube = cube
+        self.keys = keys
+        self.unit_price = unit_price
+
+    def for_row(self, row):
+        """資料列號 -> (格子 key, 使用的維度, 統計 dict)"""
+        key = self.keys[row]
+        dims, stats = self.cube.compare(key)
+        return key, dims, stats
+
+    def describe_row(self, row):
+        key, dims, stats = self.for_row(row)
+        return describe(key, dims, stats, self.unit_price[row]) if stats else ""
+
+
+def get_district_cube(csv_path):
+    """
+    取得城市的統計方塊；CSV 更新後以上一版為基礎增量重算並存檔
+    """
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    cached = _CUBES.get(key)
+    if cached is not None and cached.dataset is dataset:
+        return cached
+
+    with _LOCK:
+        cached = _CUBES.get(key)
+        if cached is not None and cached.dataset is dataset:
+            return cached
+        path = os.path.join(_store_path(csv_path), "cube.npz")
+        cells_df = cell_frame(dataset)
+        previous = cached.cube if cached is not None else DistrictCube.load(path)
+        if previous is not None and previous.version == dataset.version:
+            cube = previous
+        else:
+            if previous is None:
+                cube = DistrictCube.build(cells_df, dataset.version)
+            else:
+                cube, _ = previous.refresh(cells_df, dataset.version)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cube.save(path)
+        keys = list(cells_df[DIMENSIONS].itertuples(index=False, name=None))
+        cached = CityCube(dataset, cube, keys, cells_df["unit_price"].to_numpy())
+        _CUBES[key] = cached
+        return cached
@@ -0,0 +1,225 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+# ===========================
+# 向量快取（key = (模型名稱, row_to_text 雜湊)，存在 Data/.embeddings/<模型>/）
+# ===========================
+# 每次 save() 只把新向量寫成一個新的分段檔（vectors-<n>.npy），舊分段不重寫；
+# 分段數超過 MAX_SEGMENTS 時才合併成一個（偶爾一次整份重寫）。
+CACHE_DIR = os.path.join("./Data", ".embeddings")
+STORAGE_DTYPES = ("float32", "float16", "int8")
+DEFAULT_DTYPE = os.environ.get("EMBED_CACHE_DTYPE", "float32")
+MAX_SEGMENTS = 16
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _quantize(vectors, dtype):
+    """依儲存格式轉換；int8 以每列最大絕對值為刻度"""
+    vectors = np.asarray(vectors, dtype="float32")
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales[:, None]).astype("int8"), scales.astype("float32")
+    return vectors.astype(dtype), None
+
+
+def _dequantize(stored, scales):
+    out = np.asarray(stored, dtype="float32")
+    if scales is not None:
+        out = out * np.asarray(scales)[:, None]
+    return out
+
+
+class EmbeddingCache:
+    """
+    keys：雜湊列表（第 i 個雜湊對應所有分段依序接起來的第 i 列）
+    新向量先放在記憶體，save() 時寫成新的分段；lookup/put/save 共用同一把鎖
+    """
+
+    def __init__(self, model_name, cache_dir=CACHE_DIR, dtype=DEFAULT_DTYPE):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"不支援的儲存格式: {dtype}")
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, model_name)
+        self.dtype = dtype
+        self.keys = []
+        self.row_of = {}
+        self.dim = None
+        # 分段：[{"vectors": 檔名, "scales": 檔名或 None, "rows": 筆數}]，_arrays 為對應的 memmap
+        self.segments = []
+        self._arrays = []
+        self._starts = np.zeros(1, dtype="int64")
+        self._next_segment = 0
+        self._new_keys, self._new_vectors = [], []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def _open(self, segments):
+        arrays = []
+        for seg in segments:
+            vectors = np.load(os.path.join(self.path, seg["vectors"]), mmap_mode="r")
+            scales = np.load(os.path.join(self.path, seg["scales"]), mmap_mode="r") if seg["scales"] else None
+            arrays.append((vectors, scales))
+        return arrays
+
+    def _publish(self, keys, segments, arrays):
+        self.keys = keys
+        self.segments = segments
+        self._arrays = arrays
+        self._starts = np.concatenate([[0], np.cumsum([seg["rows"] for seg in segments])]).astype("int64")
+        if arrays:
+            self.dim = arrays[0][0].shape[1]
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("dtype") != self.dtype:
+            return
+        segments = meta.get("segments")
+        if segments is None:
+            # 舊格式：單一 vectors.npy
+            segments = [{"vectors": "vectors.npy", "scales": "scales.npy" if self.dtype == "int8" else None,
+                         "rows": len(meta["keys"])}]
+        self._publish(meta["keys"], segments, self._open(segments))
+        self.row_of = {k: i for i, k in enumerate(self.keys)}
+        self._next_segment = meta.get("next_segment", 0)
+
+    # ---------- 查詢/寫入 ----------
+    def _gather(self, rows):
+        """已存檔的列（跨分段）轉成 float32"""
+        seg_of = np.searchsorted(self._starts, rows, side="right") - 1
+        out = np.empty((len(rows), self.dim), dtype="float32")
+        for seg in np.unique(seg_of):
+            sel = seg_of == seg
+            local = rows[sel] - self._starts[seg]
+            vectors, scales = self._arrays[seg]
+            out[sel] = _dequantize(vectors[local], None if scales is None else scales[local])
+        return out
+
+    def lookup(self, hashes):
+        """回傳 (命中遮罩, 命中向量 float32)"""
+        with self._lock:
+            rows = np.array([self.row_of.get(h, -1) for h in hashes], dtype="int64")
+            found = rows >= 0
+            hit_rows = rows[found]
+            if not len(hit_rows):
+                return found, np.zeros((0, self.dim or 0), dtype="float32")
+
+            n_stored = len(self.keys)
+            old = hit_rows < n_stored
+            out = np.empty((len(hit_rows), self.dim), dtype="float32")
+            if old.any():
+                out[old] = self._gather(hit_rows[old])
+            if (~old).any():
+                out[~old] = np.stack([self._new_vectors[r - n_stored] for r in hit_rows[~old]])
+            return found, out
+
+    def put(self, hashes, vectors):
+        with self._lock:
+            vectors = np.asarray(vectors, dtype="float32")
+            if len(vectors) and self.dim is None:
+                self.dim = vectors.shape[1]
+            for h, v in zip(hashes, vectors):
+                if h in self.row_of:
+                    continue
+                self.row_of[h] = len(self.keys) + len(self._new_keys)
+                self._new_keys.append(h)
+                self._new_vectors.append(v)
+
+    def encode(self, texts, encode):
+        """只對快取沒有的文字呼叫 encode，回傳與 texts 對齊的 float32 矩陣"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim or 0), dtype="float32")
+        hashes = [text_hash(t) for t in texts]
+        found, cached = self.lookup(hashes)
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+
+        missing = [i for i, hit in enumerate(found) if not hit]
+        fresh = np.asarray(encode([texts[i] for i in missing]), dtype="float32") if missing else None
+        if fresh is not None:
+            self.put([hashes[i] for i in missing], fresh)
+
+        dim = cached.shape[1] if len(cached) else fresh.shape[1]
+        out = np.empty((len(texts), dim), dtype="float32")
+        if len(cached):
+            out[found] = cached
+        if fresh is not None:
+            out[~found] = fresh
+        return out
+
+    # ---------- 存檔 ----------
+    def _write_segment(self, vectors, scales):
+        n = self._next_segment
+        self._next_segment += 1
+        seg = {"vectors": f"vectors-{n}.npy", "scales": f"scales-{n}.npy" if scales is not None else None,
+               "rows": len(vectors)}
+        for name, arr in ((seg["vectors"], vectors), (seg["scales"], scales)):
+            if arr is None:
+                continue
+            tmp = os.path.join(self.path, f"{name}.tmp.npy")
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(self.path, name))
+        return seg
+
+    def save(self):
+        """新向量寫成一個新分段（不重寫舊分段）；分段太多時合併成一個"""
+        with self._lock:
+            if not self._new_keys:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            new_stored, new_scales = _quantize(np.stack(self._new_vectors), self.dtype)
+            segments = self.segments + [self._write_segment(new_stored, new_scales)]
+            obsolete = []
+            if len(segments) > MAX_SEGMENTS:
+                arrays = self._arrays + [(new_stored, new_scales)]
+                stored = np.concatenate([np.asarray(v) for v, _ in arrays])
+                scales = None if new_scales is None else np.concatenate([np.asarray(sc) for _, sc in arrays])
+                obsolete = segments
+                segments = [self._write_segment(stored, scales)]
+
+            keys = self.keys + self._new_keys
+            meta = {"model": self.model_name, "dtype": self.dtype, "keys": keys,
+                    "segments": segments, "next_segment": self._next_segment}
+            tmp = os.path.join(self.path, "meta.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+            self._publish(keys, segments, self._open(segments))
+            self._new_keys, self._new_vectors = [], []
+            for seg in obsolete:
+                for name in (seg["vectors"], seg["scales"]):
+                    if name:
+                        try:
+                            os.remove(os.path.join(self.path, name))
+                        except FileNotFoundError:
+                            pass
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(model_name, cache_dir=CACHE_DIR):
+    """行程共用的向量快取（每個模型一份）"""
+    key = (model_name, os.path.abspath(cache_dir))
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = EmbeddingCache(model_name, cache_dir)
+        return _CACHES[key]
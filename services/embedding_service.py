@@ -0,0 +1,144 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+# ===========================
+# 共用向量化服務（每個行程只載入一次模型，跨 session 合併批次）
+# ===========================
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# 可用環境變數調整
+MAX_BATCH_SIZE = int(os.environ.get("EMBED_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.environ.get("EMBED_MAX_WAIT_MS", "10"))
+NUM_THREADS = int(os.environ.get("EMBED_THREADS", "0")) or None
+
+
+def _load_sentence_transformer(model_name, num_threads):
+    """只用 CPU 載入 SentenceTransformer"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    return SentenceTransformer(model_name, device="cpu")
+
+
+class EmbeddingService:
+    """
+    背景執行緒收集 encode 請求：湊滿 max_batch_size 或等待超過 max_wait_ms
+    就合併成一批送進模型，再把結果拆回各自的請求
+    """
+
+    def __init__(self, model_name=MODEL_NAME, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, num_threads=NUM_THREADS, loader=None):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.num_threads = num_threads
+        self._loader = loader or _load_sentence_transformer
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.batches = 0
+
+    # ---------- 模型 ----------
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._loader(self.model_name, self.num_threads)
+        return self._model
+
+    def warm_up(self):
+        """載入模型並先跑一次推論，避免第一個使用者等待"""
+        self.model.encode(["暖機"], show_progress_bar=False)
+        self._ensure_worker()
+
+    def warm_up_async(self):
+        t = threading.Thread(target=self.warm_up, name="embedding-warm-up", daemon=True)
+        t.start()
+        return t
+
+    # ---------- 請求 ----------
+    def encode(self, texts):
+        """回傳 float32 向量矩陣（可被多個 session 同時呼叫）"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+                    self._worker.start()
+
+    def _collect(self):
+        """取出一批請求：第一筆到達後最多再等 max_wait 秒"""
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [t for req, _ in pending for t in req]
+            try:
+                vectors = np.asarray(
+                    self.model.encode(texts, batch_size=self.max_batch_size, show_progress_bar=False),
+                    dtype="float32",
+                )
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            start = 0
+            for req, future in pending:
+                future.set_result(vectors[start:start + len(req)])
+                start += len(req)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """行程共用的向量化服務"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
+
+
+def encode(texts):
+    return get_embedding_service().encode(texts)
+
+
+if __name__ == "__main__":
+    service = get_embedding_service()
+    start = time.perf_counter()
+    service.warm_up()
+    print(f"模型 {service.model_name} 暖機完成：{time.perf_counter() - start:.2f} 秒")
@@ -0,0 +1,139 @@
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.listing_store import load_dataset
+from services.comparables import get_comparables_engine, unit_prices
+
+# ===========================
+# 收藏房產批次預先計算（比較物件、行政區單價百分位、偏離程度）
+# ===========================
+TOP_K = 10
+# 行程內最多保留幾筆收藏的統計（超過時淘汰最久沒用到的）
+MAX_RESULTS = 5000
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="favorites-batch")
+_results = OrderedDict()   # (資料路徑, 資料版本, 編號) -> 統計（LRU）
+_pending = {}              # (資料路徑, 資料版本, 編號們) -> Future
+_district_prices = {}      # (資料名稱, 資料版本) -> {行政區代碼: 排序好的單價}
+_lock = threading.Lock()
+
+
+def _key(csv_path, dataset, listing_id):
+    return os.path.abspath(csv_path), dataset.version, str(listing_id)
+
+
+def _district_sorted_prices(dataset, prices):
+    """各行政區的有效單價（已排序），同一版資料只算一次"""
+    key = (dataset.name, dataset.version)
+    cached = _district_prices.get(key) if dataset.version is not None else None
+    if cached is None:
+        codes = np.asarray(dataset.columns["district"])
+        valid = np.isfinite(prices)
+        cached = {
+            int(code): np.sort(prices[valid & (codes == code)])
+            for code in np.unique(codes[valid])
+        }
+        if dataset.version is not None:
+            with _lock:
+                # 同一份資料的舊版本不再需要
+                for old in [k for k in _district_prices if k[0] == dataset.name]:
+                    del _district_prices[old]
+                _district_prices[key] = cached
+    return cached
+
+
+def compute_favorite_stats(dataset, engine, ids, k=TOP_K):
+    """
+    一次算出多筆收藏的統計（回傳 編號 -> dict）
+    comps: 同類型比較物件 編號；percentile: 單價在同行政區的百分位；
+    deviation: 單價相對比較物件中位數的偏離比例
+    """
+    rows = dataset.find(ids)
+    if not len(rows):
+        return {}
+    prices = unit_prices(dataset)
+    comp_rows, comp_dist = engine.query(rows, k=k, same_type=True)
+
+    # 比較物件單價中位數（Q×k 一次算）
+    comp_prices = np.where(comp_rows >= 0, prices[np.maximum(comp_rows, 0)], np.nan)
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        comp_median = np.nanmedian(comp_prices, axis=1)
+        deviation = (prices[rows] - comp_median) / comp_median
+
+    # 行政區百分位與中位數：依行政區分組後 searchsorted
+    codes = np.asarray(dataset.columns["district"])[rows]
+    district_prices = _district_sorted_prices(dataset, prices)
+    percentile = np.full(len(rows), np.nan)
+    district_median = np.full(len(rows), np.nan)
+    for code in np.unique(codes):
+        sorted_prices = district_prices.get(int(code))
+        if sorted_prices is None or not len(sorted_prices):
+            continue
+        sel = codes == code
+        percentile[sel] = np.searchsorted(sorted_prices, prices[rows][sel], side="right") / len(sorted_prices) * 100
+        district_median[sel] = np.median(sorted_prices)
+
+    ids_col = np.asarray(dataset.columns["id"])
+    district_labels = dataset.labels("district")
+    out = {}
+    for i, row in enumerate(rows):
+        valid = comp_rows[i] >= 0
+        out[str(ids_col[row])] = {
+            "row": int(row),
+            "district": district_labels[codes[i]] if codes[i] >= 0 else "",
+            "unit_price": float(prices[row]),
+            "district_median_unit_price": float(district_median[i]),
+            "district_percentile": float(percentile[i]),
+            "comps": [str(ids_col[r]) for r in comp_rows[i][valid]],
+            "comp_distances": [float(d) for d in comp_dist[i][valid]],
+            "comps_median_unit_price": float(comp_median[i]),
+            "deviation": float(deviation[i]),
+        }
+    return out
+
+
+def _run_batch(csv_path, ids):
+    dataset = load_dataset(csv_path)
+    stats = compute_favorite_stats(dataset, get_comparables_engine(csv_path), ids)
+    with _lock:
+        path = os.path.abspath(csv_path)
+        for old in [k for k in _results if k[0] == path and k[1] != dataset.version]:
+            del _results[old]
+        for pid, value in stats.items():
+            _results[_key(csv_path, dataset, pid)] = value
+        while len(_results) > MAX_RESULTS:
+            _results.popitem(last=False)
+    return stats
+
+
+def submit_favorites(csv_path, ids):
+    """
+    在背景計算尚未快取的收藏（不阻塞畫面），回傳 Future 或 None（全部已有結果）
+    """
+    dataset = load_dataset(csv_path)
+    with _lock:
+        todo = sorted({str(pid) for pid in ids if _key(csv_path, dataset, pid) not in _results})
+        if not todo:
+            return None
+        key = (os.path.abspath(csv_path), dataset.version, tuple(todo))
+        future = _pending.get(key)
+        if future is None or future.done():
+            future = _executor.submit(_run_batch, csv_path, todo)
+            _pending[key] = future
+            future.add_done_callback(lambda _, key=key: _pending.pop(key, None))
+        return future
+
+
+def get_favorite_stats(csv_path, listing_id):
+    """取得已預先算好的統計；還沒算完回傳 None"""
+    dataset = load_dataset(csv_path)
+    key = _key(csv_path, dataset, listing_id)
+    with _lock:
+        stats = _results.get(key)
+        if stats is not None:
+            _results.move_to_end(key)
+        return stats
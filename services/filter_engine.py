@@ -0,0 +1,117 @@
+import numpy as np
+from services.listing_store import INT_NULL
+
+# 沒有車位的 車位 標籤
+NO_PARKING_LABELS = {"無車位", "無", "0", ""}
+
+# 特殊要求欄位（int 代表精確值，dict 代表 {"min", "max"} 區間）
+RANGE_KEYS = ["rooms", "living_rooms", "bathrooms", "floor"]
+
+
+def _as_range(spec):
+    """把 3 / {"min": 1, "max": 5} 統一轉成 (lo, hi)，None 代表不限"""
+    if isinstance(spec, dict):
+        return spec.get("min"), spec.get("max")
+    return spec, spec
+
+
+def housetype_codes(dataset, housetype):
+    """找出 類型 標籤包含關鍵字的類別代碼（不分大小寫）"""
+    needle = str(housetype).lower()
+    return np.array(
+        [i for i, label in enumerate(dataset.labels("housetype")) if needle in label.lower()],
+        dtype="int16",
+    )
+
+
+def parking_codes(dataset):
+    """找出「有車位」的類別代碼"""
+    return np.array(
+        [i for i, label in enumerate(dataset.labels("parking")) if label not in NO_PARKING_LABELS],
+        dtype="int16",
+    )
+
+
+def _codes_mask(col, codes, n_labels, out):
+    """以查表取代 np.isin：lut[代碼] 即是否命中（代碼 -1 對到最後一格的 False）"""
+    lut = np.zeros(n_labels + 1, dtype=bool)
+    lut[codes] = True
+    np.take(lut, col, out=out)
+
+
+def compile_filters(filters):
+    """
+    把表單的篩選條件轉成述詞清單 [(欄位, 運算, 參數), ...]
+    只保留實際有作用的條件
+    """
+    preds = []
+    housetype = filters.get("housetype", "不限")
+    if housetype and housetype != "不限":
+        preds.append(("housetype", "codes", housetype))
+
+    if filters.get("budget_min", 0) > 0:
+        preds.append(("price", ">=", filters["budget_min"]))
+    if filters.get("budget_max", 1000000) < 1000000:
+        preds.append(("price", "<=", filters["budget_max"]))
+
+    if filters.get("age_min", 0) > 0:
+        preds.append(("age", ">=", filters["age_min"]))
+    if filters.get("age_max", 100) < 100:
+        preds.append(("age", "<=", filters["age_max"]))
+
+    if filters.get("area_min", 0) > 0:
+        preds.append(("area", ">=", filters["area_min"]))
+    if filters.get("area_max", 1000) < 1000:
+        preds.append(("area", "<=", filters["area_max"]))
+
+    car_grip = filters.get("car_grip", "不限")
+    if car_grip in ("需要", "不要"):
+        preds.append(("parking", "has" if car_grip == "需要" else "none", None))
+
+    # 生活機能（需先算好 accessibility 欄位，沒有欄位時略過）
+    if filters.get("walk_score_min", 0) > 0:
+        preds.append(("walk_score", ">=", filters["walk_score_min"]))
+    for category, meters in (filters.get("near") or {}).items():
+        preds.append((f"{category}_nearest", "<=", meters))
+
+    for key in RANGE_KEYS:
+        if filters.get(key) is None:
+            continue
+        lo, hi = _as_range(filters[key])
+        if lo is not None:
+            preds.append((key, "int>=", int(lo)))
+        if hi is not None:
+            preds.append((key, "int<=", int(hi)))
+    return preds
+
+
+def build_mask(dataset, filters):
+    """
+    依篩選條件算出單一布林遮罩（不複製資料，逐條件就地 AND）
+    """
+    cols = dataset.columns
+    mask = np.ones(len(dataset), dtype=bool)
+    cond = np.empty_like(mask)
+
+    for key, op, arg in compile_filters(filters):
+        col = cols.get(key)
+        if col is None:
+            continue
+        if op == ">=":
+            np.greater_equal(col, arg, out=cond)
+        elif op == "<=":
+            np.less_equal(col, arg, out=cond)
+        elif op == "codes":
+            _codes_mask(col, housetype_codes(dataset, arg), len(dataset.labels(key)), cond)
+        elif op in ("has", "none"):
+            _codes_mask(col, parking_codes(dataset), len(dataset.labels(key)), cond)
+            if op == "none":
+                np.logical_not(cond, out=cond)
+        elif op == "int>=":
+            np.greater_equal(col, arg, out=cond)
+            cond &= col != INT_NULL
+        elif op == "int<=":
+            np.less_equal(col, arg, out=cond)
+            cond &= col != INT_NULL
+        mask &= cond
+    return mask
@@ -0,0 +1,203 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import Future
+from services.listing_store import DATA_DIR
+
+# ===========================
+# Gemini 呼叫層：回應快取（內容定址）+ 同時相同請求只送一次
+# ===========================
+# key = sha256(模型名稱 + 提示詞)；快取存在 SQLite，超過 TTL 失效、超過 MAX_ENTRIES 依最近使用淘汰。
+MODEL_NAME = "gemini-2.0-flash"
+CACHE_PATH = os.path.join(DATA_DIR, ".gemini", "responses.sqlite")
+TTL_HOURS = float(os.environ.get("GEMINI_CACHE_TTL_HOURS", 24 * 7))
+MAX_ENTRIES = int(os.environ.get("GEMINI_CACHE_MAX_ENTRIES", 2000))
+
+
+def prompt_key(model, prompt):
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+# ===========================
+# 後端
+# ===========================
+class GenaiBackend:
+    """google-generativeai（使用時才載入套件）"""
+
+    # genai.configure 是全域設定，generate_content 送出時才取用；
+    # 同一把金鑰的請求可以同時進行，換金鑰要等使用中的請求都結束（避免算到別人的金鑰）
+    _gate = threading.Condition()
+    _active_key = None
+    _active = 0
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def generate(self, model, prompt):
+        import google.generativeai as genai
+
+        cls = type(self)
+        with cls._gate:
+            while cls._active and cls._active_key != self.api_key:
+                cls._gate.wait()
+            if cls._active_key != self.api_key:
+                genai.configure(api_key=self.api_key)
+                cls._active_key = self.api_key
+            cls._active += 1
+        try:
+            return genai.GenerativeModel(model).generate_content(prompt).text or ""
+        finally:
+            with cls._gate:
+                cls._active -= 1
+                if not cls._active:
+                    cls._gate.notify_all()
+
+
+class FakeBackend:
+    """
+    測試用：不連網，回傳 responses[提示詞] 或 responder(提示詞)
+    calls 記錄實際送出的提示詞，delay 模擬網路延遲
+    """
+
+    def __init__(self, responses=None, responder=None, delay=0.0):
+        self.responses = responses or {}
+        self.responder = responder or (lambda prompt: f"[fake] {prompt[:40]}")
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate(self, model, prompt):
+        with self._lock:
+            self.calls.append(prompt)
+        if self.delay:
+            time.sleep(self.delay)
+        return self.responses.get(prompt) or self.responder(prompt)
+
+
+# ===========================
+# 快取
+# ===========================
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, ttl_hours=TTL_HOURS, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, response, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            # 過期的先刪，仍超過上限再依最近使用時間淘汰
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+# ===========================
+# 客戶端
+# ===========================
+class GeminiClient:
+    """
+    generate(prompt) 先查快取；相同請求正在進行中就等同一個結果，不重複呼叫
+    失敗不寫入快取（下次會重試）
+    """
+
+    def __init__(self, backend, cache=None, model=MODEL_NAME):
+        self.backend = backend
+        self.cache = cache
+        self.model = model
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt, model=None, use_cache=True):
+        model = model or self.model
+        key = prompt_key(model, prompt)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            self.calls += 1
+            text = self.backend.generate(model, prompt)
+            if self.cache is not None:
+                self.cache.put(key, model, text)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+_CACHE = None
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_gemini_client(api_key, backend=None):
+    """同一個金鑰共用一個客戶端；所有客戶端共用同一份回應快取"""
+    global _CACHE
+    with _CLIENTS_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache()
+        client = _CLIENTS.get(api_key)
+        if client is None or (backend is not None and client.backend is not backend):
+            client = GeminiClient(backend or GenaiBackend(api_key), _CACHE)
+            _CLIENTS[api_key] = client
+        return client
+
+
+def generate(api_key, prompt, model=MODEL_NAME):
+    """畫面端使用：回傳 Gemini 回應文字"""
+    return get_gemini_client(api_key).generate(prompt, model)
@@ -0,0 +1,248 @@
+import os
+import time
+import random
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+import requests
+from services.listing_store import DATA_DIR, load_dataset
+
+# ===========================
+# 地址座標快取（SQLite，依正規化地址為 key，有效期限 TTL）
+# ===========================
+# 物件地址只到路段（「台中市西屯區國安一路」），數千筆物件只有幾百條路，
+# 先用 python -m services.geocoder 批次查好，比較房屋時就不用再呼叫 Geocoding API。
+CACHE_PATH = os.path.join(DATA_DIR, ".geocode", "geocode.sqlite")
+TTL_DAYS = float(os.environ.get("GEOCODE_TTL_DAYS", 180))
+# 查無結果也記下來，避免一直重查；較短的期限讓地址修正後有機會再試
+NEGATIVE_TTL_DAYS = 7
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+
+class GeocodeError(Exception):
+    """Geocoding API 回傳錯誤（金鑰無效、請求被拒…）"""
+
+
+class GeocodeRateLimited(GeocodeError):
+    """OVER_QUERY_LIMIT，需要降速重試"""
+
+
+def normalize_address(address):
+    """全形轉半形、臺→台、去掉空白，讓同一條路只有一個 key"""
+    text = unicodedata.normalize("NFKC", str(address or ""))
+    return "".join(text.split()).replace("臺", "台")
+
+
+# ===========================
+# 查詢來源
+# ===========================
+class GoogleGeocoder:
+    def __init__(self, api_key, timeout=10, session=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def geocode(self, address):
+        """回傳 (lat, lng)；查無結果回傳 None"""
+        params = {"address": address, "key": self.api_key, "language": "zh-TW"}
+        data = self.session.get(GEOCODE_URL, params=params, timeout=self.timeout).json()
+        status = data.get("status")
+        if status == "OK" and data.get("results"):
+            loc = data["results"][0]["geometry"]["location"]
+            return loc["lat"], loc["lng"]
+        if status == "ZERO_RESULTS":
+            return None
+        if status == "OVER_QUERY_LIMIT":
+            raise GeocodeRateLimited(status)
+        raise GeocodeError(f"Geocoding error: {status}")
+
+
+class MockGeocoder:
+    """
+    測試用：不連網，依地址雜湊產生台灣範圍內固定的座標
+    calls 記錄實際被查詢的地址
+    """
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        if address in self.missing:
+            return None
+        h = int(hashlib.sha1(address.encode("utf-8")).hexdigest()[:12], 16)
+        return 22.0 + (h % 30000) / 10000, 120.2 + (h // 30000 % 18000) / 10000
+
+
+# ===========================
+# 快取
+# ===========================
+class GeocodeCache:
+    def __init__(self, path=CACHE_PATH, ttl_days=TTL_DAYS, negative_ttl_days=NEGATIVE_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " address TEXT PRIMARY KEY, lat REAL, lng REAL, updated REAL NOT NULL)"
+            )
+
+    def lookup(self, address, now=None):
+        """
+        回傳 (命中, 座標)：命中且有座標 → (True, (lat, lng))；
+        命中但查無結果 → (True, None)；沒有或已過期 → (False, None)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lng, updated FROM geocode WHERE address = ?", (normalize_address(address),)
+            ).fetchone()
+        if row is None:
+            return False, None
+        lat, lng, updated = row
+        ttl = self.ttl if lat is not None else self.negative_ttl
+        if now - updated > ttl:
+            return False, None
+        return True, (None if lat is None else (lat, lng))
+
+    def lookup_many(self, addresses, now=None):
+        """一次查多筆（批次計算用）：回傳 {正規化地址: (lat, lng)}，只含未過期且有座標的"""
+        now = time.time() if now is None else now
+        wanted = {normalize_address(a) for a in addresses}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT address, lat, lng FROM geocode WHERE lat IS NOT NULL AND updated >= ?", (now - self.ttl,)
+            ).fetchall()
+        return {a: (lat, lng) for a, lat, lng in rows if a in wanted}
+
+    def fresh_keys(self, now=None):
+        """尚未過期的地址 key（批次查詢用來跳過）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT address FROM geocode WHERE (lat IS NOT NULL AND updated >= ?) OR updated >= ?",
+                (now - self.ttl, now - self.negative_ttl),
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def put(self, address, location, now=None):
+        now = time.time() if now is None else now
+        lat, lng = location if location else (None, None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode (address, lat, lng, updated) VALUES (?, ?, ?, ?)",
+                (normalize_address(address), lat, lng, now),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_CACHES = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_geocode_cache(path=CACHE_PATH):
+    """行程共用的快取（同一個檔案只開一次連線）"""
+    key = os.path.abspath(path)
+    with _CACHE_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = GeocodeCache(path)
+        return _CACHES[key]
+
+
+def _with_retry(geocoder, address, max_attempts=5, base_delay=1.0, max_delay=30.0):
+    """OVER_QUERY_LIMIT 時以指數退避 + 隨機抖動重試"""
+    for attempt in range(max_attempts):
+        try:
+            return geocoder.geocode(address)
+        except GeocodeRateLimited:
+            if attempt == max_attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+def geocode(address, geocoder, cache=None):
+    """先查快取，沒有才呼叫 geocoder 並寫回快取；回傳 (lat, lng) 或 None"""
+    cache = get_geocode_cache() if cache is None else cache
+    hit, location = cache.lookup(address)
+    if hit:
+        return location
+    location = _with_retry(geocoder, normalize_address(address))
+    cache.put(address, location)
+    return location
+
+
+# ===========================
+# 批次預先查詢
+# ===========================
+def listing_addresses(data_dir=DATA_DIR):
+    """所有城市 CSV 的地址（已正規化、去重）"""
+    addresses = set()
+    for f in sorted(os.listdir(data_dir)):
+        if f.endswith("_buy_properties.csv"):
+            dataset = load_dataset(os.path.join(data_dir, f))
+            addresses.update(normalize_address(a) for a in set(dataset.columns["address"].tolist()))
+    addresses.discard("")
+    return sorted(addresses)
+
+
+def pregeocode(addresses, geocoder, cache=None, rate=10.0, log=print):
+    """
+    批次查詢尚未快取（或已過期）的地址；同一條路只查一次
+    rate 為每秒最多請求數；回傳 {"total", "cached", "fetched", "missing", "failed"}
+    """
+    cache = get_geocode_cache() if cache is None else cache
+    unique = sorted({normalize_address(a) for a in addresses} - {""})
+    fresh = cache.fresh_keys()
+    todo = [a for a in unique if a not in fresh]
+    summary = {"total": len(unique), "cached": len(unique) - len(todo), "fetched": 0, "missing": 0, "failed": 0}
+
+    interval = 1.0 / rate if rate else 0.0
+    next_at = time.monotonic()
+    for i, address in enumerate(todo, 1):
+        wait = next_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        next_at = max(next_at, time.monotonic()) + interval
+        try:
+            location = _with_retry(geocoder, address)
+        except (GeocodeError, requests.RequestException) as e:
+            summary["failed"] += 1
+            log(f"❌ {address}: {e}")
+            continue
+        cache.put(address, location)
+        summary["fetched" if location else "missing"] += 1
+        if i % 200 == 0:
+            log(f"進度 {i}/{len(todo)}")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="批次查詢物件地址座標並寫入快取")
+    parser.add_argument("--key", default=os.environ.get("GOOGLE_MAPS_KEY", ""), help="Google Maps Server Key")
+    parser.add_argument("--mock", action="store_true", help="使用不連網的假座標（測試用）")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--rate", type=float, default=10.0, help="每秒最多請求數")
+    args = parser.parse_args()
+    if not args.mock and not args.key:
+        parser.error("請提供 --key 或設定 GOOGLE_MAPS_KEY（或使用 --mock）")
+
+    geocoder = MockGeocoder() if args.mock else GoogleGeocoder(args.key)
+    result = pregeocode(listing_addresses(), geocoder, GeocodeCache(args.cache), rate=args.rate)
+    print(f"地址 {result['total']} 條：已快取 {result['cached']}、新查詢 {result['fetched']}、"
+          f"查無結果 {result['missing']}、失敗 {result['failed']}")
@@ -0,0 +1,121 @@
+import re
+import numpy as np
+import pandas as pd
+
+# 整數欄位的缺值代表值（"--"、空值或無法解析）
+INT_NULL = np.iinfo(np.int16).min
+
+# 格局："3房2廳2衛"、"4房2廳2.5衛1室(含加蓋1房)"；括號內的加蓋不計入
+LAYOUT_RE = re.compile(r'(?:(\d+)房)?(?:(\d+)廳)?(?:(\d+(?:\.\d+)?)衛)?(?:(\d+)室)?')
+LAYOUT_FIELDS = ["rooms", "living_rooms", "bathrooms"]
+
+# 樓層："5樓/15樓"、"2-3樓/5樓"、"B1-3樓/5樓"、"-1~-2樓/6樓"、"1、4-5樓/5樓"
+# 數字前的 "-" 若緊接在數字後面是區間符號，否則是地下樓層
+FLOOR_TOKEN_RE = re.compile(r'B(\d+)|(?<!\d)-(\d+)|(\d+)')
+TOTAL_FLOORS_RE = re.compile(r'^(\d+)樓$')
+FLOOR_FIELDS = ["floor", "total_floors"]
+
+EMPTY_VALUES = {"", "--", "nan"}
+
+
+def parse_layout(text):
+    """
+    "3房2廳2衛" -> (3, 2, 2)；衛浴的 .5 套無條件捨去
+    空值或 "--" 回傳 None，格式不符回傳 False
+    """
+    s = str(text).strip() if text is not None else ""
+    if s in EMPTY_VALUES:
+        return None
+    main = s.split("(", 1)[0]
+    m = LAYOUT_RE.fullmatch(main)
+    if not m or not any(m.groups()):
+        return False
+    rooms, living, baths, _ = m.groups()
+    return (
+        int(rooms or 0),
+        int(living or 0),
+        int(float(baths)) if baths else 0,
+    )
+
+
+def parse_floor(text):
+    """
+    "5樓/15樓" -> (5, 15)；多樓層取最低樓層，地下室為負數
+    空值或 "--" 回傳 None，格式不符回傳 False
+    """
+    s = str(text).strip() if text is not None else ""
+    if s in EMPTY_VALUES:
+        return None
+    unit, sep, total = s.partition("/")
+    if not sep:
+        return False
+    m = TOTAL_FLOORS_RE.match(total.strip())
+    total_floors = int(m.group(1)) if m else INT_NULL
+
+    unit = unit.strip()
+    if not unit.endswith("樓"):
+        return False
+    unit = unit[:-1].replace("等", "")
+    floors = []
+    for basement, negative, plain in FLOOR_TOKEN_RE.findall(unit):
+        floors.append(-int(basement or negative) if (basement or negative) else int(plain))
+    if not floors:
+        # "--樓/5樓" 只有總樓層
+        return (INT_NULL, total_floors) if unit.strip("-") == "" else False
+    return min(floors), total_floors
+
+
+def _parse_unique(values, parser, fields):
+    """
+    只對不重複的字串解析一次，再用代碼展開回每一列
+    回傳 (欄位陣列 dict, 統計)
+    """
+    s = pd.Series(values, dtype="object").fillna("").astype(str)
+    codes, uniques = pd.factorize(s)
+    table = np.full((len(uniques) + 1, len(fields)), INT_NULL, dtype="int16")
+    status = np.zeros(len(uniques) + 1, dtype="int8")  # 0=空值 1=成功 2=失敗
+    failed = []
+    for i, text in enumerate(uniques):
+        result = parser(text)
+        if result is None:
+            continue
+        if result is False:
+            status[i] = 2
+            failed.append(text)
+            continue
+        table[i] = result
+        status[i] = 1
+
+    rows = table[codes]
+    row_status = status[codes]
+    columns = {name: np.ascontiguousarray(rows[:, j]) for j, name in enumerate(fields)}
+    stats = {
+        "total": int(len(s)),
+        "parsed": int((row_status == 1).sum()),
+        "empty": int((row_status == 0).sum()),
+        "unparsed": int((row_status == 2).sum()),
+        "unparsed_examples": failed[:10],
+    }
+    return columns, stats
+
+
+def parse_layout_columns(values):
+    """格局欄 -> rooms / living_rooms / bathrooms 整數欄與統計"""
+    return _parse_unique(values, parse_layout, LAYOUT_FIELDS)
+
+
+def parse_floor_columns(values):
+    """樓層欄 -> floor / total_floors 整數欄與統計"""
+    return _parse_unique(values, parse_floor, FLOOR_FIELDS)
+
+
+def format_stats(name, stats):
+    """解析覆蓋率的文字摘要"""
+    total = stats["total"] or 1
+    line = (
+        f"{name}: 成功 {stats['parsed']}/{stats['total']} ({stats['parsed'] / total:.1%})，"
+        f"空值 {stats['empty']}，無法解析 {stats['unparsed']}"
+    )
+    if stats["unparsed_examples"]:
+        line += f"（例：{'、'.join(stats['unparsed_examples'][:5])}）"
+    return line
@@ -0,0 +1,279 @@
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from services.layout_parser import INT_NULL, parse_layout_columns, parse_floor_columns, format_stats
+
+# ===========================
+# 房產資料欄位設定
+# ===========================
+DATA_DIR = "./Data"
+STORE_VERSION = 4
+
+# 屋齡為「預售」時使用的代表值（缺值則為 NaN）
+AGE_PRESALE = -1.0
+
+# (內部欄位名, CSV 欄位名, 型態)
+SCHEMA = [
+    ("title", "標題", "text"),
+    ("address", "地址", "text"),
+    ("age_text", "屋齡", "text"),
+    ("housetype", "類型", "category"),
+    ("area", "建坪", "float"),
+    ("main_area", "主+陽", "float"),
+    ("layout", "格局", "text"),
+    ("floor_text", "樓層", "text"),
+    ("parking", "車位", "category"),
+    ("price", "總價(萬)", "float"),
+    ("id", "編號", "text"),
+]
+
+
+def parse_age(values):
+    """把「18.1年」/「預售」/空值 轉成浮點數陣列"""
+    s = pd.Series(values, dtype="object").fillna("").astype(str).str.strip()
+    age = pd.to_numeric(s.str.replace("年", "", regex=False), errors="coerce").to_numpy(dtype="float64", copy=True)
+    age[(s == "預售").to_numpy()] = AGE_PRESALE
+    return age
+
+
+def parse_district(values):
+    """「台中市西屯區國安一路」-> 「西屯區」；抓不到回傳空字串"""
+    s = pd.Series(values, dtype="object").fillna("").astype(str)
+    return s.str.extract(r'^.{2}[市縣](.{1,3}?[區鄉鎮市])', expand=False).fillna("")
+
+
+def build_columns(df):
+    """
+    把原始 DataFrame 轉成型別化的欄位陣列
+    回傳 (columns, categories, parse_stats)
+    """
+    columns, categories, parse_stats = {}, {}, {}
+    for key, source, kind in SCHEMA:
+        raw = df[source] if source in df.columns else pd.Series([None] * len(df))
+        if kind == "text":
+            columns[key] = raw.fillna("").astype(str).to_numpy(dtype=str)
+        elif kind == "float":
+            columns[key] = pd.to_numeric(raw, errors="coerce").to_numpy(dtype="float64")
+        elif kind == "category":
+            cat = pd.Categorical(raw)
+            columns[key] = cat.codes.astype("int16")
+            categories[key] = [str(c) for c in cat.categories]
+    columns["age"] = parse_age(columns["age_text"])
+    district = pd.Categorical(parse_district(columns["address"]).replace("", None))
+    columns["district"] = district.codes.astype("int16")
+    categories["district"] = [str(c) for c in district.categories]
+    # 格局/樓層 -> 整數欄位（缺值為 INT_NULL，供特殊要求篩選）
+    layout_cols, parse_stats["格局"] = parse_layout_columns(columns["layout"])
+    floor_cols, parse_stats["樓層"] = parse_floor_columns(columns["floor_text"])
+    columns.update(layout_cols)
+    columns.update(floor_cols)
+    return columns, categories, parse_stats
+
+
+class ListingDataset:
+    """
+    單一城市的房產資料（欄位式、唯讀）
+    columns: 內部欄位名 -> NumPy 陣列
+    categories: 類別欄位 -> 類別標籤（陣列內存的是代碼）
+    """
+
+    def __init__(self, name, columns, categories, version=None):
+        self.name = name
+        self.columns = columns
+        self.categories = categories
+        self.version = version
+        self._frame = None
+        self._frame_lock = threading.Lock()
+        self._positions = None
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    @classmethod
+    def from_frame(cls, df, name=""):
+        columns, categories, _ = build_columns(df)
+        return cls(name, columns, categories)
+
+    def labels(self, key):
+        return self.categories.get(key, [])
+
+    def find(self, ids):
+        """編號 -> 列號（重複編號取第一筆，找不到的略過）"""
+        if self._positions is None:
+            positions = {}
+            for pos, pid in enumerate(np.asarray(self.columns["id"]).tolist()):
+                positions.setdefault(pid, pos)
+            self._positions = positions
+        return np.array(
+            [self._positions[str(pid)] for pid in ids if str(pid) in self._positions],
+            dtype="int64",
+        )
+
+    def notnull(self, key):
+        """整數欄位的有效值遮罩（INT_NULL 為缺值）"""
+        return np.asarray(self.columns[key]) != INT_NULL
+
+    @property
+    def frame(self):
+        """給畫面顯示用的 DataFrame（同一份資料只建一次，請勿修改）"""
+        if self._frame is None:
+            with self._frame_lock:
+                if self._frame is None:
+                    self._frame = self._build_frame()
+        return self._frame
+
+    def _build_frame(self):
+        data = {}
+        for key, source, kind in SCHEMA:
+            arr = self.columns[key]
+            if kind == "category":
+                data[source] = pd.Categorical.from_codes(np.asarray(arr), categories=self.labels(key))
+            elif kind == "text":
+                col = pd.Series(np.asarray(arr), dtype="object")
+                data[source] = col.where(col != "", None)
+            else:
+                values = np.asarray(arr)
+                # 原本就是整數的欄位（如總價）維持整數顯示
+                if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+                    values = values.astype("int64")
+                data[source] = values
+        return pd.DataFrame(data)
+
+
+# ===========================
+# 轉檔（CSV -> 欄位檔）
+# ===========================
+def _store_path(csv_path, store_dir=None):
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(store_dir or os.path.join(os.path.dirname(csv_path), ".store"), base)
+
+
+def _source_version(csv_path):
+    st_ = os.stat(csv_path)
+    return st_.st_mtime_ns, st_.st_size
+
+
+def _save_array(path, arr):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def ingest_csv(csv_path, store_dir=None):
+    """
+    讀取 CSV 並存成型別化的欄位檔（每欄一個 .npy，可 memmap 載入）
+    回傳存放目錄
+    """
+    version = _source_version(csv_path)
+    out_dir = _store_path(csv_path, store_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    df = pd.read_csv(csv_path)
+    columns, categories, parse_stats = build_columns(df)
+    for key, arr in columns.items():
+        _save_array(os.path.join(out_dir, f"{key}.npy"), arr)
+
+    meta = {
+        "store_version": STORE_VERSION,
+        "source_mtime_ns": version[0],
+        "source_size": version[1],
+        "n_rows": len(df),
+        "columns": sorted(columns),
+        "categories": categories,
+        "parse_stats": parse_stats,
+    }
+    tmp = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(out_dir, "meta.json"))
+    return out_dir
+
+
+def _read_meta(out_dir):
+    try:
+        with open(os.path.join(out_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(meta, version):
+    return (
+        meta is not None
+        and meta.get("store_version") == STORE_VERSION
+        and (meta.get("source_mtime_ns"), meta.get("source_size")) == version
+    )
+
+
+def _load_store(csv_path, out_dir, meta, version):
+    columns = {
+        key: np.load(os.path.join(out_dir, f"{key}.npy"), mmap_mode="r")
+        for key in meta["columns"]
+    }
+    name = os.path.basename(csv_path)
+    return ListingDataset(name, columns, meta["categories"], version=version)
+
+
+# ===========================
+# 行程共用快取（依檔案修改時間失效）
+# ===========================
+_DATASETS = {}
+_LOCK = threading.Lock()
+
+
+def load_dataset(csv_path, store_dir=None):
+    """
+    取得城市資料（同一行程只載入一次）
+    CSV 修改後會自動重新轉檔
+    """
+    key = os.path.abspath(csv_path)
+    version = _source_version(csv_path)
+    cached = _DATASETS.get(key)
+    if cached is not None and cached.version == version:
+        return cached
+
+    with _LOCK:
+        cached = _DATASETS.get(key)
+        if cached is not None and cached.version == version:
+            return cached
+        out_dir = _store_path(csv_path, store_dir)
+        meta = _read_meta(out_dir)
+        if not _is_fresh(meta, version):
+            ingest_csv(csv_path, store_dir)
+            meta = _read_meta(out_dir)
+        dataset = _load_store(csv_path, out_dir, meta, version)
+        _DATASETS[key] = dataset
+        return dataset
+
+
+def parse_stats(csv_path, store_dir=None):
+    """取得轉檔時記錄的 格局/樓層 解析覆蓋率"""
+    meta = _read_meta(_store_path(csv_path, store_dir)) or {}
+    return meta.get("parse_stats", {})
+
+
+def ingest_all(data_dir=DATA_DIR):
+    """把資料夾內所有城市 CSV 轉檔（部署前預先執行）"""
+    done = []
+    for f in sorted(os.listdir(data_dir)):
+        if f.endswith("_buy_properties.csv"):
+            done.append(ingest_csv(os.path.join(data_dir, f)))
+    return done
+
+
+if __name__ == "__main__":
+    from services.district_cube import get_district_cube
+    from services.text_index import build_text_index
+
+    for path in ingest_all():
+        print(f"已轉檔: {path}")
+        for name, stats in (_read_meta(path) or {}).get("parse_stats", {}).items():
+            print(f"  {format_stats(name, stats)}")
+    # 行政區統計方塊跟著轉檔一起更新
+    for f in sorted(os.listdir(DATA_DIR)):
+        if f.endswith("_buy_properties.csv"):
+            cube = get_district_cube(os.path.join(DATA_DIR, f)).cube
+            print(f"統計方塊: {f}（{len(cube)} 格）")
+            print(f"關鍵字索引: {build_text_index(os.path.join(DATA_DIR, f))}")
@@ -0,0 +1,153 @@
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+
+# ===========================
+# Google Places Nearby Search（平行查詢 + 快取）
+# ===========================
+PLACES_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+MAX_WORKERS = int(os.environ.get("PLACES_MAX_WORKERS", 8))
+CACHE_SIZE = 2048
+CACHE_TTL = 24 * 3600
+# 座標取到小數第 4 位（約 10 公尺），同一物件重複比較時可以直接用快取
+COORD_DIGITS = 4
+
+
+class PlacesError(Exception):
+    """Places API 回傳錯誤狀態（REQUEST_DENIED、INVALID_REQUEST…）"""
+
+    def __init__(self, status, message=""):
+        super().__init__(f"{status} {message}".strip())
+        self.status = status
+
+
+class PlacesRateLimited(PlacesError):
+    pass
+
+
+def cache_key(lat, lng, radius, keyword):
+    return round(float(lat), COORD_DIGITS), round(float(lng), COORD_DIGITS), int(radius), str(keyword)
+
+
+class PlacesClient:
+    """
+    共用連線的 Places 客戶端：
+    - search_many() 以執行緒池平行查詢，max_workers 同時也是同時連線數上限
+    - OVER_QUERY_LIMIT 以指數退避 + 隨機抖動重試
+    - 結果依 (座標, 半徑, 關鍵字) 快取（LRU + 有效期限）
+    """
+
+    def __init__(self, api_key, base_url=PLACES_URL, max_workers=MAX_WORKERS, max_attempts=5,
+                 base_delay=0.5, max_delay=8.0, timeout=10, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    # ---------- 快取 ----------
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_put(self, key, results):
+        with self._lock:
+            self._cache[key] = (time.time(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ---------- 查詢 ----------
+    def _request(self, lat, lng, radius, keyword):
+        params = {"location": f"{lat},{lng}", "radius": radius, "keyword": keyword,
+                  "key": self.api_key, "language": "zh-TW"}
+        with self._lock:
+            self.requests += 1
+        data = self.session.get(self.base_url, params=params, timeout=self.timeout).json()
+        status = data.get("status")
+        if status == "OK":
+            return data.get("results", [])
+        if status == "ZERO_RESULTS":
+            return []
+        if status == "OVER_QUERY_LIMIT":
+            raise PlacesRateLimited(status)
+        raise PlacesError(status, data.get("error_message", ""))
+
+    def search(self, lat, lng, radius, keyword):
+        """單一關鍵字查詢（先查快取）；回傳 Places 結果 list"""
+        key = cache_key(lat, lng, radius, keyword)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        for attempt in range(self.max_attempts):
+            try:
+                results = self._request(key[0], key[1], key[2], key[3])
+                break
+            except PlacesRateLimited:
+                if attempt == self.max_attempts - 1:
+                    raise
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+        self._cache_put(key, results)
+        return results
+
+    def search_many(self, tasks, on_done=None):
+        """
+        平行查詢多個 (lat, lng, radius, keyword)；重複的只查一次
+        on_done(task, error) 在呼叫端執行緒依完成順序呼叫（可用來更新進度條）
+        回傳 {task: (結果 list, 錯誤或 None)}
+        """
+        unique = list(dict.fromkeys(tasks))
+        out = {}
+        if not unique:
+            return out
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique)),
+                                thread_name_prefix="places") as pool:
+            futures = {pool.submit(self.search, *task): task for task in unique}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    out[task] = (future.result(), None)
+                except (PlacesError, requests.RequestException, ValueError) as e:
+                    out[task] = ([], e)
+                if on_done:
+                    on_done(task, out[task][1])
+        return out
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_places_client(api_key, base_url=PLACES_URL):
+    """同一個金鑰共用一個客戶端（連線與快取都保留在行程內）"""
+    with _CLIENTS_LOCK:
+        key = (api_key, base_url)
+        if key not in _CLIENTS:
+            _CLIENTS[key] = PlacesClient(api_key, base_url)
+        return _CLIENTS[key]
@@ -0,0 +1,334 @@
+import os
+import csv
+import json
+import threading
+import numpy as np
+from services.listing_store import DATA_DIR
+
+# ===========================
+# 本機生活機能 POI 資料 + 空間索引
+# ===========================
+# 來源：比較房屋時查過的 Places 結果（自動累積），或匯入 OSM 匯出檔（CSV / GeoJSON）。
+# 每次查詢過的範圍（中心、半徑、關鍵字）記成「涵蓋範圍」，之後落在範圍內的查詢直接用本機資料。
+POI_PATH = os.path.join(DATA_DIR, ".poi", "pois.npz")
+EARTH_RADIUS = 6371000.0
+
+PLACE_TYPES = {
+    "教育": ["圖書館", "幼兒園", "小學", "學校", "中學", "大學"],
+    "健康與保健": ["牙醫", "醫師", "藥局", "醫院"],
+    "購物": ["便利商店", "超市", "百貨公司"],
+    "交通運輸": ["公車站", "地鐵站", "火車站"],
+    "餐飲": ["餐廳"]
+}
+# 使用者自訂的額外關鍵字歸在這一類
+EXTRA_CATEGORY = "關鍵字"
+CATEGORIES = list(PLACE_TYPES) + [EXTRA_CATEGORY]
+# 格網大小（度）；台灣緯度約 0.005 度 ≈ 550 m（緯向）/ 510 m（經向）
+CELL_DEG = 0.005
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """大圓距離（公尺）；參數可以是純量或 NumPy 陣列（自動廣播）"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# ===========================
+# 格網索引
+# ===========================
+class GridIndex:
+    """
+    把點依 (緯度格, 經度格) 排序；同一列的格子在排序後連續，
+    半徑查詢只要對每一列格子做一次 searchsorted 取出候選再算距離
+    """
+
+    def __init__(self, lat, lng, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        lat = np.asarray(lat, dtype="float64")
+        lng = np.asarray(lng, dtype="float64")
+        row = np.floor(lat / cell_deg).astype("int64")
+        col = np.floor(lng / cell_deg).astype("int64")
+        self._col_base = int(col.min()) if len(col) else 0
+        self._width = int(col.max() - self._col_base + 1) if len(col) else 1
+        keys = row * self._width + (col - self._col_base)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+        self.lat = lat[self.order]
+        self.lng = lng[self.order]
+
+    def candidates(self, lat, lng, radius):
+        """半徑內可能的點（已排序後的位置）"""
+        if not len(self.keys):
+            return np.array([], dtype="int64")
+        dlat = radius / 111320.0
+        dlng = radius / (111320.0 * max(np.cos(np.radians(lat)), 1e-6))
+        row_lo, row_hi = int(np.floor((lat - dlat) / self.cell_deg)), int(np.floor((lat + dlat) / self.cell_deg))
+        col_lo = max(int(np.floor((lng - dlng) / self.cell_deg)) - self._col_base, 0)
+        col_hi = min(int(np.floor((lng + dlng) / self.cell_deg)) - self._col_base, self._width - 1)
+        if col_lo > col_hi:
+            return np.array([], dtype="int64")
+        rows = np.arange(row_lo, row_hi + 1, dtype="int64") * self._width
+        starts = np.searchsorted(self.keys, rows + col_lo, side="left")
+        ends = np.searchsorted(self.keys, rows + col_hi, side="right")
+        if len(starts) == 1:
+            return np.arange(starts[0], ends[0])
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    def within(self, lat, lng, radius):
+        """回傳 (原始位置, 距離)，依距離排序"""
+        cand = self.candidates(lat, lng, radius)
+        dist = haversine(lat, lng, self.lat[cand], self.lng[cand])
+        keep = dist <= radius
+        cand, dist = cand[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return self.order[cand[order]], dist[order]
+
+
+# ===========================
+# POI 資料
+# ===========================
+_FIELDS = ["pid", "name", "lat", "lng", "category", "keyword"]
+_COVERAGE = ["cov_lat", "cov_lng", "cov_radius", "cov_keyword"]
+
+
+def _append(arr, values):
+    values = np.asarray(values) if arr.dtype.kind == "U" else np.asarray(values, dtype=arr.dtype)
+    return np.concatenate([arr, values])
+
+
+class PoiStore:
+    """
+    欄位式 POI 資料（同一地點可以屬於多個關鍵字）；category 為 CATEGORIES 的代碼
+    coverage：查詢過的 (中心, 半徑, 關鍵字)，判斷本機資料是否完整
+    寫入時組好新的 columns / coverage dict 再整份換上，讀取端不用鎖（只會增加，舊的列號仍有效）
+    """
+
+    def __init__(self, columns=None, coverage=None, path=POI_PATH):
+        self.path = path
+        self.columns = columns or {
+            "pid": np.array([], dtype=str), "name": np.array([], dtype=str),
+            "lat": np.array([], dtype="float64"), "lng": np.array([], dtype="float64"),
+            "category": np.array([], dtype="int8"), "keyword": np.array([], dtype=str),
+        }
+        self.coverage = coverage or {
+            "cov_lat": np.array([], dtype="float64"), "cov_lng": np.array([], dtype="float64"),
+            "cov_radius": np.array([], dtype="float64"), "cov_keyword": np.array([], dtype=str),
+        }
+        self._index = None
+        self._keys = set(zip(self.columns["pid"].tolist(), self.columns["keyword"].tolist()))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.columns["pid"])
+
+    def snapshot(self):
+        """同一版的 (columns, 格網索引)"""
+        columns = self.columns
+        cached = self._index
+        if cached is None or cached[0] is not columns:
+            cached = (columns, GridIndex(columns["lat"], columns["lng"]))
+            self._index = cached
+        return cached
+
+    @property
+    def index(self):
+        return self.snapshot()[1]
+
+    # ---------- 寫入 ----------
+    def add(self, records, coverage=()):
+        """
+        records: (category, keyword, name, lat, lng, pid) 的 iterable；已存在的 (pid, keyword) 略過
+        coverage: (lat, lng, radius, keyword) 的 iterable；回傳新增筆數
+        """
+        with self._lock:
+            new = []
+            for category, keyword, name, lat, lng, pid in records:
+                if (pid, keyword) in self._keys or category not in CATEGORIES:
+                    continue
+                self._keys.add((pid, keyword))
+                new.append((pid, name, lat, lng, CATEGORIES.index(category), keyword))
+            if new:
+                self.columns = {field: _append(self.columns[field], values)
+                                for field, values in zip(_FIELDS, zip(*new))}
+            coverage = list(coverage)
+            if coverage:
+                self.coverage = {field: _append(self.coverage[field], values)
+                                 for field, values in zip(_COVERAGE, zip(*coverage))}
+            return len(new)
+
+    def covers(self, lat, lng, radius, keyword):
+        """(lat, lng, radius) 的圓是否完全落在某個查詢過的範圍內"""
+        cov = self.coverage
+        if not len(cov["cov_lat"]):
+            return False
+        match = cov["cov_keyword"] == keyword
+        if not match.any():
+            return False
+        dist = haversine(lat, lng, cov["cov_lat"][match], cov["cov_lng"][match])
+        return bool((dist + radius <= cov["cov_radius"][match] + 1e-6).any())
+
+    def covers_many(self, lats, lngs, radius, keyword):
+        """covers 的批次版（radius 可以是純量或每個座標各自的半徑）：回傳每個座標是否已涵蓋的布林陣列"""
+        lats = np.asarray(lats, dtype="float64")
+        lngs = np.asarray(lngs, dtype="float64")
+        radius = np.broadcast_to(np.asarray(radius, dtype="float64"), lats.shape)
+        cov = self.coverage
+        match = cov["cov_keyword"] == keyword
+        if not match.any() or not len(lats):
+            return np.zeros(len(lats), dtype=bool)
+        dist = haversine(lats[:, None], lngs[:, None], cov["cov_lat"][match][None, :], cov["cov_lng"][match][None, :])
+        return (dist + radius[:, None] <= cov["cov_radius"][match][None, :] + 1e-6).any(axis=1)
+
+    # ---------- 查詢 ----------
+    def within(self, lat, lng, radius, categories=None, keywords=None):
+        """半徑內的 POI：回傳 (位置陣列, 距離陣列)，依距離排序"""
+        columns, index = self.snapshot()
+        pos, dist = index.within(lat, lng, radius)
+        keep = np.ones(len(pos), dtype=bool)
+        if categories is not None:
+            codes = [CATEGORIES.index(c) for c in categories if c in CATEGORIES]
+            keep &= np.isin(columns["category"][pos], codes)
+        if keywords is not None:
+            keep &= np.isin(columns["keyword"][pos], list(keywords))
+        return pos[keep], dist[keep]
+
+    def places(self, lat, lng, radius, keyword):
+        """與 Places 查詢相同格式的結果：[(category, keyword, name, lat, lng, 距離, pid)]"""
+        pos, dist = self.within(lat, lng, radius, keywords=[keyword])
+        c = self.columns
+        return [
+            (CATEGORIES[c["category"][p]], str(c["keyword"][p]), str(c["name"][p]),
+             float(c["lat"][p]), float(c["lng"][p]), int(d), str(c["pid"][p]))
+            for p, d in zip(pos, dist)
+        ]
+
+    # ---------- 存檔 ----------
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        with self._lock:
+            np.savez(tmp, **self.columns, **self.coverage)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=POI_PATH):
+        if not os.path.exists(path):
+            return cls(path=path)
+        with np.load(path) as z:
+            columns = {k: z[k] for k in _FIELDS}
+            coverage = {k: z[k] for k in _COVERAGE}
+        return cls(columns, coverage, path=path)
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_poi_store(path=POI_PATH):
+    """行程共用的 POI 資料"""
+    key = os.path.abspath(path)
+    with _STORES_LOCK:
+        if key not in _STORES:
+            _STORES[key] = PoiStore.load(path)
+        return _STORES[key]
+
+
+# ===========================
+# OSM 匯入
+# ===========================
+# (OSM tag, 值) -> (類別, 關鍵字)；學校再依名稱細分小學/中學
+OSM_TAGS = {
+    ("amenity", "library"): ("教育", "圖書館"),
+    ("amenity", "kindergarten"): ("教育", "幼兒園"),
+    ("amenity", "school"): ("教育", "學校"),
+    ("amenity", "university"): ("教育", "大學"),
+    ("amenity", "college"): ("教育", "大學"),
+    ("amenity", "dentist"): ("健康與保健", "牙醫"),
+    ("healthcare", "dentist"): ("健康與保健", "牙醫"),
+    ("amenity", "doctors"): ("健康與保健", "醫師"),
+    ("amenity", "clinic"): ("健康與保健", "醫師"),
+    ("amenity", "pharmacy"): ("健康與保健", "藥局"),
+    ("amenity", "hospital"): ("健康與保健", "醫院"),
+    ("shop", "convenience"): ("購物", "便利商店"),
+    ("shop", "supermarket"): ("購物", "超市"),
+    ("shop", "department_store"): ("購物", "百貨公司"),
+    ("shop", "mall"): ("購物", "百貨公司"),
+    ("highway", "bus_stop"): ("交通運輸", "公車站"),
+    ("railway", "subway_entrance"): ("交通運輸", "地鐵站"),
+    ("station", "subway"): ("交通運輸", "地鐵站"),
+    ("railway", "station"): ("交通運輸", "火車站"),
+    ("amenity", "restaurant"): ("餐飲", "餐廳"),
+}
+
+
+def classify_osm(tags, name=""):
+    """OSM tags -> (類別, 關鍵字) 或 None"""
+    for (key, value), (category, keyword) in OSM_TAGS.items():
+        if tags.get(key) == value:
+            if keyword == "學校":
+                if "國小" in name or "小學" in name:
+                    keyword = "小學"
+                elif "國中" in name or "中學" in name or "高中" in name:
+                    keyword = "中學"
+            return category, keyword
+    return None
+
+
+# OSM 匯入後視為完整的關鍵字：只有 OSM_TAGS 對應得到的；
+# 「學校」只剩分不出小學/中學的學校，Places 的「學校」會包含全部，所以不算
+OSM_KEYWORDS = sorted(({kw for _, kw in OSM_TAGS.values()} | {"小學", "中學"}) - {"學校"})
+
+
+def _read_osm(path):
+    """讀取 GeoJSON（Point）或 CSV（id, name, lat, lon + tag 欄位），回傳 (pid, name, lat, lng, tags)"""
+    if path.endswith((".geojson", ".json")):
+        with open(path, encoding="utf-8") as f:
+            for feature in json.load(f).get("features", []):
+                geometry = feature.get("geometry") or {}
+                if geometry.get("type") != "Point":
+                    continue
+                props = feature.get("properties") or {}
+                lng, lat = geometry["coordinates"][:2]
+                pid = f"osm:{feature.get('id') or props.get('@id') or props.get('osm_id')}"
+                yield pid, props.get("name", ""), float(lat), float(lng), props
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                yield f"osm:{row.get('id', '')}", row.get("name", ""), float(row["lat"]), float(row["lon"]), row
+
+
+def import_osm(path, store=None):
+    """
+    匯入 OSM 匯出檔；匯入範圍（所有點的外接矩形的內切圓）只對 OSM_KEYWORDS 視為已涵蓋
+    回傳新增筆數
+    """
+    store = get_poi_store() if store is None else store
+    records = []
+    for pid, name, lat, lng, tags in _read_osm(path):
+        kind = classify_osm(tags, name or "")
+        if kind:
+            records.append((kind[0], kind[1], name or "未命名", lat, lng, pid))
+    coverage = []
+    if records:
+        lats = np.array([r[3] for r in records])
+        lngs = np.array([r[4] for r in records])
+        center_lat, center_lng = (lats.min() + lats.max()) / 2, (lngs.min() + lngs.max()) / 2
+        # 取外接矩形的內切圓，圓內的查詢一定完整
+        radius = float(min(haversine(center_lat, center_lng, lats.max(), center_lng),
+                           haversine(center_lat, center_lng, center_lat, lngs.max())))
+        coverage = [(center_lat, center_lng, radius, kw) for kw in OSM_KEYWORDS]
+    added = store.add(records, coverage)
+    store.save()
+    return added
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="匯入 OSM 生活機能資料")
+    parser.add_argument("files", nargs="+", help="GeoJSON 或 CSV 檔（OSM 匯出）")
+    args = parser.parse_args()
+    for f in args.files:
+        print(f"{f}: 新增 {import_osm(f)} 筆")
+    print(f"POI 共 {len(get_poi_store())} 筆")
@@ -0,0 +1,58 @@
+import os
+import time
+import logging
+import importlib
+import threading
+
+# ===========================
+# 背景預熱（首頁畫面送出後才開始）
+# ===========================
+# 首頁只載入 streamlit 與側邊欄；搜尋/分析頁面與較重的套件在背景執行緒先 import、
+# 先載入城市資料與索引，使用者切換頁面時就不用等。
+# PREWARM=0 關閉；PREWARM_MODELS=1 連文字向量模型也預先載入（佔記憶體，預設不載）。
+PREWARM = os.environ.get("PREWARM", "1") != "0"
+PREWARM_MODELS = os.environ.get("PREWARM_MODELS", "0") == "1"
+PAGE_MODULES = ["page_modules.search_page", "page_modules.analysis_page"]
+# 不一定有安裝的套件（沒有就略過）
+OPTIONAL_MODULES = ["hnswlib", "google.generativeai"]
+
+log = logging.getLogger(__name__)
+_started = False
+_lock = threading.Lock()
+
+
+def _prewarm():
+    t0 = time.perf_counter()
+    for name in PAGE_MODULES + OPTIONAL_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            log.info("prewarm: 略過 %s（%s）", name, e)
+
+    from services.result_set import city_files
+    from services.text_index import get_text_index
+    from services.sort_index import get_sort_index
+    for path in city_files():
+        try:
+            get_text_index(path)
+            get_sort_index(path)
+        except (OSError, ValueError) as e:
+            log.warning("prewarm: %s 載入失敗（%s）", path, e)
+
+    if PREWARM_MODELS:
+        from services.embedding_service import get_embedding_service
+        get_embedding_service().warm_up()
+    log.info("prewarm: 完成（%.2f s）", time.perf_counter() - t0)
+
+
+def start_prewarm():
+    """每個行程只啟動一次；回傳是否有啟動"""
+    global _started
+    if not PREWARM:
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+    return True
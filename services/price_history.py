@@ -0,0 +1,247 @@
+import os
+import json
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from services.listing_store import DATA_DIR, load_dataset
+from services.comparables import unit_prices
+
+# ===========================
+# 歷史價格快照（只增不改，依 城市/日期 分區）
+# ===========================
+# Data/.history/<城市>/
+#     <YYYY-MM-DD>/          當天快照（id / district / price / unit_price 各一個 .npy）
+#     state.npz              每個 編號 最後一次出現的狀態（首次出現日、價格、行政區）
+#     aggregates.jsonl       每次快照寫入時就算好的 行政區 × 日期 統計
+#
+# 用法：每次爬完資料後執行 python -m services.price_history（可加 --date 2024-01-31）
+HISTORY_DIR = os.path.join(DATA_DIR, ".history")
+ALL_DISTRICTS = "全部"
+
+# 每週統計：存量指標取該週最後一次快照，流量指標（新上架、下架、降價）加總
+STOCK_METRICS = ["count", "median_unit_price", "median_days_on_market"]
+FLOW_METRICS = ["new", "delisted", "price_cuts"]
+
+METRIC_LABELS = {
+    "median_unit_price": "建坪單價中位數（元/坪）",
+    "count": "刊登物件數",
+    "median_days_on_market": "刊登天數中位數",
+    "price_cut_rate": "降價比例（%）",
+    "new": "新上架物件數",
+    "delisted": "下架物件數",
+}
+
+
+def city_of(csv_path):
+    """「Data/Taichung-city_buy_properties.csv」-> 「Taichung-city」"""
+    return os.path.basename(csv_path).replace("_buy_properties.csv", "")
+
+
+def _city_dir(city, history_dir=None):
+    return os.path.join(history_dir or HISTORY_DIR, city)
+
+
+def _to_date(value):
+    if value is None:
+        return datetime.date.today()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
+
+
+def _load_state(city_dir):
+    try:
+        with np.load(os.path.join(city_dir, "state.npz")) as z:
+            return {k: z[k] for k in z.files}
+    except OSError:
+        return None
+
+
+def _save_state(city_dir, state):
+    tmp = os.path.join(city_dir, "state.tmp.npz")
+    np.savez(tmp, **state)
+    os.replace(tmp, os.path.join(city_dir, "state.npz"))
+
+
+def _write_partition(city_dir, date, arrays):
+    """先寫到暫存資料夾再改名，讀取端不會看到寫一半的快照"""
+    final = os.path.join(city_dir, date.isoformat())
+    tmp = final + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for key, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), arr)
+    if os.path.exists(final):
+        # 上次寫入中斷（state 沒更新）才會走到這裡
+        for f in os.listdir(final):
+            os.remove(os.path.join(final, f))
+        os.rmdir(final)
+    os.replace(tmp, final)
+
+
+def _aggregate(date, districts, unit_price, is_new, is_cut, days, delisted_districts):
+    """單次快照的 行政區 統計（外加一列全市）"""
+    df = pd.DataFrame({
+        "district": districts, "unit_price": unit_price,
+        "new": is_new, "price_cuts": is_cut, "days": days,
+    })
+    delisted = pd.Series(delisted_districts, dtype="object").value_counts()
+
+    def summarize(group, name):
+        return {
+            "date": date.isoformat(),
+            "district": name,
+            "count": int(len(group)),
+            "median_unit_price": float(group["unit_price"].median()) if group["unit_price"].notna().any() else None,
+            "median_days_on_market": float(group["days"].median()) if len(group) else None,
+            "new": int(group["new"].sum()),
+            "price_cuts": int(group["price_cuts"].sum()),
+            "delisted": int(delisted.get(name, 0)),
+        }
+
+    rows = [summarize(group, name) for name, group in df.groupby("district", sort=True) if name]
+    total = summarize(df, ALL_DISTRICTS)
+    total["delisted"] = int(len(delisted_districts))
+    rows.append(total)
+    return rows
+
+
+def append_snapshot(city, date, ids, districts, prices, unit_price, history_dir=None):
+    """
+    寫入一次快照並增量更新統計；日期必須晚於上一次快照
+    ids/districts 為字串陣列、prices 為總價（萬）、unit_price 為建坪單價（元/坪）
+    回傳這次的統計列
+    """
+    date = _to_date(date)
+    city_dir = _city_dir(city, history_dir)
+    os.makedirs(city_dir, exist_ok=True)
+
+    state = _load_state(city_dir)
+    if state is not None and date.toordinal() <= int(state["last_date"]):
+        last = datetime.date.fromordinal(int(state["last_date"]))
+        raise ValueError(f"{city} 快照日期 {date} 必須晚於上一次快照 {last}")
+
+    # 同一 編號 只保留第一筆
+    ids = np.asarray(ids).astype(str)
+    _, first = np.unique(ids, return_index=True)
+    first.sort()
+    ids = ids[first]
+    districts = np.asarray(districts).astype(str)[first]
+    prices = np.asarray(prices, dtype="float64")[first]
+    unit_price = np.asarray(unit_price, dtype="float64")[first]
+    today = date.toordinal()
+
+    if state is None:
+        state = {
+            "ids": np.array([], dtype=str), "first_seen": np.array([], dtype="int32"),
+            "price": np.array([], dtype="float64"), "district": np.array([], dtype=str),
+        }
+    prev_ids = state["ids"]
+
+    # 和上一次快照對齊：找出新上架、降價、下架
+    pos = pd.Index(prev_ids).get_indexer(ids)
+    is_new = pos < 0
+    first_seen = np.full(len(ids), today, dtype="int32")
+    is_cut = np.zeros(len(ids), dtype=bool)
+    if len(prev_ids):
+        matched = pos[~is_new]
+        first_seen[~is_new] = state["first_seen"][matched]
+        is_cut[~is_new] = prices[~is_new] < state["price"][matched]
+    gone = pd.Index(ids).get_indexer(prev_ids) < 0
+
+    rows = _aggregate(date, districts, unit_price, is_new, is_cut, today - first_seen, state["district"][gone])
+
+    _write_partition(city_dir, date, {"id": ids, "district": districts, "price": prices, "unit_price": unit_price})
+    with open(os.path.join(city_dir, "aggregates.jsonl"), "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    _save_state(city_dir, {
+        "ids": ids, "first_seen": first_seen, "price": prices, "district": districts,
+        "last_date": np.array(today),
+    })
+    return rows
+
+
+def record_snapshot(csv_path, date=None, history_dir=None):
+    """把目前的城市 CSV 記錄成一次快照"""
+    dataset = load_dataset(csv_path)
+    labels = np.array(dataset.labels("district") + [""], dtype=str)
+    codes = np.asarray(dataset.columns["district"]).astype("int64")
+    districts = labels[np.where(codes >= 0, codes, len(labels) - 1)]
+    return append_snapshot(city_of(csv_path), date, dataset.columns["id"], districts,
+                           dataset.columns["price"], unit_prices(dataset), history_dir)
+
+
+# ===========================
+# 查詢（依 aggregates.jsonl 修改時間快取）
+# ===========================
+_AGGREGATES = {}
+_LOCK = threading.Lock()
+
+
+def history_cities(history_dir=None):
+    """有歷史統計的城市"""
+    base = history_dir or HISTORY_DIR
+    if not os.path.isdir(base):
+        return []
+    return sorted(c for c in os.listdir(base) if os.path.exists(os.path.join(base, c, "aggregates.jsonl")))
+
+
+def load_aggregates(city, history_dir=None):
+    """每次快照的 行政區 統計（DataFrame，日期為 datetime）"""
+    path = os.path.join(_city_dir(city, history_dir), "aggregates.jsonl")
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    st_ = os.stat(path)
+    version = (st_.st_mtime_ns, st_.st_size)
+    key = os.path.abspath(path)
+    cached = _AGGREGATES.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _LOCK:
+        df = pd.read_json(path, lines=True, dtype={"district": str})
+        # 中斷後重寫的快照會留下重複列，以最後一次為準
+        df = df.drop_duplicates(["date", "district"], keep="last")
+        df["date"] = pd.to_datetime(df["date"])
+        df = df.sort_values(["district", "date"]).reset_index(drop=True)
+        _AGGREGATES[key] = (version, df)
+        return df
+
+
+def weekly_trends(city, districts=None, history_dir=None):
+    """
+    行政區 × 週 的統計（週一為一週的開始）
+    回傳欄位：week, district, count, median_unit_price, median_days_on_market,
+    new, delisted, price_cuts, price_cut_rate（%）
+    """
+    df = load_aggregates(city, history_dir)
+    if df.empty:
+        return df
+    if districts:
+        df = df[df["district"].isin(districts)]
+    week = df["date"].dt.to_period("W-SUN").dt.start_time
+    grouped = df.assign(week=week).groupby(["district", "week"], sort=True)
+    out = grouped[STOCK_METRICS].last().join(grouped[FLOW_METRICS].sum()).reset_index()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["price_cut_rate"] = np.where(out["count"] > 0, out["price_cuts"] / out["count"] * 100, np.nan)
+    return out
+
+
+def snapshot_all(data_dir=DATA_DIR, date=None):
+    """把資料夾內所有城市 CSV 記錄成同一天的快照"""
+    done = {}
+    for f in sorted(os.listdir(data_dir)):
+        if f.endswith("_buy_properties.csv"):
+            done[city_of(f)] = record_snapshot(os.path.join(data_dir, f), date)
+    return done
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="記錄歷史價格快照")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--date", help="快照日期（預設今天，格式 YYYY-MM-DD）")
+    args = parser.parse_args()
+    for city, rows in snapshot_all(args.data_dir, args.date).items():
+        total = rows[-1]
+        print(f"{city}: {total['count']} 筆，新上架 {total['new']}、降價 {total['price_cuts']}、下架 {total['delisted']}")
@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+
+# ===========================
+# 查詢結果快取（行程共用，LRU + 位元組上限）
+# ===========================
+# 只依賴標準函式庫：側邊欄顯示統計時不會連帶載入資料相關模組。
+# 跨 session 的查詢結果快取上限（列號陣列的總位元組數）
+QUERY_CACHE_BYTES = int(float(os.environ.get("QUERY_CACHE_MB", 64)) * 1024 * 1024)
+
+
+class QueryCache:
+    """
+    key = (資料檔, 資料版本, 正規化後的篩選條件)；value 為唯讀的列號陣列（各 session 共用同一份）
+    資料檔更新後舊版本的結果在下一次寫入時清掉
+    """
+
+    def __init__(self, max_bytes=QUERY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, key, rows):
+        if rows.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            path, version = key[0], key[1]
+            for old in [k for k in self._entries if k[0] == path and k[1] != version]:
+                self.nbytes -= self._entries.pop(old).nbytes
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = rows
+            self.nbytes += rows.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+_QUERY_CACHE = QueryCache()
+
+
+def get_query_cache():
+    return _QUERY_CACHE
@@ -0,0 +1,133 @@
+import re
+import unicodedata
+
+# ===========================
+# 特殊要求本機解析（房 / 廳 / 衛 / 樓層）
+# ===========================
+# 回傳格式與 search_form._normalize_parsed_req 相同：
+#   {"rooms": 3, "living_rooms": {"min": 2}, "bathrooms": {"min": 1, "max": 2}, "floor": {"min": 1, "max": 5}}
+# 常見寫法（「三房兩廳二衛以上，低樓層」）在本機就能解析；
+# 有解析不了的文字（例如「近捷運」）時 covered=False，由呼叫端決定是否再交給 Gemini。
+# 「以上 / 以下」只套用在緊接在前面的那一項（「三房兩廳以上」→ 房 = 3、廳 ≥ 2）。
+LOW_FLOOR = {"min": 1, "max": 5}
+HIGH_FLOOR = {"min": 6}
+
+_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "兩": 2, "两": 2, "三": 3, "四": 4,
+           "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_NUM = r"(?:\d+|[零〇一二兩两三四五六七八九十]+)"
+_UNITS = {
+    "rooms": r"(?:房間|間房|房|臥室|臥房)",
+    "living_rooms": r"(?:客廳|廳)",
+    "bathrooms": r"(?:衛浴|衛生間|浴室|衛)",
+    "floor": r"(?:樓|層|f)",
+}
+_KEY_WORDS = {
+    "rooms": r"(?:房間數|房數|房間|臥室)",
+    "living_rooms": r"(?:廳數|客廳)",
+    "bathrooms": r"(?:衛數|衛浴|浴室)",
+    "floor": r"(?:樓層|樓)",
+}
+_AT_LEAST = r"(?:至少|最少|起碼)"
+_AT_MOST = r"(?:最多|至多|不超過|不要超過|頂多)"
+_MIN_SUFFIX = r"(?:\(含\)|（含）|或)?(?:以上|起|\+)"
+_MAX_SUFFIX = r"(?:\(含\)|（含）|或)?(?:以下|以內)"
+_RANGE_SEP = r"(?:到|至|-|~|–|、)"
+# 「不要一樓」「非頂樓」這類否定寫法不在本機處理
+_NEGATION = re.compile(r"[不非別免]")
+# 解析完剩下這些字就視為「已完整解析」
+_FILLER = re.compile(
+    r"[\s,，、。.;；:：/／!！~～()（）]|需要|想要|希望|最好|要|想|找|的|有|和|與|跟|及|且|格局|樓層|左右"
+)
+
+
+def chinese_number(text):
+    """「三」→ 3、「十二」→ 12、「二十」→ 20、「12」→ 12；無法解析回傳 None"""
+    if text.isdigit():
+        return int(text)
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        if len(tens) > 1 or len(ones) > 1 or "十" in ones:
+            return None
+        tens_value = _DIGITS.get(tens, None) if tens else 1
+        ones_value = _DIGITS.get(ones, None) if ones else 0
+        if tens_value is None or ones_value is None:
+            return None
+        return tens_value * 10 + ones_value
+    if len(text) == 1:
+        return _DIGITS.get(text)
+    return None
+
+
+def _patterns():
+    """依優先順序：區間 → 至少/最多 → 數字+單位(+以上/以下) → 欄位名+數字"""
+    out = []
+    for key, unit in _UNITS.items():
+        lead = r"(?<![\d零〇一二兩两三四五六七八九十])"
+        out += [
+            (key, "range", re.compile(rf"{lead}(?P<a>{_NUM}){unit}?\s*{_RANGE_SEP}\s*(?P<b>{_NUM})\s*{unit}")),
+            (key, "min", re.compile(rf"{_AT_LEAST}\s*(?P<a>{_NUM})\s*{unit}(?:{_MIN_SUFFIX})?")),
+            (key, "max", re.compile(rf"{_AT_MOST}\s*(?P<a>{_NUM})\s*{unit}(?:{_MAX_SUFFIX})?")),
+            (key, "min", re.compile(rf"{lead}(?P<a>{_NUM})\s*{unit}\s*{_MIN_SUFFIX}")),
+            (key, "max", re.compile(rf"{lead}(?P<a>{_NUM})\s*{unit}\s*{_MAX_SUFFIX}")),
+            (key, "eq", re.compile(rf"{lead}(?P<a>{_NUM})\s*{unit}")),
+        ]
+    for key, word in _KEY_WORDS.items():
+        out += [
+            (key, "range", re.compile(rf"{word}\s*[:：]?\s*(?P<a>{_NUM})\s*{_RANGE_SEP}\s*(?P<b>{_NUM})")),
+            (key, "min", re.compile(rf"{word}\s*[:：]?\s*(?P<a>{_NUM})\s*{_MIN_SUFFIX}")),
+            (key, "max", re.compile(rf"{word}\s*[:：]?\s*(?P<a>{_NUM})\s*{_MAX_SUFFIX}")),
+            (key, "eq", re.compile(rf"{word}\s*[:：]?\s*(?P<a>\d+|[零〇一二兩两三四五六七八九十]+(?![房廳衛樓層]))")),
+        ]
+    out += [
+        ("floor", "low", re.compile(r"低樓層|低樓")),
+        ("floor", "high", re.compile(r"高樓層|高樓")),
+    ]
+    return out
+
+
+_PATTERNS = _patterns()
+
+
+def _value(kind, match):
+    if kind == "low":
+        return dict(LOW_FLOOR)
+    if kind == "high":
+        return dict(HIGH_FLOOR)
+    a = chinese_number(match.group("a"))
+    if a is None:
+        return None
+    if kind == "eq":
+        return a
+    if kind == "min":
+        return {"min": a}
+    if kind == "max":
+        return {"max": a}
+    b = chinese_number(match.group("b"))
+    if b is None:
+        return None
+    return {"min": min(a, b), "max": max(a, b)}
+
+
+def parse_special_requests(text):
+    """
+    回傳 (解析結果 dict, covered)
+    covered=True 表示整段文字都已解析（不需要再問 Gemini）
+    同一欄位有多種寫法時，以較明確的（區間、至少/最多、以上/以下）為準
+    """
+    text = unicodedata.normalize("NFKC", str(text or "")).lower()
+    if not text.strip():
+        return {}, True
+    out = {}
+    consumed = [False] * len(text)
+    for key, kind, pattern in _PATTERNS:
+        for m in pattern.finditer(text):
+            if any(consumed[m.start():m.end()]) or _NEGATION.search(text[max(0, m.start() - 2):m.start()]):
+                continue
+            value = _value(kind, m)
+            if value is None:
+                continue
+            consumed[m.start():m.end()] = [True] * (m.end() - m.start())
+            out.setdefault(key, value)
+    rest = "".join(ch if not used else " " for ch, used in zip(text, consumed))
+    covered = _FILLER.sub("", rest) == ""
+    return out, covered
@@ -0,0 +1,134 @@
+import os
+import numpy as np
+import pandas as pd
+from services.listing_store import DATA_DIR, load_dataset
+from services.filter_engine import build_mask, compile_filters
+from services.accessibility import attach_accessibility, access_version
+from services.sort_index import get_sort_index
+from services.text_index import get_text_index, query_terms
+from services.query_cache import get_query_cache
+
+# ===========================
+# 搜尋結果（每個 session 只存列號）
+# ===========================
+# 城市資料由 load_dataset 在行程內共用一份（唯讀）；session 只保留
+# 「資料檔 + int32 列號 + 篩選條件」，畫面需要時再從共用資料取出該頁的列。
+# CSV 更新後列號會失效，依保存的篩選條件重新計算即可。
+# rows 已依 sort 排好（見 services/sort_index.py），換頁只是切片。
+ROW_DTYPE = "int32"
+
+# 資料檔 -> 城市中文名稱
+CITY_NAMES = {
+    "Taichung-city_buy_properties.csv": "台中市",
+    "Taipei-city_buy_properties.csv": "台北市"
+}
+CITY_FILES = {v: k for k, v in CITY_NAMES.items()}
+
+
+class ResultSet:
+    def __init__(self, file_path, rows, filters, version, sort=()):
+        rows = np.ascontiguousarray(rows, dtype=ROW_DTYPE)
+        rows.setflags(write=False)
+        self.file_path = file_path
+        self.rows = rows
+        self.filters = filters
+        self.version = version
+        self.sort = tuple(sort)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def dataset(self):
+        return load_dataset(self.file_path)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes
+
+    def fresh(self):
+        """資料檔或生活機能指標已更新時依原條件重新篩選（列號對應新資料）"""
+        if data_version(self.file_path) == self.version:
+            return self
+        return search(self.file_path, self.filters).sorted(self.sort)
+
+    def sorted(self, sort):
+        """依 ((欄位, 是否降冪), ...) 排序；空的 sort 為資料原始順序"""
+        if not sort:
+            # 回到預設順序（有關鍵字時為相關度）
+            return search(self.file_path, self.filters) if self.sort else self
+        index = get_sort_index(self.file_path)
+        # 資料沒有的欄位（例如尚未算生活機能）略過
+        sort = tuple((k, d) for k, d in sort if k in index.available())
+        if sort == self.sort:
+            return self
+        rows = index.order(self.rows, sort)
+        return ResultSet(self.file_path, rows, self.filters, self.version, sort)
+
+    def take(self, start=0, stop=None):
+        """取第 start~stop 筆結果的 DataFrame（索引 = 資料列號）"""
+        return self.dataset.frame.iloc[self.rows[start:stop]]
+
+
+def data_version(file_path):
+    """(CSV 版本, 生活機能指標版本)；任一個變了，列號與篩選結果就要重算"""
+    dataset = attach_accessibility(file_path)
+    return dataset.version, access_version(file_path)
+
+
+def query_key(file_path, dataset, filters):
+    """
+    篩選條件正規化：沒作用的條件、資料沒有的欄位（例如未算生活機能）都不算，
+    關鍵字拆詞後排序（詞的順序不影響結果）
+    """
+    preds = tuple(sorted(
+        (p for p in compile_filters(filters) if p[0] in dataset.columns),
+        key=repr,
+    ))
+    terms = tuple(sorted(set(query_terms(filters.get("keyword", "")))))
+    return os.path.abspath(file_path), data_version(file_path), preds, terms
+
+
+def search(file_path, filters, cache=None):
+    """篩選一個城市的資料，回傳 ResultSet（有關鍵字時依相關度排序）；相同條件直接用快取"""
+    cache = get_query_cache() if cache is None else cache
+    dataset = attach_accessibility(file_path)
+    key = query_key(file_path, dataset, filters)
+    rows = cache.get(key)
+    if rows is None:
+        mask = build_mask(dataset, filters)
+        if key[3]:
+            rows, _ = get_text_index(file_path).search(filters["keyword"], mask)
+        else:
+            rows = np.flatnonzero(mask)
+        rows = np.ascontiguousarray(rows, dtype=ROW_DTYPE)
+        rows.setflags(write=False)
+        cache.put(key, rows)
+    return ResultSet(file_path, rows, dict(filters), key[1])
+
+
+def city_files(data_dir=DATA_DIR):
+    return [os.path.join(data_dir, f) for f in sorted(os.listdir(data_dir)) if f.endswith("_buy_properties.csv")]
+
+
+def city_file_path(address, data_dir=DATA_DIR):
+    """由地址前三字（如「台中市」）找出對應的資料檔路徑；找不到回傳 None"""
+    filename = CITY_FILES.get(str(address)[:3])
+    return os.path.join(data_dir, filename) if filename else None
+
+
+def rows_for_ids(ids, file_paths=None):
+    """
+    編號 -> 各城市的資料列（收藏清單用，不限於目前的搜尋結果）
+    重複編號取第一筆；回傳 DataFrame（索引 = 資料列號）
+    """
+    ids = [str(i) for i in ids]
+    frames = []
+    for path in city_files() if file_paths is None else file_paths:
+        dataset = load_dataset(path)
+        pos = dataset.find(ids)
+        if len(pos):
+            frames.append(dataset.frame.iloc[pos])
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
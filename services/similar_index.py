@@ -0,0 +1,252 @@
+import os
+import copy
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.listing_store import load_dataset
+from services.embedding_service import MODEL_NAME, encode as _default_encode
+from services.embedding_cache import get_embedding_cache, text_hash
+
+# ===========================
+# 相似房屋索引（每個城市一份，存在 Data/.index/<城市>/）
+# ===========================
+INDEX_VERSION = 1
+EF_CONSTRUCTION = 200
+M = 16
+EF_SEARCH = 50
+# 標記刪除的向量超過這個比例就重建索引（HNSW 的刪除只是標記，會一直佔空間並拖慢查詢）
+COMPACT_RATIO = 0.2
+
+
+def row_to_text(row):
+    """將每列資料轉為文字描述"""
+    return (
+        f"地址:{row['地址']}, 建坪:{row['建坪']}, 主+陽:{row['主+陽']}, "
+        f"總價:{row['總價(萬)']}萬, 屋齡:{row['屋齡']}, 類型:{row['類型']}, "
+        f"格局:{row['格局']}, 樓層:{row['樓層']}, 車位:{row['車位']}"
+    )
+
+
+def _index_dir(csv_path):
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path), ".index", base)
+
+
+class SimilarIndex:
+    """
+    以 編號 為 key 的 HNSW 索引
+    label = 向量在 embeddings 矩陣中的列號（更新時舊 label 標記刪除；刪除太多時重建，label 重新編號）
+    """
+
+    def __init__(self, path, index, embeddings, ids, hashes, deleted, source_version=None):
+        self.path = path
+        self.index = index
+        self.embeddings = embeddings
+        self.ids = ids
+        self.hashes = hashes
+        self.deleted = set(deleted)
+        self.source_version = source_version
+        self.label_of = {
+            pid: label for label, pid in enumerate(ids) if label not in self.deleted
+        }
+
+    def __len__(self):
+        return len(self.label_of)
+
+    # ---------- 讀寫 ----------
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("index_version") != INDEX_VERSION or meta.get("model") != MODEL_NAME:
+            return None
+        import hnswlib  # 用到文字相似度時才載入
+
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        index = hnswlib.Index(space="l2", dim=embeddings.shape[1])
+        index.load_index(os.path.join(path, "hnsw.bin"), max_elements=len(embeddings))
+        index.set_ef(EF_SEARCH)
+        return cls(
+            path, index, embeddings, meta["ids"], meta["hashes"], meta["deleted"],
+            source_version=tuple(meta["source_version"]) if meta.get("source_version") else None,
+        )
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, "embeddings.tmp.npy")
+        np.save(tmp, np.asarray(self.embeddings, dtype="float32"))
+        os.replace(tmp, os.path.join(self.path, "embeddings.npy"))
+        self.index.save_index(os.path.join(self.path, "hnsw.bin.tmp"))
+        os.replace(os.path.join(self.path, "hnsw.bin.tmp"), os.path.join(self.path, "hnsw.bin"))
+        meta = {
+            "index_version": INDEX_VERSION,
+            "model": MODEL_NAME,
+            "source_version": list(self.source_version) if self.source_version else None,
+            "ids": self.ids,
+            "hashes": self.hashes,
+            "deleted": sorted(self.deleted),
+        }
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+        # 重新以 memmap 開啟，避免常駐整份矩陣
+        self.embeddings = np.load(os.path.join(self.path, "embeddings.npy"), mmap_mode="r")
+
+    # ---------- 增量更新 ----------
+    def synced(self, frame, encode=_default_encode, source_version=None):
+        """
+        依目前資料產生更新後的新索引（不修改自己，其他 session 可以繼續查詢舊的）：
+        新增/內容變動的 編號 重新向量化後 add_items，已下架或變動前的舊向量 mark_deleted；
+        刪除的比例超過 COMPACT_RATIO 時只用有效向量重建。回傳 (新索引, (新增, 更新, 刪除) 筆數)
+        """
+        current = {}
+        for row in frame.to_dict("records"):
+            pid = str(row["編號"])
+            if pid not in current:
+                current[pid] = row_to_text(row)
+
+        added, changed = [], []
+        for pid, text in current.items():
+            label = self.label_of.get(pid)
+            if label is None:
+                added.append(pid)
+            elif self.hashes[label] != text_hash(text):
+                changed.append(pid)
+        removed = [pid for pid in self.label_of if pid not in current]
+        counts = (len(added), len(changed), len(removed))
+
+        todo = added + changed
+        vectors = np.zeros((0, self.embeddings.shape[1]), dtype="float32")
+        if todo:
+            # 內容沒變過的文字直接取快取，只有真正新的文字才送進模型
+            cache = get_embedding_cache(MODEL_NAME)
+            vectors = cache.encode([current[pid] for pid in todo], encode)
+            cache.save()
+        stale = {self.label_of[pid] for pid in changed + removed}
+
+        n_total = len(self.ids) + len(todo)
+        if len(self.deleted | stale) > COMPACT_RATIO * n_total:
+            # 刪除的太多：只保留有效的向量重新建立
+            keep = [(pid, label) for pid, label in self.label_of.items() if label not in stale]
+            keep_labels = np.array([label for _, label in keep], dtype="int64")
+            old_vectors = np.asarray(self.embeddings)[keep_labels].reshape(len(keep), -1)
+            rebuilt = _new_index(self.path, self.embeddings.shape[1])
+            rebuilt._add([pid for pid, _ in keep], [self.hashes[label] for _, label in keep], old_vectors)
+            rebuilt._add(todo, [text_hash(current[pid]) for pid in todo], vectors)
+            rebuilt.source_version = source_version
+            return rebuilt, counts
+
+        index = copy.deepcopy(self.index)
+        index.set_ef(EF_SEARCH)
+        for label in stale:
+            index.mark_deleted(label)
+        updated = SimilarIndex(self.path, index, self.embeddings, list(self.ids), list(self.hashes),
+                               self.deleted | stale, source_version=source_version)
+        updated._add(todo, [text_hash(current[pid]) for pid in todo], vectors)
+        return updated, counts
+
+    def _add(self, ids, hashes, vectors):
+        """建立中的新索引才會呼叫（尚未給其他 session 使用）"""
+        if not len(ids):
+            return
+        start = len(self.ids)
+        labels = np.arange(start, start + len(ids))
+        needed = start + len(ids)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(needed)
+        self.index.add_items(vectors, labels)
+        self.embeddings = np.concatenate([np.asarray(self.embeddings), vectors])
+        for pid, h, label in zip(ids, hashes, labels):
+            self.ids.append(pid)
+            self.hashes.append(h)
+            self.label_of[pid] = int(label)
+
+    # ---------- 查詢 ----------
+    def vectors_for(self, ids):
+        """依 編號 順序取出向量（索引中沒有的補 0）"""
+        ids = [str(pid) for pid in ids]
+        labels = np.array([self.label_of.get(pid, -1) for pid in ids], dtype="int64")
+        out = np.zeros((len(ids), self.embeddings.shape[1]), dtype="float32")
+        found = labels >= 0
+        out[found] = self.embeddings[labels[found]]
+        return out
+
+    def query(self, listing_id, k=10):
+        """回傳最相似的 k 個 編號（不含自己）"""
+        label = self.label_of.get(str(listing_id))
+        if label is None:
+            return []
+        k = min(k + 1, len(self.label_of))
+        labels, _ = self.index.knn_query(self.embeddings[label:label + 1], k=k)
+        return [self.ids[int(l)] for l in labels[0] if int(l) != label]
+
+
+def _new_index(path, dim):
+    import hnswlib
+
+    index = hnswlib.Index(space="l2", dim=dim)
+    index.init_index(max_elements=1, ef_construction=EF_CONSTRUCTION, M=M)
+    index.set_ef(EF_SEARCH)
+    return SimilarIndex(path, index, np.zeros((0, dim), dtype="float32"), [], [], [])
+
+
+# ===========================
+# 行程共用快取
+# ===========================
+_INDEXES = {}
+_LOCK = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similar-index")
+_pending = {}   # 資料路徑 -> Future
+
+
+def get_similar_index(csv_path, encode=_default_encode):
+    """
+    取得城市的相似房屋索引；資料更新後只對變動的 編號 做增量更新
+    """
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    cached = _INDEXES.get(key)
+    if cached is not None and cached.source_version == dataset.version:
+        return cached
+
+    with _LOCK:
+        cached = _INDEXES.get(key)
+        if cached is None:
+            path = _index_dir(csv_path)
+            if os.path.exists(os.path.join(path, "meta.json")):
+                cached = SimilarIndex.load(path)
+        if cached is None or cached.source_version != dataset.version:
+            if cached is None:
+                dim = np.asarray(encode(["維度"]), dtype="float32").shape[1]
+                cached = _new_index(_index_dir(csv_path), dim)
+            # 建好新索引才換上去；正在查詢舊索引的 session 不受影響
+            cached, _ = cached.synced(dataset.frame, encode, source_version=dataset.version)
+            cached.save()
+        _INDEXES[key] = cached
+        return cached
+
+
+def peek_similar_index(csv_path, encode=_default_encode):
+    """
+    不阻塞畫面：回傳目前已載入的索引（資料剛更新時可能是上一版），
+    不是最新的就在背景載入/增量更新；還沒有任何索引時回傳 None
+    """
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    cached = _INDEXES.get(key)
+    if cached is None or cached.source_version != dataset.version:
+        with _LOCK:
+            future = _pending.get(key)
+            if future is None or future.done():
+                _pending[key] = _executor.submit(get_similar_index, csv_path, encode)
+    return cached
+
+
+if __name__ == "__main__":
+    from services.listing_store import DATA_DIR
+    for f in sorted(os.listdir(DATA_DIR)):
+        if f.endswith("_buy_properties.csv"):
+            idx = get_similar_index(os.path.join(DATA_DIR, f))
+            print(f"{f}: {len(idx)} 筆已建立索引")
@@ -0,0 +1,86 @@
+import os
+import threading
+import numpy as np
+from services.listing_store import load_dataset
+from services.comparables import unit_prices
+
+# ===========================
+# 排序索引（每個城市預先算好的排序排列）
+# ===========================
+# permutation(spec) 是整份資料依 spec 排好的列號（int32，同一行程共用）；
+# 搜尋結果只要用遮罩從排列中挑出自己的列：perm[member[perm]]，O(n) 不需要重新排序，
+# 之後換頁只是切片。缺值（NaN）不論升降冪都排在最後，同值依資料順序。
+# spec = ((欄位, 是否降冪), ...)，第一個為主要排序，其餘依序為次要排序。
+SORT_FIELDS = {
+    "price": "總價",
+    "unit_price": "單價",
+    "age": "屋齡",
+    "area": "建坪",
+    "walk_score": "步行機能",
+}
+
+
+def sort_values(dataset, key, columns=None):
+    if key == "unit_price":
+        return unit_prices(dataset)
+    columns = dataset.columns if columns is None else columns
+    return np.asarray(columns[key], dtype="float64")
+
+
+class SortIndex:
+    def __init__(self, dataset):
+        self.dataset = dataset
+        # 建立當下的欄位（生活機能指標重新載入時 dataset.columns 會換成新的 dict）
+        self.columns = dataset.columns
+        self._perms = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        """目前資料可以排序的欄位（walk_score 要先算好生活機能指標）"""
+        return [k for k in SORT_FIELDS if k == "unit_price" or k in self.columns]
+
+    def _build(self, spec):
+        sort_keys = []
+        # np.lexsort 以最後一個 key 為主要排序，所以反向加入
+        for key, descending in reversed(spec):
+            values = sort_values(self.dataset, key, self.columns)
+            missing = np.isnan(values)
+            values = np.where(missing, 0.0, -values if descending else values)
+            sort_keys += [values, missing]
+        perm = np.lexsort(sort_keys).astype("int32")
+        perm.setflags(write=False)
+        return perm
+
+    def permutation(self, spec):
+        spec = tuple((k, bool(d)) for k, d in spec)
+        perm = self._perms.get(spec)
+        if perm is None:
+            with self._lock:
+                perm = self._perms.get(spec)
+                if perm is None:
+                    perm = self._perms[spec] = self._build(spec)
+        return perm
+
+    def order(self, rows, spec):
+        """把一組列號依 spec 排序（與排列取交集，不重新排序）"""
+        if not spec:
+            return np.sort(rows)
+        member = np.zeros(len(self.dataset), dtype=bool)
+        member[rows] = True
+        perm = self.permutation(spec)
+        return perm[member[perm]]
+
+
+_INDEXES = {}
+_LOCK = threading.Lock()
+
+
+def get_sort_index(csv_path):
+    """行程共用的排序索引（資料更新後重新建立）"""
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    with _LOCK:
+        index = _INDEXES.get(key)
+        if index is None or index.dataset is not dataset or index.columns is not dataset.columns:
+            index = _INDEXES[key] = SortIndex(dataset)
+        return index
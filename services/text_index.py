@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import threading
+import unicodedata
+import numpy as np
+from services.listing_store import DATA_DIR, _store_path, load_dataset
+from services.request_parser import chinese_number
+
+# ===========================
+# 關鍵字索引（標題 / 地址 的單字 + 相鄰兩字倒排索引）
+# ===========================
+# 每個欄位存成四個 .npy（memmap 載入）：
+#   <欄位>_vocab：排序好的字詞（1~2 字），用 searchsorted 查
+#   <欄位>_offsets / <欄位>_postings：第 i 個字詞的列號為 postings[offsets[i]:offsets[i+1]]（遞增 int32）
+#   <欄位>_text：正規化後的原文（3 字以上的詞確認用）
+# 查詢「西屯 捷運 三房」：每個詞都要出現在標題或地址（AND），與篩選遮罩取交集後
+# 依「標題命中 2 分、地址命中 1 分」排序。3 字以上的詞用兩字索引找候選，再比對原文確認。
+# 國字數字一律轉成阿拉伯數字（「三房」=「3房」、「十二樓」=「12樓」），索引與查詢用同一個正規化。
+INDEX_VERSION = 3
+FIELDS = {"title": 2, "address": 1}
+_NUMERALS = str.maketrans({"一": "1", "二": "2", "兩": "2", "三": "3", "四": "4",
+                           "五": "5", "六": "6", "七": "7", "八": "8", "九": "9", "臺": "台"})
+_NUMERAL_RUN = re.compile(r"[一二兩三四五六七八九十]+")
+_SPLIT = re.compile(r"[\s,，、。;；/／|]+")
+
+
+def _numeral(match):
+    """「十二」→ 12（與特殊要求解析同一套規則）；「二三」這類逐字轉"""
+    run = match.group()
+    value = chinese_number(run)
+    return str(value) if value is not None else run.translate(_NUMERALS)
+
+
+def normalize_text(text):
+    """全形轉半形、小寫、國字數字轉阿拉伯數字、去掉空白"""
+    text = unicodedata.normalize("NFKC", str(text or "")).lower()
+    text = _NUMERAL_RUN.sub(_numeral, text).translate(_NUMERALS)
+    return "".join(text.split())
+
+
+def grams(text):
+    """單字 + 相鄰兩字（已正規化的文字）"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def query_terms(query):
+    return [t for t in (normalize_text(part) for part in _SPLIT.split(str(query or ""))) if t]
+
+
+def _term_grams(term):
+    return [term] if len(term) <= 2 else [term[i:i + 2] for i in range(len(term) - 1)]
+
+
+# ===========================
+# 建立
+# ===========================
+def build_postings(texts):
+    """texts 為正規化後的文字；回傳 (vocab, offsets, postings)"""
+    tokens, rows = [], []
+    for row, text in enumerate(texts):
+        g = grams(text)
+        tokens.extend(g)
+        rows.extend([row] * len(g))
+    if not tokens:
+        return np.array([], dtype="<U2"), np.zeros(1, dtype="int64"), np.array([], dtype="int32")
+    vocab, token_ids = np.unique(np.array(tokens, dtype="<U2"), return_inverse=True)
+    rows = np.array(rows, dtype="int32")
+    order = np.lexsort((rows, token_ids))
+    postings = rows[order]
+    offsets = np.zeros(len(vocab) + 1, dtype="int64")
+    np.cumsum(np.bincount(token_ids, minlength=len(vocab)), out=offsets[1:])
+    return vocab, offsets, postings
+
+
+_ARRAYS = ("vocab", "offsets", "postings", "text")
+
+
+def _index_dir(csv_path):
+    return os.path.join(_store_path(csv_path), "text")
+
+
+def build_text_index(csv_path):
+    """對一個城市建立索引並存檔，回傳存放目錄"""
+    dataset = load_dataset(csv_path)
+    out_dir = _index_dir(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    for field in FIELDS:
+        texts = [normalize_text(t) for t in np.asarray(dataset.columns[field]).tolist()]
+        arrays = build_postings(texts) + (np.array(texts, dtype=str),)
+        for name, arr in zip(_ARRAYS, arrays):
+            tmp = os.path.join(out_dir, f"{field}_{name}.tmp.npy")
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(out_dir, f"{field}_{name}.npy"))
+    meta = {
+        "index_version": INDEX_VERSION,
+        "source_mtime_ns": dataset.version[0],
+        "source_size": dataset.version[1],
+        "n_rows": len(dataset),
+    }
+    tmp = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(out_dir, "meta.json"))
+    return out_dir
+
+
+# ===========================
+# 查詢
+# ===========================
+class FieldIndex:
+    def __init__(self, vocab, offsets, postings, texts):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings = postings
+        self.texts = texts
+
+    def posting(self, gram):
+        i = int(np.searchsorted(self.vocab, gram))
+        if i >= len(self.vocab) or self.vocab[i] != gram:
+            return None
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def rows(self, term):
+        """含有這個詞的列號（遞增）"""
+        lists = [self.posting(g) for g in dict.fromkeys(_term_grams(term))]
+        if any(p is None for p in lists):
+            return np.array([], dtype="int32")
+        lists.sort(key=len)
+        rows = lists[0]
+        for p in lists[1:]:
+            rows = np.intersect1d(rows, p, assume_unique=True)
+            if not len(rows):
+                return rows
+        if len(term) > 2:
+            # 兩字都有不代表連在一起，回原文確認
+            rows = rows[np.char.find(self.texts[rows], term) >= 0]
+        return rows
+
+
+class TextIndex:
+    def __init__(self, dataset, fields):
+        self.dataset = dataset
+        self.fields = fields
+
+    def search(self, query, mask=None):
+        """
+        回傳 (列號, 分數)：依分數由高到低，同分依資料順序
+        mask 為結構化篩選的布林遮罩（None 代表全部）
+        """
+        terms = query_terms(query)
+        n = len(self.dataset)
+        matched = np.ones(n, dtype=bool) if mask is None else np.array(mask, dtype=bool)
+        score = np.zeros(n, dtype="int16")
+        hit = np.empty(n, dtype=bool)
+        for term in terms:
+            hit[:] = False
+            for field, weight in FIELDS.items():
+                rows = self.fields[field].rows(term)
+                hit[rows] = True
+                score[rows] += weight
+            matched &= hit
+        rows = np.flatnonzero(matched).astype("int32")
+        order = np.argsort(-score[rows], kind="stable")
+        return rows[order], score[rows[order]]
+
+
+def _load(csv_path, dataset):
+    out_dir = _index_dir(csv_path)
+    try:
+        with open(os.path.join(out_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("index_version") != INDEX_VERSION or \
+            (meta.get("source_mtime_ns"), meta.get("source_size")) != dataset.version:
+        return None
+    fields = {
+        field: FieldIndex(*(np.load(os.path.join(out_dir, f"{field}_{name}.npy"), mmap_mode="r")
+                            for name in _ARRAYS))
+        for field in FIELDS
+    }
+    return TextIndex(dataset, fields)
+
+
+_INDEXES = {}
+_LOCK = threading.Lock()
+
+
+def get_text_index(csv_path):
+    """行程共用的關鍵字索引；沒有或 CSV 已更新時重新建立並存檔"""
+    dataset = load_dataset(csv_path)
+    key = os.path.abspath(csv_path)
+    cached = _INDEXES.get(key)
+    if cached is not None and cached.dataset is dataset:
+        return cached
+    with _LOCK:
+        cached = _INDEXES.get(key)
+        if cached is not None and cached.dataset is dataset:
+            return cached
+        index = _load(csv_path, dataset)
+        if index is None:
+            build_text_index(csv_path)
+            index = _load(csv_path, dataset)
+        _INDEXES[key] = index
+        return index
+
+
+if __name__ == "__main__":
+    for f in sorted(os.listdir(DATA_DIR)):
+        if f.endswith("_buy_properties.csv"):
+            print(f"關鍵字索引: {build_text_index(os.path.join(DATA_DIR, f))}")
@@ -1,4 +1,5 @@
 import streamlit as st
+from services.query_cache import get_query_cache
 
 def render_sidebar():
     """
@@ -47,6 +48,12 @@ def render_sidebar():
             st.success("✅ Google Maps API KEY 已設定")
     
 
+    with st.sidebar.expander("📈 查詢快取"):
+        stats = get_query_cache().stats()
+        st.caption(f"命中率 {stats['hit_rate']:.0%}（命中 {stats['hits']}／未命中 {stats['misses']}）")
+        st.caption(f"{stats['entries']} 筆結果，{stats['bytes'] / 1024 / 1024:,.2f} / {stats['max_bytes'] / 1024 / 1024:,.0f} MB，"
+                   f"淘汰 {stats['evictions']} 次")
+
     if st.sidebar.button("其他功能一", use_container_width=True, key="updata_button"):
         st.sidebar.write("施工中...")
 